@@ -8,7 +8,8 @@ try:
 except:
     pass
 
-from numpy import isfinite, empty, ndarray, abs, asarray, isnan, array, all
+from numpy import isfinite, empty, ndarray, abs, asarray, isnan, array, all, zeros, ones, arange, where, argmin, \
+vstack, logical_not, argsort, searchsorted, cumsum, repeat
 from numpy import float32, float64
 floatTypes = [float32, float64, float]
 try:
@@ -73,9 +74,182 @@ class DerApproximatorException:
     def __str__(self):
         return self.msg
 
-def get_d1(fun, vars, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, varForDifferentiation = None, exactShape = False):
+def _d1_column(fun, Args, S, j, di, v_0, stencil):
+    # derivatives by S[j], S is Args[i] changed in-place
+    tmp = S[j] #if S.ndim > 0 else asscalar(S)
+    di2 = di / 2.0
+    S[j] += di
+    TMP = fun(*Args)
+    #if not isscalar(TMP): TMP = hstack(TMP)
+    v_right = atleast_1d(TMP)# TODO: fix it for matrices with ndims>1
+    S[j] = tmp 
+    # not Args[i][j] -= di, because it can change primeval Args[i][j] value 
+    # and check for key == same value will be failed
+    
+    has_nonfinite_right = not all(isfinite(v_right))
+    if stencil >= 2 or has_nonfinite_right:
+        S[j] -= di
+        v_left = atleast_1d(fun(*Args))
+        S[j] = tmp
+        has_nonfinite_left = not all(isfinite(v_left))
+        
+        if has_nonfinite_right:
+            if stencil == 1:
+                return (v_0-v_left) / di
+            S[j] -= di2
+            v_subleft = atleast_1d(fun(*Args))
+            S[j] = tmp
+            return (3*v_0+v_left-4*v_subleft) / di
+        elif has_nonfinite_left:
+            if stencil == 1:
+                return (v_right - v_0) / di
+            S[j] += di2
+            v_subright = atleast_1d(fun(*Args))
+            S[j] = tmp
+            return (4*v_subright-3*v_0-v_right) / di
+        elif stencil == 2:
+            return (v_right-v_left) / (2.0 * di)
+        else:
+            assert stencil == 3
+            S[j] -= di2
+            v_subleft = atleast_1d(fun(*Args))
+            S[j] = tmp
+            
+            S[j] += di2
+            v_subright = atleast_1d(fun(*Args))
+            S[j] = tmp
+            
+            return (v_left - v_right + 8.0 * (v_subright-v_subleft)) / (6.0 * di)
+    else:
+        return (v_right-v_0) / di
+
+# shifts of perturbed points (in diffInt units) and denominators for stencils 1, 2, 3
+_stencilShifts = {1: (1.0, ), 2: (1.0, -1.0), 3: (1.0, -1.0, -0.5, 0.5)}
+_stencilDenominators = {1: 1.0, 2: 2.0, 3: 6.0}
+
+def _patternNonzeros(sparsityPattern, shape = None):
+    # rows and columns of nonzeros of m x n array or scipy.sparse matrix, the latter is not densified
+    if hasattr(sparsityPattern, 'tocoo'):
+        P = sparsityPattern.tocoo()
+        ind = P.data != 0
+        rows, cols = P.row[ind], P.col[ind]
+    else:
+        P = asarray(sparsityPattern)
+        rows, cols = where(P != 0)
+    if shape is not None and P.shape != shape:
+        raise DerApproximatorException('sparsity pattern should have shape %s, %s obtained' % (shape, P.shape))
+    return rows, cols, P.shape
+
+def get_column_groups(sparsityPattern):
     """
-    Usage: get_d1(fun, x, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, varForDifferentiation = None, exactShape = False)
+    Usage: groups = get_column_groups(sparsityPattern)
+    Curtis-Powell-Reed grouping of columns of the m x n sparsity pattern (array or scipy.sparse matrix):
+    columns without common nonzero rows get same group number and can be perturbed simultaneously;
+    the groups can be passed to get_d1(..., sparsityPattern = pattern, columnGroups = groups) 
+    to avoid their calculation on each call
+    """
+    rows, cols, (M, n) = _patternNonzeros(sparsityPattern)
+    # nonzeros ordered by columns and by rows
+    byCol, byRow = argsort(cols, kind = 'mergesort'), argsort(rows, kind = 'mergesort')
+    colPtr, rowPtr = searchsorted(cols[byCol], arange(n+1)), searchsorted(rows[byRow], arange(M+1))
+    colRows, rowCols = rows[byCol], cols[byRow]
+    # neighbours of column j (columns with common nonzero rows) are Neighbours[nbPtr[j]:nbPtr[j+1]]
+    L = rowPtr[colRows+1] - rowPtr[colRows]
+    ends = cumsum(L)
+    Neighbours = rowCols[repeat(rowPtr[colRows] - ends + L, L) + arange(ends[-1] if L.size else 0)]
+    nbPtr = hstack((0, ends))[colPtr]
+    # greedy coloring; forbidden[g] == j means group g is used by a neighbour of column j
+    groups = -ones(n, int)
+    forbidden = -ones(n+1, int)
+    nGroups = 0
+    for j in range(n):
+        g = groups[Neighbours[nbPtr[j]:nbPtr[j+1]]]
+        forbidden[g[g >= 0]] = j
+        groups[j] = argmin(forbidden[:nGroups+1] == j)
+        nGroups = max(nGroups, groups[j] + 1)
+    return groups
+
+class _pointCaller:
+    # fun(*Args) with Args[i] replaced by the point; picklable if fun and args are
+    def __init__(self, fun, Args, i):
+        self.fun, self.Args, self.i = fun, list(Args), i
+    def __call__(self, x):
+        Args = list(self.Args)
+        Args[self.i] = x
+        return self.fun(*Args)
+
+def _get_d1_batched(fun, Args, i, S, diff_int, v_0, stencil, vectorized, sparsityPattern, columnGroups, executor):
+    n, M = S.size, v_0.size
+    if sparsityPattern is None:
+        nonzeros, groups = None, arange(n)
+    else:
+        rows, cols, shape = nonzeros = _patternNonzeros(sparsityPattern, (M, n))
+        groups = get_column_groups(sparsityPattern) if columnGroups is None else asarray(columnGroups)
+        if groups.shape != (n, ):
+            raise DerApproximatorException('columnGroups should have %d elements, %d obtained' % (n, groups.size))
+    nGroups = groups.max() + 1 if n != 0 else 0
+    
+    # one perturbed point per group and stencil shift
+    D = zeros((nGroups, n))
+    D[groups, arange(n)] = diff_int
+    X = vstack([S + shift * D for shift in _stencilShifts[stencil]])
+    K = X.shape[0]
+    Args, arg = list(Args), Args[i]
+    if vectorized:
+        Args[i] = X
+        V = asarray(fun(*Args), float)
+        if V.size != K * M:
+            raise DerApproximatorException('for vectorized=True fun should return array with one row of %d values for each of %d points' % (M, K))
+        V = V.reshape(K, M)
+    elif executor is not None:
+        # map() returns results in order of the points
+        V = vstack([atleast_1d(v) for v in executor.map(_pointCaller(fun, Args, i), X)])
+        if V.shape != (K, M):
+            raise DerApproximatorException('fun should return %d values for each point, %d obtained' % (M, V.size // K))
+    else:
+        V = empty((K, M))
+        for k in range(K):
+            Args[i] = X[k]
+            V[k] = atleast_1d(fun(*Args))
+    
+    V = V.reshape(-1, nGroups, M)
+    if stencil == 1:
+        G = V[0] - v_0
+    elif stencil == 2:
+        G = V[0] - V[1]
+    else:
+        assert stencil == 3
+        G = V[1] - V[0] + 8.0 * (V[3] - V[2])
+    d1 = (G[groups] / (_stencilDenominators[stencil] * diff_int).reshape(-1, 1)).T
+    if nonzeros is not None:
+        tmp = zeros((M, n))
+        tmp[rows, cols] = d1[rows, cols]
+        d1 = tmp
+    
+    # groups with non-finite values are handled column by column with one-sided stencils
+    if vectorized:
+        # single row view of S, thus its in-place changes by _d1_column are seen by fun
+        Args[i] = S.reshape(1, -1)
+        colFun = lambda *args: asarray(fun(*args), float).flatten()
+    else:
+        Args[i] = arg
+        colFun = fun
+    badGroups = logical_not(isfinite(V).all(2).all(0))
+    for j in where(badGroups[groups])[0]:
+        tmp = _d1_column(colFun, Args, S, j, diff_int[j], v_0, stencil)
+        if nonzeros is not None:
+            ind = rows[cols == j]
+            d1[:, j] = 0.0
+            d1[ind, j] = tmp[ind]
+        else:
+            d1[:, j] = tmp
+    return d1
+
+def get_d1(fun, vars, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, varForDifferentiation = None, exactShape = False, 
+           vectorized = False, sparsityPattern = None, columnGroups = None, executor = None):
+    """
+    Usage: get_d1(fun, x, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, varForDifferentiation = None, exactShape = False, 
+                  vectorized = False, sparsityPattern = None, columnGroups = None, executor = None)
     fun: R^n -> R^m, x: Python list (not tuple!) or numpy array from R^n: function and point where derivatives should be obtained 
     diffInt - step for stencil
     pointVal - fun(x) if known (it is used from OpenOpt and FuncDesigner)
@@ -85,6 +259,18 @@ def get_d1(fun, vars, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, var
     stencil = 3: (-f(x+2*diffInt) + 8*f(x+diffInt) - 8*f(x-diffInt) + f(x-2*diffInt)) / (12*diffInt)
     varForDifferentiation - the parameter is used from FuncDesigner
     exactShape - set True to forbid possible flattering for 1D arrays
+    vectorized - set True if fun accepts 2-D array (one point per row) instead of x
+        and returns array with one row of values per point; 
+        then all perturbed points are evaluated by single call of fun
+    sparsityPattern - m x n array or scipy.sparse matrix with nonzeros of the Jacobian 
+        (e.g. from get_sparsity_pattern); columns without common nonzero rows are perturbed 
+        simultaneously (Curtis-Powell-Reed grouping), thus number of fun calls is reduced
+    columnGroups - the grouping from get_column_groups(sparsityPattern), if None it is obtained on each call
+    vectorized and sparsityPattern are implemented for single input variable only
+    executor - object with method map(func, points) returning results in order of the points,
+        e.g. concurrent.futures.ProcessPoolExecutor or multiprocessing.Pool, 
+        then all perturbed points are evaluated concurrently (fun should be picklable for process pools);
+        it is ignored if vectorized = True
     """
     assert type(vars) in [tuple,  list,  ndarray, float, dict]
     #assert asarray(diffInt).size == 1,  'vector diffInt are not implemented for oofuns yet'      
@@ -101,11 +287,16 @@ def get_d1(fun, vars, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, var
         #if len(set(tuple(Vars))) != len(Vars):
             #raise DerApproximatorException('currently DerApproximator can handle only different input variables')
     
+    if (vectorized or sparsityPattern is not None) and len(Vars) != 1:
+        raise DerApproximatorException('vectorized and sparsityPattern modes are implemented for single input variable only')
+    
     if type(args) != tuple:
         args = (args, )
     Args = list(tuple(asfarray(v) for v in Vars) + args)
 
-    if pointVal is None:
+    if pointVal is None and vectorized:
+        v_0 = atleast_1d(asarray(fun(*([atleast_2d(Args[0])] + Args[1:])))).flatten()
+    elif pointVal is None:
         v_0 = atleast_1d(fun(*Args))
     else:
         v_0 = pointVal
@@ -122,7 +313,6 @@ def get_d1(fun, vars, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, var
         else:
             S = asfarray([Args[i]])
         S = atleast_1d(S)
-        agregate_counter = 0
         assert asarray(Args[i]).ndim <= 1, 'derivatives for more than single dimension variables are not implemented yet'
         
         if diffInt.size == 1: diff_int = asarray([diffInt[0]]*S.size)# i.e. python list of length inp.size
@@ -133,61 +323,12 @@ def get_d1(fun, vars, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, var
         diff_int[ind] = cmp[ind]
         
         d1 = empty((M, S.size))
-
-        for j in range(S.size):
-            di = float(asscalar(diff_int[j]))
-            tmp = S[j] #if S.ndim > 0 else asscalar(S)
-            di = diff_int[j]
-            di2 = di / 2.0
-            S[j] += di
-            TMP = fun(*Args)
-            #if not isscalar(TMP): TMP = hstack(TMP)
-            v_right = atleast_1d(TMP)# TODO: fix it for matrices with ndims>1
-            S[j] = tmp 
-            # not Args[i][j] -= di, because it can change primeval Args[i][j] value 
-            # and check for key == same value will be failed
-            
-            has_nonfinite_right = not all(isfinite(v_right))
-            if stencil >= 2 or has_nonfinite_right:
-                S[j] -= di
-                v_left = atleast_1d(fun(*Args))
-                S[j] = tmp
-                has_nonfinite_left = not all(isfinite(v_left))
-                
-                if has_nonfinite_right:
-                    if stencil == 1:
-                        d1[:, agregate_counter] = (v_0-v_left) / di
-                    else:
-                        S[j] -= di2
-                        v_subleft = atleast_1d(fun(*Args))
-                        S[j] = tmp
-                        d1[:, agregate_counter] = (3*v_0+v_left-4*v_subleft) / di
-                elif has_nonfinite_left:
-                    if stencil == 1:
-                        d1[:, agregate_counter] = (v_right - v_0) / di
-                    else:
-                        S[j] += di2
-                        v_subright = atleast_1d(fun(*Args))
-                        S[j] = tmp
-                        d1[:, agregate_counter] = (4*v_subright-3*v_0-v_right) / di
-                    
-                elif stencil == 2:
-                    d1[:, agregate_counter] = (v_right-v_left) / (2.0 * di)
-                else:
-                    assert stencil == 3
-                    S[j] -= di2
-                    v_subleft = atleast_1d(fun(*Args))
-                    S[j] = tmp
-                    
-                    S[j] += di2
-                    v_subright = atleast_1d(fun(*Args))
-                    S[j] = tmp
-                    
-                    d1[:, agregate_counter] = (v_left - v_right + 8.0 * (v_subright-v_subleft)) / (6.0 * di)
-            else:
-                d1[:, agregate_counter] = (v_right-v_0) / di
-                
-            agregate_counter += 1 # TODO: probably other values for n-dim arrays
+        
+        if vectorized or sparsityPattern is not None or executor is not None:
+            d1 = _get_d1_batched(fun, Args, i, S, diff_int, v_0, stencil, vectorized, sparsityPattern, columnGroups, executor)
+        else:
+            for j in range(S.size):
+                d1[:, j] = _d1_column(fun, Args, S, j, diff_int[j], v_0, stencil)
             
         # TODO: fix it for arrays with ndim > 2
         if not exactShape and min(d1.shape)==1: d1 = d1.flatten()
@@ -198,6 +339,24 @@ def get_d1(fun, vars, diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, var
     else: r = tuple(r)
     return r
 
+def get_sparsity_pattern(fun, x, diffInt=1.5e-8, args=(), vectorized = False, nPoints = 2):
+    """
+    Usage: get_sparsity_pattern(fun, x, diffInt=1.5e-8, args=(), vectorized = False, nPoints = 2)
+    returns m x n bool array of nonzeros of the Jacobian of fun: R^n -> R^m, 
+    obtained by finite differences in x and (nPoints-1) points near it 
+    (to decrease chance of occasional zero derivatives);
+    it can be used as get_d1(..., sparsityPattern = pattern) for subsequent points 
+    """
+    from numpy.random import RandomState
+    x = atleast_1d(asfarray(x))
+    randomState = RandomState(0)
+    P = None
+    for k in range(nPoints):
+        y = x.copy() if k == 0 else x + 1e-3 * (1.0 + abs(x)) * (randomState.rand(x.size) - 0.5)
+        d1 = get_d1(fun, y, diffInt=diffInt, args=args, stencil = 1, exactShape = True, vectorized = vectorized)
+        P = d1 != 0 if P is None else P | (d1 != 0)
+    return P
+
 def check_d1(fun, fun_d, vars, func_name='func', diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, maxViolation=0.01, varForCheck = None):
     """
     Usage: check_d1(fun, fun_d, x, func_name='func', diffInt=1.5e-8, pointVal = None, args=(), stencil = 3, maxViolation=0.01, varForCheck = None)
@@ -1,3 +1,3 @@
 __version__ = '0.52'
 
-from DerApproximator import DerApproximatorException, get_d1, check_d1, get_d2
+from DerApproximator import DerApproximatorException, get_d1, check_d1, get_d2, get_sparsity_pattern, get_column_groups
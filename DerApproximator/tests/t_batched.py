@@ -0,0 +1,40 @@
+from numpy import *
+from DerApproximator import get_d1, get_sparsity_pattern, get_column_groups
+
+# f: R^n -> R^n with tridiagonal Jacobian
+n = 10
+func = lambda x: x**3 + hstack((0, x[:-1])) * x - hstack((x[1:], 0))**2
+# same function for 2-D input: one point per row
+func_2d = lambda X: X**3 + hstack((zeros((X.shape[0], 1)), X[:, :-1])) * X - hstack((X[:, 1:], zeros((X.shape[0], 1))))**2
+x = arange(1.0, n+1)
+
+r1 = get_d1(func, x)
+r2 = get_d1(func_2d, x, vectorized = True) # single call of func_2d for all perturbed points
+print(array_equal(r1, r2)) # True
+
+pattern = get_sparsity_pattern(func, x)
+r3 = get_d1(func, x, sparsityPattern = pattern) # 3 groups of columns, i.e. 12 calls of func instead of 40 for stencil = 3
+print(array_equal(r1, r3)) # True
+
+# grouping of columns can be obtained once and reused for other points, pattern can be scipy.sparse matrix
+groups = get_column_groups(pattern)
+print(groups) # [0 1 2 0 1 2 0 1 2 0]
+from scipy.sparse import csr_matrix
+r5 = get_d1(func, x, sparsityPattern = csr_matrix(pattern), columnGroups = groups)
+print(array_equal(r1, r5)) # True
+
+# points with non-finite values are evaluated column by column (one-sided stencils), for vectorized fun as well
+f = lambda x: hstack((sqrt(x[0]), x[1]**2))
+f_2d = lambda X: vstack((sqrt(X[:, 0]), X[:, 1]**2)).T
+print(array_equal(get_d1(f, array([0.0, 2.0]), stencil = 2), get_d1(f_2d, array([0.0, 2.0]), vectorized = True, stencil = 2))) # True
+
+# perturbed points evaluated in 2 processes, func should be picklable
+def func2(x):
+    return x**3 + hstack((0, x[:-1])) * x - hstack((x[1:], 0))**2
+
+if __name__ == '__main__':
+    from multiprocessing import Pool
+    pool = Pool(2)
+    r4 = get_d1(func2, x, executor = pool)
+    pool.terminate()
+    print(array_equal(r1, r4)) # True
@@ -0,0 +1,182 @@
+# Compiled evaluation plans for oofun expression graphs
+from numpy import ndarray, asarray, asanyarray, hstack
+from baseClasses import OOArray, Stochastic, MultiArray
+from ooPoint import ooPoint
+from FDmisc import FuncDesignerException
+
+class _fallback(Exception):
+    pass
+
+def _render_output(Tmp):
+    # same rendering of list/tuple output as in oofun._getFuncCalcEngine
+    return hstack(Tmp) if len(Tmp) > 1 else Tmp[0]
+
+def _ooarray_value(Tmp):
+    # same as ooarray.__call__ for single (non-multiarray) points
+    tmp = asanyarray(Tmp)
+    if tmp.ndim == 2 or tmp.dtype != object:
+        return tmp
+    raise _fallback()
+
+def _hasOwnEngine(node):
+    # oovar, constraints etc redefine _getFuncCalcEngine on class level,
+    # such nodes are evaluated by their own engine
+    from ooFun import oofun
+    for cls in type(node).__mro__:
+        if cls is oofun:
+            return False
+        if '_getFuncCalcEngine' in cls.__dict__:
+            return True
+    return False
+
+def _inputOOFuns(node):
+    from ooFun import oofun
+    r = []
+    if node.is_oovar or node.input is None or _hasOwnEngine(node):
+        return r
+    for inp in node.input:
+        if isinstance(inp, oofun):
+            r.append(inp)
+        elif isinstance(inp, OOArray):
+            r += [elem for elem in inp.view(ndarray) if isinstance(elem, oofun)]
+    return r
+
+def topologicalOrder(root):
+    '''
+    returns list of oofuns root depends on (including root itself),
+    each oofun is placed after all its inputs
+    '''
+    order, visited = [], set()
+    stack = [(root, False)]
+    while stack:
+        node, inputsDone = stack.pop()
+        if inputsDone:
+            order.append(node)
+            continue
+        if node in visited:
+            continue
+        visited.add(node)
+        stack.append((node, True))
+        for inp in reversed(_inputOOFuns(node)):
+            if inp not in visited:
+                stack.append((inp, False))
+    return order
+
+class compiledOOFun(object):
+    '''
+    Flat evaluation plan of an oofun expression graph.
+    The DAG is topologically sorted once, each node becomes a single line
+    of generated Python code (so shared subexpressions are evaluated once per point),
+    and subtrees depending on fixed variables only are computed on first call
+    and reused afterwards (like oofun._getFuncCalcEngine does for fixed oofuns).
+    Points with multiarray or stochastic values are passed to the ordinary engine.
+    '''
+    def __init__(self, oof, Vars = None, fixedVars = None, fixedVarsScheduleID = -1):
+        from ooFun import oofun
+        if not isinstance(oof, oofun):
+            raise FuncDesignerException('only oofuns can be compiled')
+        if Vars is not None and fixedVars is not None:
+            raise FuncDesignerException('No more than one argument from "Vars" and "fixedVars" is allowed for the function')
+        self.oofun = oof
+        self.Vars = set(Vars) if Vars is not None else None
+        self.fixedVars = set(fixedVars) if fixedVars is not None else None
+        self._kw = {'Vars': self.Vars, 'fixedVars': self.fixedVars, 'fixedVarsScheduleID': fixedVarsScheduleID}
+        self.order = topologicalOrder(oof)
+        self.nEvals = self.nFallbacks = 0
+        self._prevPointID = None
+        self._prevVal = None
+        self._build()
+
+    def _isFixed(self, node):
+        dep = set([node]) if node.is_oovar else (node._getDep() or set())
+        return (self.fixedVars is not None and dep.issubset(self.fixedVars)) \
+        or (self.Vars is not None and dep.isdisjoint(self.Vars))
+
+    def _build(self):
+        from ooFun import oofun
+        names = dict((node, 'v%d' % i) for i, node in enumerate(self.order))
+        namespace = {'S': (Stochastic, MultiArray), 'F': _fallback, 'Q': (list, tuple),
+                     'R': _render_output, 'A': _ooarray_value, 'KW': self._kw}
+        fixedLines, lines = [], []
+
+        def const(val):
+            name = 'K%d' % len(namespace)
+            namespace[name] = asarray(val) if type(val) in (list, tuple) else val
+            return name
+
+        def argument(inp):
+            if isinstance(inp, oofun):
+                return names[inp]
+            elif isinstance(inp, OOArray):
+                elems = inp.view(ndarray)
+                if elems.size == 1 and type(elems.item()) == oofun:
+                    return names[elems.item()]
+                return 'A([%s])' % ', '.join(names[elem] if isinstance(elem, oofun) else const(elem) for elem in elems)
+            return const(inp)
+
+        fixedNodes = set(node for node in self.order if self._isFixed(node))
+        for node in self.order:
+            v = names[node]
+            N = const(node)
+            if node.is_oovar:
+                code = ['%s = x.get(%s)' % (v, N),
+                        'if %s is None: %s = %s._getFuncCalcEngine(x)' % (v, v, N),
+                        'if isinstance(%s, S): raise F' % v]
+            elif _hasOwnEngine(node):
+                code = ['%s = %s._getFuncCalcEngine(x, **KW)' % (v, N)]
+            else:
+                if type(node.args) != tuple:
+                    node.args = (node.args, )
+                Args = [argument(inp) for inp in node.input] + [const(arg) for arg in node.args]
+                code = ['%s = %s(%s)' % (v, const(node.fun), ', '.join(Args)),
+                        'if type(%s) in Q: %s = R(%s)' % (v, v, v)]
+            (fixedLines if node in fixedNodes else lines).extend(code)
+
+        # fixed values that are required outside of the fixed part
+        used = set()
+        for node in self.order:
+            if node not in fixedNodes:
+                used.update(inp for inp in _inputOOFuns(node) if inp in fixedNodes)
+        if self.oofun in fixedNodes:
+            used.add(self.oofun)
+        used = [names[node] for node in self.order if node in used]
+        self._fixedResult = self.oofun in fixedNodes
+
+        source = ['def evaluate(x, C):']
+        if len(used):
+            Tuple = ', '.join(used) + ','
+            source += ['    if C[0] is None:'] + ['        ' + line for line in fixedLines] \
+            + ['        C[0] = (%s)' % Tuple, '    %s = C[0]' % Tuple]
+        source += ['    ' + line for line in lines] + ['    return %s' % names[self.oofun]]
+        self.source = '\n'.join(source)
+        exec(compile(self.source, '<compiled oofun %s>' % self.oofun.name, 'exec'), namespace)
+        self._evaluate = namespace['evaluate']
+        self._fixedValues = [None]
+
+    def reset(self):
+        # drop values of fixed subtrees, e.g. after fixed variables values have been changed
+        self._fixedValues = [None]
+        self._prevPointID = self._prevVal = None
+
+    def __call__(self, x, *args, **kw):
+        if type(x) == dict:
+            x = ooPoint(x)
+        elif not isinstance(x, dict) and hasattr(x, 'xf'):
+            x = x.xf
+        if type(x) == ooPoint:
+            if x.isMultiPoint:
+                self.nFallbacks += 1
+                return self.oofun._getFuncCalcEngine(x, **self._kw)
+            if x._id == self._prevPointID:
+                r = self._prevVal
+                return r.copy() if isinstance(r, ndarray) else r
+        try:
+            r = self._evaluate(x, self._fixedValues)
+        except _fallback:
+            self.nFallbacks += 1
+            return self.oofun._getFuncCalcEngine(x, **self._kw)
+        self.nEvals += 1
+        isPoint = type(x) == ooPoint
+        if isPoint:
+            self._prevPointID, self._prevVal = x._id, r
+        return r.copy() if isinstance(r, ndarray) and (isPoint or self._fixedResult) else r
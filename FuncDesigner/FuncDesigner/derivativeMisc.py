@@ -1,9 +1,11 @@
 PythonAll = all
+PythonSum = sum
+PythonAny = any
 from FDmisc import Len, FuncDesignerException, DiagonalType, scipyAbsentMsg, pWarn, scipyInstalled, Diag, \
 Copy, Eye, isPyPy, isspmatrix
 
 
-from baseClasses import OOFun, Stochastic
+from baseClasses import OOFun, OOArray, Stochastic
 from numpy import isscalar, ndarray, atleast_2d, prod, int64, asarray, ones_like, array_equal, asscalar
 import numpy as np
 from multiarray import multiarray
@@ -173,8 +175,9 @@ def _D(Self, x, fixedVarsScheduleID, Vars=None, fixedVars = None, useSparse = 'a
     return r
 
 
-def getDerivativeSelf(Self, x, fixedVarsScheduleID, Vars,  fixedVars):
-    Input = Self._getInput(x, fixedVarsScheduleID=fixedVarsScheduleID, Vars=Vars,  fixedVars=fixedVars)
+def getDerivativeSelf(Self, x, fixedVarsScheduleID, Vars,  fixedVars, Input = None):
+    if Input is None:
+        Input = Self._getInput(x, fixedVarsScheduleID=fixedVarsScheduleID, Vars=Vars,  fixedVars=fixedVars)
     expectedTotalInputLength = sum([Len(elem) for elem in Input])
     
 #        if hasattr(Self, 'size') and isscalar(Self.size): nOutput = Self.size
@@ -328,3 +331,139 @@ def mul_aux_d(x, y):
 class Derivative(dict):
     def __init__(self):
         pass
+
+
+"""                                 reverse-mode (adjoint) differentiation                                 """
+
+# in mode 'auto' reverse sweep is used if number of free variables (their total size) 
+# is at least reverseModeMinInputs and is greater than output size multiplied by reverseModeRatio
+reverseModeMinInputs = 32
+reverseModeRatio = 8
+
+class _reverseModeFailure(Exception):
+    pass
+
+def _adjointProduct(A, J, k):
+    # returns A * J, where A is adjoint (M x m), J is derivative of node (size m) by its input (size k)
+    M, m = A.shape
+    if isscalar(J) or (type(J) == ndarray and J.size == 1):
+        J = J if isscalar(J) else J.item()
+        if k == m:
+            return A * J
+        elif k == 1:
+            return J * A.sum(1).reshape(M, 1)
+    elif type(J) == DiagonalType:
+        if J.size == m == k:
+            return A * (J.scalarMultiplier if J.isOnes else J.diag * J.scalarMultiplier)
+    elif type(J) == ndarray:
+        if J.ndim < 2 and J.size == m * k:
+            J = J.reshape(m, k)
+        if J.shape == (m, k):
+            return np.dot(A, J)
+    elif isspmatrix(J):
+        if J.shape == (m, k):
+            return np.asarray(J.T.dot(A.T)).T
+    raise _reverseModeFailure()
+
+def _D_reverse(Self, x, fixedVarsScheduleID, Vars=None, fixedVars = None, useSparse = 'auto', auto = False):
+    '''
+    Derivatives of the oofun by one forward pass (values and local derivatives of all nodes)
+    and one backward sweep of adjoints, that is O(#nodes) instead of O(#nodes * #vars) 
+    for oofuns with small output size. 
+    Results are same to _D(); cases unsupported here (stochastic and multiarray values, 
+    nodes with own evaluation engine) are handled by _D().
+    '''
+    if Self.is_oovar or (isinstance(x, ooPoint) and x.isMultiPoint):
+        return Self._D(x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse)
+        
+    isExcluded = lambda v: (Vars is not None and v not in Vars) or (fixedVars is not None and v in fixedVars)
+    isFixed = lambda dep: (fixedVars is not None and dep.issubset(fixedVars)) or (Vars is not None and dep.isdisjoint(Vars))
+    
+    dep = Self._getDep()
+    if auto:
+        decision = Self.__dict__.get('_reverseModeDecision', None)
+        if decision is not None and decision[0] == fixedVarsScheduleID != -1:
+            if not decision[1]:
+                return Self._D(x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse)
+        elif PythonSum(np.size(x[v]) for v in dep if v in x and not isExcluded(v)) < reverseModeMinInputs:
+            if fixedVarsScheduleID != -1: Self._reverseModeDecision = (fixedVarsScheduleID, False)
+            return Self._D(x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse)
+            
+    from compiled import topologicalOrder, _hasOwnEngine
+    order = topologicalOrder(Self)
+    
+    try:
+        # forward pass
+        values, inputs = {}, {}
+        for node in order:
+            if node.is_oovar:
+                val = x.get(node, None)
+                if val is None: val = node._getFuncCalcEngine(x)
+            elif _hasOwnEngine(node):
+                raise _reverseModeFailure()
+            else:
+                if type(node.args) != tuple: node.args = (node.args, )
+                Input = tuple((values[inp] if isinstance(inp, OOFun) else inp(x) if isinstance(inp, OOArray) \
+                               else np.asarray(inp) if type(inp) in (list, tuple) else inp) for inp in node.input)
+                val = node.fun(*(Input + node.args))
+                if isinstance(val, (list, tuple)):
+                    val = np.hstack(val) if len(val) > 1 else val[0]
+                inputs[node] = Input
+            if isinstance(val, (Stochastic, multiarray)):
+                raise _reverseModeFailure()
+            values[node] = val
+            
+        M = np.size(values[Self])
+        if auto:
+            nInputs = PythonSum(np.size(values[v]) for v in dep if not isExcluded(v))
+            useReverse = nInputs >= reverseModeMinInputs and M * reverseModeRatio <= nInputs
+            if fixedVarsScheduleID != -1: Self._reverseModeDecision = (fixedVarsScheduleID, useReverse)
+            if not useReverse:
+                return Self._D(x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse)
+
+        # backward sweep
+        adjoints = {Self: np.eye(M)}
+        r = {}
+        for node in reversed(order):
+            A = adjoints.pop(node, None)
+            if A is None:
+                continue
+            if node.is_oovar:
+                if not isExcluded(node):
+                    r[node] = r[node] + A if node in r else A
+                continue
+            if node.discrete or node.input[0] is None or isFixed(node._getDep()):
+                continue
+            
+            if '_D' in node.__dict__:
+                factor = node.__dict__.get('_linearFactor', None)
+                if factor is None:
+                    # node with its own derivative engine, it yields derivatives by oovars directly
+                    for v, J in node._D(x, fixedVarsScheduleID, Vars=Vars, fixedVars=fixedVars, useSparse=useSparse).items():
+                        tmp = _adjointProduct(A, J, np.size(values[v]))
+                        r[v] = r[v] + tmp if v in r else tmp
+                    continue
+                # node = factor * sum(inputs) + const, inputs of size 1 are broadcasted
+                if PythonAny(isinstance(inp, OOArray) for inp in node.input):
+                    raise _reverseModeFailure()
+                Elems = [(inp, factor) for inp in node.input if isinstance(inp, OOFun)]
+            else:
+                derivativeSelf = node._getDerivativeSelf(x, fixedVarsScheduleID, Vars, fixedVars, Input = inputs[node])
+                Elems, ac = [], -1
+                for inp in node.input:
+                    if not isinstance(inp, OOFun) or inp.discrete: continue
+                    if inp.is_oovar and isExcluded(inp): continue
+                    ac += 1
+                    Elems.append((inp, derivativeSelf[ac]))
+                    
+            for inp, J in Elems:
+                if inp.discrete or (not inp.is_oovar and (inp.input[0] is None or isFixed(inp._getDep()))):
+                    continue
+                tmp = _adjointProduct(A, J, np.size(values[inp]))
+                adjoints[inp] = adjoints[inp] + tmp if inp in adjoints else tmp
+    except _reverseModeFailure:
+        return Self._D(x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse)
+    
+    # adjoint products are dense, they are kept as is (same to _D() results of dense chains),
+    # thus oofun.D() reshapes them (e.g. row of scalar oofun to 1-D array or float) the same way
+    return r
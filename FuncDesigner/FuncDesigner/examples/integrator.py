@@ -1,8 +1,8 @@
 """
 Example of FuncDesigner functions integration
-Currently scipy.intergate.quad is used (Fortan library QUADPACK, (R^n->R^1 only),
-maybe in future higher order solvers will be connected,
-e.g. scipy.intergate dblquad, tplquad, quadrature, fixed_quad, trapz etc
+Adaptive Gauss-Kronrod (7, 15) quadrature is used (R^n->R^1 only),
+integrand is evaluated on all quadrature nodes of a panels set at once,
+derivatives of the integral wrt other variables are available via Leibniz rule
 """
 from FuncDesigner import *
 a, b, c = oovars('a', 'b', 'c') 
@@ -32,4 +32,6 @@ print(f6(point1), f6(point2)) # Expected output: 0.0847234400308 0.0905041349188
 f7 = integrator(f1+2*f2+3*sqrt(abs(f3)), (a, cos(f2+2*f3), f2+5*sin(f1)) )
 print(f7(point1), f7(point2)) # Expected output: 9336.70442146 5259.53130904
 
+print(f7.D(point1)) # derivatives wrt a, b, c
+
 
@@ -1,87 +1,280 @@
 from ooFun import oofun, atleast_oofun
 import numpy as np
-from FDmisc import FuncDesignerException
-from translator import FuncDesignerTranslator
-from ooPoint import ooPoint as oopoint
+from FDmisc import FuncDesignerException, pWarn
+from ooPoint import ooPoint as oopoint, ooMultiPoint
 from ooVar import oovar
+from multiarray import multiarray
 
-try:
-    from scipy import integrate
-    scipyInstalled = True
-except:
-    scipyInstalled = False
-
-def integrator(func, domain,  **kwargs):
-    if not scipyInstalled:
-        raise FuncDesignerException('to use scipy_integrate_quad you should have scipy installed, see scipy.org')
-
-#    if not isinstance(domain, dict) or len(domain) != 1: 
-#        raise FuncDesignerException('currently integration domain must be of type Pythoon dict {integr_var:(val_from, val_to)} only')
-    
-    #integration_var = domain.keys()[0]
-    #_from, _to =  domain.values()[0]
+# Gauss-Kronrod (7, 15) rule on [-1, 1], nodes and weights as in QUADPACK qk15
+_xgk = np.array([0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+                 0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+                 0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                 0.207784955007898467600689403773245, 0.0])
+_wgk = np.array([0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+                 0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+                 0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                 0.204432940075298892414161999234649, 0.209482141084727828012999174891714])
+_wg7 = np.array([0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+                 0.381830050505118944950369775488975, 0.417959183673469387755102040816327])
+
+_xk = np.hstack((-_xgk, _xgk[-2::-1]))
+_wk = np.hstack((_wgk, _wgk[-2::-1]))
+_wg = np.zeros(15)
+_wg[1:7:2], _wg[7], _wg[13:7:-2] = _wg7[:3], _wg7[3], _wg7[:3]
+_nK = _xk.size
+
+_epmach = np.finfo(float).eps
+
+# oovars the oofun depends on (_getDep() is None for oovar itself and for constants)
+_dep = lambda elem: set([elem]) if elem.is_oovar else set(elem._getDep() or ())
+
+def integrator(func, domain, adaptive = True, panels = 1, epsabs = 1.49e-8, epsrel = 1.49e-8, limit = 50):
+    '''
+    r = integrator(func, (integration_var, a, b), **kwargs)
+    returns oofun r = integral of func by integration_var from a to b
+    (a, b are numbers, +/-inf or oofuns, integration_var is scalar oovar).
+    Gauss-Kronrod (7, 15) rule is used, func is evaluated on all nodes of all new panels at once
+    (FuncDesigner multipoint evaluation), derivatives of r are available.
+    Parameters:
+        adaptive: if False, the rule is used on "panels" equal subintervals without error control,
+            else the panels with largest error estimates are bisected until
+            sum of errors <= max(epsabs, epsrel*|r|) or number of panels reaches "limit";
+            the obtained partition (with each pair of neighbouring panels merged)
+            is used as a starting one on next call
+    '''
     integration_var, a, b = domain
     if not isinstance(integration_var, oovar):
         raise FuncDesignerException('integration variable must be FuncDesigner oovar')
     a, b, func = atleast_oofun(a), atleast_oofun(b), atleast_oofun(func)
 
-    def f(point=None):
-
-        p2 = point.copy()
-        #if integration_var not in p2:
-            #p2[integration_var] = 0.0 # to ajust size, currently only R^1 is implemented
-        #T = FuncDesignerTranslator(p2)
-        def vect_func(x):
-            p2[integration_var] = x
-            tmp = func(p2)
-            if np.isscalar(tmp): return tmp
-            elif tmp.size == 1: return np.asscalar(tmp)
-            else: FuncDesignerException('incorrect data type, probably bug in uncDesigner kernel')
-    #vect_func = lambda x: func(T.vector2point(x))
-
-        # TODO: better handling of fixed variables
-        return integrate.quad(vect_func, a(point), b(point), **kwargs)[0]
-       
-#    def aux_f(point):
-#        point = oopoint(_point)
-#        if a(point).size != b(point).size: raise FuncDesignerException('sizes of point-from and point-to must be equal')
-#        if a(point).size != 1 or b(point).size != 1:  raise FuncDesignerException('currently integration is implemented for single variable only')
-#        dep = a._getDep() | b._getDep() | func._getDep()
-#        involved_vars = set(point.keys()).add(integration_var)
-#        if not dep.issubset(involved_vars): raise FuncDesignerException('user-provided point for integration has no information on some variables')
-#        
-#        p2 = point.copy()
-#        if integration_var not in p2:
-#            p2[integration_var] = 0.0 # to ajust size, currently only R^1 is implemented
-#        T = FuncDesignerTranslator(p2)
-#        vect_func = lambda x: func(T.vector2point(x))
-        
-    
-    # TODO: derivatives
-    # !!!!!!!!!!!!! TODO: derivatives should not be zeros! Fix it!
-    r = oofun(f, None) 
-    r.fun = lambda *args: f(point=r._Point)
-    
-    # TODO : use decorators here
-    tmp_f = r._getFunc
-    tmp_D = r._D
-    def aux_f(*args,  **kwargs):
-        if isinstance(args[0], dict):
-            r._Point = args[0]
-        return tmp_f(*args,  **kwargs)
-    def aux_D(*args,  **kwargs):
-        raise FuncDesignerException('derivatives from scipy_quad are not implemented yet')
-        if isinstance(args[0], dict):
-            r._Point = args[0]
-        return tmp_D(*args,  **kwargs)
-    r._getFunc = aux_f
-    r._D = aux_D
-    
+    # bounds are calculated in the involved point, thus they can depend on integration_var as well
+    dep = _dep(func)
+    dep.discard(integration_var)
+    for elem in (a, b):
+        dep.update(_dep(elem))
+    Vars = sorted(dep, key = lambda v: v._id)
+
+    I = gaussKronrod(func, integration_var, a, b, Vars, adaptive, panels, epsabs, epsrel, limit)
+    if len(Vars) == 0:
+        return atleast_oofun(I.value(()))
+    r = oofun(lambda *vals: I.value(vals), input = Vars, d = tuple(I.partialDerivative(i) for i in range(len(Vars))))
     return r
 
-#    r = oofun(lambda x, y: integrate.quad(func, x, y, **kwargs)[0], input = [a, b])
-#    r.d = (lambda x, y: -func(x), lambda x, y: func(y))
-#    return r
-    
-#def 
-    
+class gaussKronrod:
+    def __init__(self, func, t, a, b, Vars, adaptive, panels, epsabs, epsrel, limit):
+        self.func, self.t, self.a, self.b, self.Vars = func, t, a, b, Vars
+        self.funcVarsInd = [i for i, v in enumerate(Vars) if v is not t]
+        self.funcVars = [Vars[i] for i in self.funcVarsInd]
+        self.adaptive, self.epsabs, self.epsrel, self.limit = adaptive, epsabs, epsrel, limit
+        self.edges = np.linspace(0.0, 1.0, panels + 1)
+        self.vectorized = True
+        self.vectorizedD = None # indexes of funcVars with multipoint derivatives, chosen on 1st call
+        self._key = None
+
+    def _point(self, vals):
+        return oopoint(dict(zip(self.Vars, vals)))
+
+    def _bounds(self, point):
+        a, b = np.asarray(self.a(point), 'float').ravel(), np.asarray(self.b(point), 'float').ravel()
+        if a.size != 1 or b.size != 1:
+            raise FuncDesignerException('integration bounds must be scalars')
+        return a[0], b[0]
+
+    def _multiPoint(self, point, X):
+        P = dict(point)
+        P[self.t] = X.view(multiarray)
+        P = ooMultiPoint(P)
+        P.N = X.size
+        return P
+
+    def _values(self, point, X):
+        # func values at nodes X
+        if self.vectorized:
+            P = self._multiPoint(point, X)
+            try:
+                F = np.asarray(self.func(P), 'float').ravel()
+                if F.size == 1:
+                    F = np.tile(F, X.size)
+                if F.size == X.size:
+                    return F
+            except (FuncDesignerException, ValueError, TypeError, IndexError):
+                pass
+            self.vectorized = False
+        F = np.array([np.asarray(self.func(self._nodePoint(point, x)), 'float').ravel()[0] for x in X])
+        return F
+
+    def _funcDerivatives(self, point, X):
+        # d func / d v at nodes X for v in funcVars, arrays of shape (X.size, size(v))
+        sizes = [np.asarray(point[v]).size for v in self.funcVars]
+        if self.vectorizedD is None:
+            # multipoint derivatives may be unavailable (e.g. by oovars of size > 1) or wrong for some oofuns,
+            # thus oovars they are used for are chosen once, by comparison with derivatives on a node
+            self.vectorizedD = []
+            for ind in (list(range(len(sizes))), [i for i, size in enumerate(sizes) if size == 1]):
+                r = self._multiPointDerivatives(point, X, ind, sizes)
+                if r is not None and all(np.allclose(r[i][-1], elem[0], rtol = 1e-8, atol = 1e-12) \
+                                         for i, elem in zip(ind, self._nodesDerivatives(point, X[-1:], ind, sizes))):
+                    self.vectorizedD = ind
+                    break
+        ind = self.vectorizedD
+        r = self._multiPointDerivatives(point, X, ind, sizes) if len(ind) else None
+        if r is None:
+            r, ind = [None] * len(sizes), []
+        rest = [i for i in range(len(sizes)) if i not in ind]
+        if len(rest):
+            for i, elem in zip(rest, self._nodesDerivatives(point, X, rest, sizes)):
+                r[i] = elem
+        return r
+
+    def _multiPointDerivatives(self, point, X, ind, sizes):
+        # returns list with derivatives at indexes ind, None if they can't be obtained by multipoint evaluation
+        r = [None] * len(sizes)
+        try:
+            D = self.func.D(self._multiPoint(point, X), Vars = [self.funcVars[i] for i in ind])
+            for i in ind:
+                r[i] = _nodesBlock(D.get(self.funcVars[i], 0.0), X.size, sizes[i])
+        except (FuncDesignerException, ValueError, TypeError, IndexError):
+            return None
+        return r if all(r[i] is not None for i in ind) else None
+
+    def _nodesDerivatives(self, point, X, ind, sizes):
+        r = [np.zeros((X.size, sizes[i])) for i in ind]
+        Vars = [self.funcVars[i] for i in ind]
+        for j, x in enumerate(X):
+            D = self.func.D(self._nodePoint(point, x), Vars = Vars)
+            for k, v in enumerate(Vars):
+                tmp = D.get(v, None)
+                if tmp is not None:
+                    r[k][j] = _nodesBlock(tmp, 1, sizes[ind[k]])[0]
+        return r
+
+    def _nodePoint(self, point, x):
+        r = dict(point)
+        r[self.t] = x
+        return oopoint(r)
+
+    def _mapping(self, a, b):
+        # returns function u -> (x, dx/du) mapping (0, 1) onto (a, b)
+        if np.isfinite(a) and np.isfinite(b):
+            return lambda u: (a + (b-a) * u, np.tile(b-a, u.size))
+        sign = 1.0
+        if a > b:
+            a, b, sign = b, a, -1.0
+        if np.isfinite(a):
+            return lambda u: (a + u / (1.0 - u), sign / (1.0 - u) ** 2)
+        elif np.isfinite(b):
+            return lambda u: (b - (1.0 - u) / u, sign / u ** 2)
+        def f(u):
+            s = 2.0 * u - 1.0
+            return s / (1.0 - s ** 2), sign * 2.0 * (1.0 + s ** 2) / (1.0 - s ** 2) ** 2
+        return f
+
+    def _nodes(self, lo, hi, mapping):
+        half = 0.5 * (hi - lo)
+        U = (0.5 * (hi + lo))[:, None] + half[:, None] * _xk
+        X, J = mapping(U.ravel())
+        return X, half, J.reshape(-1, _nK)
+
+    def _panels(self, point, lo, hi, mapping):
+        X, half, J = self._nodes(lo, hi, mapping)
+        F = self._values(point, X).reshape(-1, _nK) * J
+        resk, resg = F.dot(_wk), F.dot(_wg)
+        resasc = half * np.abs(F - 0.5 * resk[:, None]).dot(_wk)
+        resabs = half * np.abs(F).dot(_wk)
+        err = np.abs((resk - resg) * half)
+        ind = (resasc != 0) & (err != 0)
+        err[ind] = resasc[ind] * np.minimum(1.0, (200.0 * err[ind] / resasc[ind]) ** 1.5)
+        return half * resk, np.maximum(err, 50 * _epmach * resabs)
+
+    def _integrate(self, vals):
+        key = np.hstack([np.asarray(v, 'float').ravel() for v in vals]) if len(vals) else np.zeros(0)
+        if self._key is not None and np.array_equal(key, self._key):
+            return
+        point = self._point(vals)
+        a, b = self._bounds(point)
+        self._point_, self._ab, self._key = point, (a, b), key
+        self._derivatives = None
+        if a == b:
+            self._lo = self._hi = np.zeros(0)
+            self._val = 0.0
+            return
+        mapping = self._mapping(a, b)
+        lo, hi = self.edges[:-1], self.edges[1:]
+        val, err = self._panels(point, lo, hi, mapping)
+        while self.adaptive:
+            total, totalErr = val.sum(), err.sum()
+            tol = max(self.epsabs, self.epsrel * abs(total))
+            if not totalErr > tol:
+                break
+            if lo.size >= self.limit:
+                pWarn('integrator: max number of panels (limit = %d) has been reached, required accuracy may be not achieved' % self.limit)
+                break
+            # bisect panels with largest errors until the remaining ones have sum of errors <= tol/2
+            ind = np.argsort(err)[::-1]
+            remaining = totalErr - np.cumsum(err[ind])
+            n = min(np.searchsorted(-remaining, -0.5 * tol) + 1, self.limit - lo.size)
+            ind = ind[:n]
+            keep = np.ones(lo.size, bool)
+            keep[ind] = False
+            mid = 0.5 * (lo[ind] + hi[ind])
+            newLo, newHi = np.hstack((lo[ind], mid)), np.hstack((mid, hi[ind]))
+            newVal, newErr = self._panels(point, newLo, newHi, mapping)
+            lo, hi = np.hstack((lo[keep], newLo)), np.hstack((hi[keep], newHi))
+            val, err = np.hstack((val[keep], newVal)), np.hstack((err[keep], newErr))
+        if self.adaptive:
+            # next call starts from the coarsened partition, thus it can be both refined and coarsened
+            edges = np.sort(lo)[::2]
+            self.edges = np.append(edges, 1.0)
+        self._lo, self._hi, self._mapping_ = lo, hi, mapping
+        self._val = val.sum()
+
+    def value(self, vals):
+        self._integrate(vals)
+        return self._val
+
+    def derivative(self, vals):
+        # Leibniz rule: integral of d func / d v  + func(b) * db/dv - func(a) * da/dv
+        self._integrate(vals)
+        if self._derivatives is not None:
+            return self._derivatives
+        point, Vars = self._point_, self.Vars
+        r = [np.zeros(np.asarray(v).size) for v in vals]
+
+        if self._lo.size:
+            X, half, J = self._nodes(self._lo, self._hi, self._mapping_)
+            W = (half[:, None] * _wk * J).ravel()
+            for i, block in zip(self.funcVarsInd, self._funcDerivatives(point, X)):
+                r[i] += W.dot(block)
+
+        for bound, x, sign in ((self.a, self._ab[0], -1.0), (self.b, self._ab[1], 1.0)):
+            if not _dep(bound) or not np.isfinite(x):
+                continue
+            fx = self._values(point, np.array([x]))[0]
+            self._addDerivative(r, bound.D(point, Vars = Vars), sign * fx)
+
+        self._derivatives = r
+        return r
+
+    def partialDerivative(self, i):
+        return lambda *vals: self.derivative(vals)[i]
+
+    def _addDerivative(self, r, D, w):
+        for i, v in enumerate(self.Vars):
+            tmp = D.get(v, None)
+            if tmp is None:
+                continue
+            if hasattr(tmp, 'toarray'):
+                tmp = tmp.toarray()
+            r[i] += w * np.asarray(tmp, 'float').ravel()
+
+
+def _nodesBlock(tmp, N, size):
+    # derivative by oovar of size "size" on N nodes -> array (N, size), None if its shape is unexpected
+    if hasattr(tmp, 'toarray'):
+        tmp = tmp.toarray()
+    tmp = np.asarray(tmp, 'float')
+    if tmp.size == size:
+        return np.tile(tmp.ravel(), (N, 1))
+    elif tmp.size == N * size:
+        return tmp.reshape(N, size)
+    return None
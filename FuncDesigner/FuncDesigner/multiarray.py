@@ -1,4 +1,4 @@
-import numpy as np, operator as o
+import numpy as np, operator as o, re
 from numpy import ndarray
 from FuncDesigner.FDmisc import FuncDesignerException
 from baseClasses import *
@@ -45,11 +45,9 @@ class multiarray(MultiArray):
     __str__ = lambda self: str(self.view(ndarray))
     
     def __getitem__(self, ind): 
-#        if self.ndim <= 1:
-#            if ind is 0:
-#                return self
-#            else:
-#                print('multiarray ind:', ind)
+        if self.ndim <= 1 and not isinstance(ind, (slice, tuple)) and ind == 0:
+            # scalar value in each point
+            return self
         return self.view(np.ndarray)[:, ind].view(multiarray)  if type(ind) in (int, np.int32, np.int64, np.int16, np.int8) \
         else self.__getslice__(ind.start, ind.stop) if type(ind) != tuple \
         else self.__getslice__(ind[0], ind[1])
@@ -80,6 +78,67 @@ class multiarray(MultiArray):
             raise FuncDesignerException('keyword arguments for FD multiarray sum are not implemened yet')
         tmp = self.reshape(-1, 1) if self.ndim < 2 else self
         return np.sum(tmp.view(ndarray), 1).view(multiarray)
+        
+    prod = lambda self, *args, **kw: pointwise_reduce(self, np.prod, 'prod', args, kw)
+    max = lambda self, *args, **kw: pointwise_reduce(self, np.max, 'max', args, kw)
+    min = lambda self, *args, **kw: pointwise_reduce(self, np.min, 'min', args, kw)
+
+def pointwise_reduce(x, func, name, args, kw):
+    if any(v is not None for v in args) or any(v is not None for v in kw.values()):
+        raise FuncDesignerException('arguments for FD multiarray %s are not implemened yet' % name)
+    tmp = x.reshape(-1, 1) if x.ndim < 2 else x
+    return func(tmp.view(ndarray), 1).view(multiarray)
+
+def points_number(args):
+    # number of points in multiarrays from args (None if there are no multiarrays)
+    for arg in args:
+        if isinstance(arg, multiarray):
+            return arg.shape[0]
+    return None
+
+def as_2d(x, N):
+    # returns ndarray of shape (N, size) with values of x in each of N points
+    if isinstance(x, multiarray):
+        x = x.view(ndarray)
+        return x.reshape(-1, 1) if x.ndim < 2 else x
+    x = np.asarray(x)
+    return np.tile(x.reshape(1, -1), (N, 1))
+
+_signatures = {}
+def parse_signature(signature):
+    # '(n),(n)->()' -> ((1, 1), 0), i.e. numbers of core dimensions of inputs and output
+    r = _signatures.get(signature, None)
+    if r is not None:
+        return r
+    try:
+        Inputs, Output = signature.replace(' ', '').split('->')
+        dims = lambda s: [len([d for d in elem.split(',') if d != '']) for elem in re.findall(r'\(([^()]*)\)', s)]
+        inputs, output = dims(Inputs), dims(Output)
+        assert len(output) == 1
+    except:
+        raise FuncDesignerException('incorrect oofun signature "%s", should be like "(n),(n)->()"' % signature)
+    if any(d > 1 for d in inputs + output):
+        raise FuncDesignerException('FuncDesigner oofun signature core dimensions number cannot exceed 1, got "%s"' % signature)
+    r = _signatures[signature] = (tuple(inputs), output[0])
+    return r
+
+def signature_call(fun, signature, Input, args, N):
+    # evaluates fun once for all N points, stacked along 1st axis as for numpy generalized ufuncs
+    inputs, output = parse_signature(signature)
+    if len(inputs) != len(Input):
+        raise FuncDesignerException('oofun signature "%s" declares %d inputs, while %d are involved' % (signature, len(inputs), len(Input)))
+    Args = []
+    for inp, d in zip(Input, inputs):
+        tmp = as_2d(inp, N)
+        if d == 0:
+            if tmp.shape[1] != 1:
+                raise FuncDesignerException('oofun signature "%s" declares scalar input, while array of size %d is obtained' % (signature, tmp.shape[1]))
+            tmp = tmp.reshape(N)
+        Args.append(tmp)
+    r = np.asarray(fun(*(Args + list(args))))
+    if r.shape[:1] != (N, ):
+        raise FuncDesignerException('oofun with signature "%s" returned array of shape %s for %d points' % (signature, r.shape, N))
+    return r.view(multiarray)
 
 def multiarray_op(x, y, op):
     if isinstance(y, Stochastic):
@@ -30,8 +30,8 @@ raise_except, DiagonalType, isPyPy, formResolveSchedule, Len, SP_eye, SparseMatr
 isspmatrix, Hstack
 
 from ooPoint import ooPoint
-from FuncDesigner.multiarray import multiarray
-from derivativeMisc import getDerivativeSelf, mul_aux_d, _D
+from FuncDesigner.multiarray import multiarray, points_number, as_2d, signature_call
+from derivativeMisc import getDerivativeSelf, mul_aux_d, _D, _D_reverse
 from Interval import Interval, mul_interval, pow_const_interval, pow_oofun_interval, div_interval, \
 add_interval, add_const_interval, neg_interval, defaultIntervalEngine#, rdiv_interval
 #import inspect
@@ -83,6 +83,10 @@ class oofun(OOFun):
     _lastOrderVarsID = 0
     criticalPoints = lambda *args, **kw: raise_except('bug in FD kernel')
     vectorized = False
+    
+    # numpy generalized ufunc-like signature, e.g. '(n),(n)->()' or '()->()';
+    # if provided, fun is evaluated once for all points of ooMultiPoint with inputs stacked along 1st axis
+    signature = None
 #    getDefiniteRange = None
     _neg_elem = None # used in render into quadratic 
     
@@ -398,6 +402,7 @@ class oofun(OOFun):
             
             if isscalar(other) or asarray(other).size == 1 or ('size' in self.__dict__ and self.size is asarray(other).size):
                 r._D = lambda *args,  **kwargs: self._D(*args,  **kwargs) 
+                r._linearFactor = 1.0 # used in reverse-mode differentiation
         r.vectorized = True
         r.expression = lambda *args, **kw: add_expression(self, other, *args, **kw)
         return r
@@ -416,6 +421,7 @@ class oofun(OOFun):
         r._getFuncCalcEngine = lambda *args,  **kwargs: -self._getFuncCalcEngine(*args,  **kwargs)
         r.getOrder = self.getOrder
         r._D = lambda *args, **kwargs: dict((key, -value) for key, value in self._D(*args, **kwargs).items())
+        r._linearFactor = -1.0
         r.d = raise_except
         r.vectorized = True
         r._interval_ = lambda *args, **kw: neg_interval(self, *args, **kw)
@@ -480,6 +486,7 @@ class oofun(OOFun):
 #            if other.size == 1 or 'size' in self.__dict__ and self.size in (1, other.size):
             if other.size == 1:
                 r._D = lambda *args, **kwargs: dict((key, value/other) for key, value in self._D(*args, **kwargs).items())
+                r._linearFactor = 1.0 / other
                 r.d = raise_except
             
         # r.discrete = self.discrete and (?)
@@ -575,6 +582,7 @@ class oofun(OOFun):
 
             if isscalar(other) or asarray(other).size == 1:  # other may be array-like
                 r._D = lambda *args, **kwargs: dict((key, value * other) for key, value in self._D(*args, **kwargs).items())
+                r._linearFactor = other
                 r.d = raise_except
             else:
                 r.d = lambda x: mul_aux_d(x, other)
@@ -738,7 +746,7 @@ class oofun(OOFun):
                     r[ind] = 1
                 return r
         expression = lambda *args, **kw: getitem_expression(self, ind, *args, **kw)
-        r = oofun(f, self, d = d, size = 1, getOrder = self.getOrder, expression = expression)
+        r = oofun(f, self, d = d, size = 1, getOrder = self.getOrder, expression = expression, vectorized = not isinstance(ind, oofun))
         # TODO: check me!
         # what about a[a.size/2:]?
             
@@ -778,7 +786,7 @@ class oofun(OOFun):
                 r = hstack((m1, m2, m3))
             return r
         expression = lambda *args, **kw: getitem_expression(self, slice(ind1, ind2), *args, **kw)
-        r = oofun(f, self, d = d, getOrder = self.getOrder, expression = expression)
+        r = oofun(f, self, d = d, getOrder = self.getOrder, expression = expression, vectorized = True)
 
         return r
    
@@ -802,13 +810,13 @@ class oofun(OOFun):
             lb_ub, definiteRange = self._interval(domain, dtype)
             lb, ub = lb_ub[0], lb_ub[1]
             return vstack((npSum(lb, 0), npSum(ub, 0))), definiteRange
-        r = oofun(npSum, self, getOrder = self.getOrder, _interval_ = interval, d=d)
+        r = oofun(npSum, self, getOrder = self.getOrder, _interval_ = interval, d=d, vectorized = True)
         r.expression = lambda *args, **kw: 'sum(' + self.expression(**kw) + ')'
         return r
     
     def prod(self):
         # TODO: consider using r.isCostly = True
-        r = oofun(prod, self)
+        r = oofun(prod, self, vectorized = True)
         # TODO: IMPLEMENT IT 
         #r.getOrder = lambda *args, **kwargs: self.getOrder(*args, **kwargs)*self.size
         def d(x):
@@ -1064,7 +1072,10 @@ class oofun(OOFun):
         Input = self._getInput(*args, **kwargs) 
         
 #        if not isinstance(x, ooPoint) or not x.isMultiPoint or (self.vectorized and not any([isinstance(inp, Stochastic) for inp in Input])):
-        if not PythonAny(isinstance(inp, multiarray) for inp in Input) or self.vectorized:
+        N = points_number(Input)
+        if N is not None and self.signature is not None:
+            tmp = signature_call(self.fun, self.signature, Input, self.args, N)
+        elif N is None or self.vectorized:
             if self.args != ():
                 Input += self.args
             Tmp = self.fun(*Input)
@@ -1072,14 +1083,13 @@ class oofun(OOFun):
                 tmp = hstack(Tmp) if len(Tmp) > 1 else Tmp[0]
             else:
                 tmp = Tmp
+            if N is not None and type(tmp) == ndarray:
+                tmp = tmp.view(multiarray)
         else:
-            if hasattr(x, 'N'):
-                N = x.N
-            else:
-                # TODO: fix it for x.values() is Stochastic
-                N = PythonMax([1] + [inp.size for inp in Input if type(inp) == ndarray])
-
-            Temp = [inp.flatten().tolist() if isinstance(inp, multiarray) else [inp]*N for inp in Input]
+            # TODO: fix it for x.values() is Stochastic
+            Temp = [as_2d(inp, N) if isinstance(inp, multiarray) else [inp]*N for inp in Input]
+            # scalar values are passed as Python numbers, vector ones as 1-D arrays
+            Temp = [(inp.flatten().tolist() if inp.shape[1] == 1 else list(inp)) if type(inp) == ndarray else inp for inp in Temp]
             inputs = zip(*Temp)
             
             # Check it!
@@ -1138,9 +1148,24 @@ class oofun(OOFun):
     """                                                getFunc                                             """
     __call__ = _getFunc
 
+    def compile(self, Vars = None, fixedVars = None, fixedVarsScheduleID = -1):
+        '''
+        returns compiled evaluation plan of the oofun, callable on points like the oofun itself:
+        f2 = f.compile(); f2(point)
+        If Vars or fixedVars are provided, subtrees depending on fixed variables only
+        are computed on first call and then reused (use f2.reset() if their values are changed)
+        '''
+        from compiled import compiledOOFun
+        if isinstance(Vars, oofun): Vars = [Vars]
+        if isinstance(fixedVars, oofun): fixedVars = [fixedVars]
+        return compiledOOFun(self, Vars, fixedVars, fixedVarsScheduleID)
+
 
     """                                              derivatives                                           """
-    def D(self, x, Vars=None, fixedVars = None, resultKeysType = 'vars', useSparse = False, exactShape = False, fixedVarsScheduleID = -1):
+    def D(self, x, Vars=None, fixedVars = None, resultKeysType = 'vars', useSparse = False, exactShape = False, fixedVarsScheduleID = -1, mode = 'auto'):
+        # mode: 'forward' | 'reverse' | 'auto' (reverse for oofuns with output size much less than number of variables)
+        if mode not in ('auto', 'forward', 'reverse'):
+            raise FuncDesignerException('incorrect differentiation mode "%s", should be "auto", "forward" or "reverse"' % mode)
         
         # resultKeysType doesn't matter for the case isinstance(Vars, oovar)
         if Vars is not None and fixedVars is not None:
@@ -1163,7 +1188,10 @@ class oofun(OOFun):
                 if not fixedVars.is_oovar:
                     raise FuncDesignerException('argument fixedVars is expected as oovar or python list/tuple of oovar instances')
                 fixedVars = set([fixedVars])
-        r = self._D(x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse)
+        if mode == 'forward':
+            r = self._D(x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse)
+        else:
+            r = _D_reverse(self, x, fixedVarsScheduleID, Vars, fixedVars, useSparse = useSparse, auto = mode == 'auto')
         r = dict((key, (val if type(val)!=DiagonalType else val.resolve(useSparse))) for key, val in r.items())
         is_oofun = isinstance(initialVars, oofun)
         if is_oofun and not initialVars.is_oovar:
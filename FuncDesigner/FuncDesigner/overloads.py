@@ -10,7 +10,7 @@ from ooarray import ooarray
 from Interval import nonnegative_interval, ZeroCriticalPointsInterval, \
 box_1_interval, defaultIntervalEngine
 from numpy import atleast_1d, logical_and
-from FuncDesigner.multiarray import multiarray
+from FuncDesigner.multiarray import multiarray, points_number, as_2d
 from boundsurf import boundsurf, surf, devided_interval, boundsurf_join, split, merge_boundsurfs
 from boundsurf2 import boundsurf2, surf2
     
@@ -756,10 +756,26 @@ def log2(inp):
 __all__ += ['log', 'log2', 'log10']
 
 
+def multiarray_reduce(func, args):
+    # reduces ufunc (e.g. np.maximum) over scalar values of args in each point
+    N = points_number(args)
+    return func.reduce(np.hstack([as_2d(arg, N) for arg in args]), 1).view(multiarray)
+
+def multiarray_where(condition, val1, val2):
+    N = points_number((condition, val1, val2))
+    Val1, Val2 = as_2d(val1, N), as_2d(val2, N)
+    r = np.where(as_2d(condition, N) != 0, Val1, Val2)
+    return (r.reshape(N) if r.shape[1] == 1 else r).view(multiarray)
+
 def f_dot(x, y):
     if x.size == 1 or y.size == 1:
         return x*y
-    if isinstance(y, multiarray) and not isinstance(x, multiarray):
+    if isinstance(y, multiarray):
+        if isinstance(x, multiarray):
+            X, Y = x.view(np.ndarray), y.view(np.ndarray)
+            if X.ndim < 2 or Y.ndim < 2:
+                return x*y
+            return np.sum(X*Y, 1).view(multiarray)
         return dot(x, y.T).T
     return np.dot(x, y)
 
@@ -773,7 +789,7 @@ def d_dot(x, y):
 
 def dot(inp1, inp2):
     if not isinstance(inp1, oofun) and not isinstance(inp2, oofun): return np.dot(inp1, inp2)
-    r = oofun(f_dot, [inp1, inp2], d=(lambda x, y: d_dot(x, y), lambda x, y: d_dot(y, x)), engine = 'dot')
+    r = oofun(f_dot, [inp1, inp2], d=(lambda x, y: d_dot(x, y), lambda x, y: d_dot(y, x)), engine = 'dot', vectorized = True)
     r.getOrder = lambda *args, **kwargs: (inp1.getOrder(*args, **kwargs) if isinstance(inp1, oofun) else 0) + (inp2.getOrder(*args, **kwargs) if isinstance(inp2, oofun) else 0)
     #r.isCostly = True
     return r
@@ -785,7 +801,7 @@ def cross_d(x, y):
 def cross(a, b):
     if not isinstance(a, oofun) and not isinstance(b, oofun): return np.cross(a, b)
    
-    r = oofun(np.cross, [a, b], d=(lambda x, y: -cross_d(x, y), lambda x, y: cross_d(y, x)), engine = 'cross')
+    r = oofun(np.cross, [a, b], d=(lambda x, y: -cross_d(x, y), lambda x, y: cross_d(y, x)), engine = 'cross', vectorized = True)
     r.getOrder = lambda *args, **kwargs: \
     (a.getOrder(*args, **kwargs) if isinstance(a, oofun) else 0)\
     + (b.getOrder(*args, **kwargs) if isinstance(b, oofun) else 0)
@@ -1200,6 +1216,7 @@ def sum(inp, *args, **kwargs):
         r.vectorized = True
         r_dep = r._getDep()
         r._D = lambda *args, **kw: sum_derivative(r, r0, INP, r_dep, *args, **kw)
+        r._linearFactor = 1.0 # used in reverse-mode differentiation
         r.isCostly = True
         
         def expression(*args, **kw):
@@ -1302,9 +1319,12 @@ def ifThenElse(condition, val1, val2, *args, **kwargs):
     if isinstance(condition, bool): 
         return Val1 if condition else Val2
     elif isinstance(condition, oofun):
-        f = lambda conditionResult, value1Result, value2Result: value1Result if conditionResult else value2Result
+        f = lambda conditionResult, value1Result, value2Result: \
+        (value1Result if conditionResult else value2Result) \
+        if points_number((conditionResult, value1Result, value2Result)) is None \
+        else multiarray_where(conditionResult, value1Result, value2Result)
         # !!! Don't modify it elseware function will evaluate both expressions despite of condition value 
-        r = oofun(f, [condition, val1, val2], engine = 'ifThenElse')
+        r = oofun(f, [condition, val1, val2], engine = 'ifThenElse', vectorized = True)
         r.D = lambda point, *args, **kwargs: (Val1.D(point, *args, **kwargs) if isinstance(Val1, oofun) else {}) if condition(point) else \
         (Val2.D(point, *args, **kwargs) if isinstance(Val2, oofun) else {})
         r._D = lambda point, *args, **kwargs: (Val1._D(point, *args, **kwargs) if isinstance(Val1, oofun) else {}) if condition(point) else \
@@ -1346,9 +1366,10 @@ def max(inp,  *args,  **kwargs):
             lb_ub, definiteRange = inp._interval(domain, dtype)
             tmp1, tmp2 = lb_ub[0], lb_ub[1]
             return np.vstack((np.max(np.vstack(tmp1), 0), np.max(np.vstack(tmp2), 0))), np.all(definiteRange, 0)
-        r = oofun(f, inp, d = d, size = 1, _interval_ = interval)
+        r = oofun(f, inp, d = d, size = 1, _interval_ = interval, vectorized = True)
     elif type(inp) in (list, tuple, ooarray):
-        f = lambda *args: np.max([arg for arg in args])
+        f = lambda *args: np.max([arg for arg in args]) if points_number(args) is None \
+        else multiarray_reduce(np.maximum, args)
         def interval(domain, dtype):
             arg_inf, arg_sup, tmp, DefiniteRange = [], [], -np.inf, True
             for _inp in inp:
@@ -1365,7 +1386,7 @@ def max(inp,  *args,  **kwargs):
             r1[r1<tmp] = tmp
             r2[r2<tmp] = tmp
             return np.vstack((r1, r2)), DefiniteRange
-        r = oofun(f, inp, size = 1, _interval_ = interval, engine = 'max')
+        r = oofun(f, inp, size = 1, _interval_ = interval, engine = 'max', vectorized = True)
         def _D(point, *args, **kwargs):
             ind = np.argmax([(s(point) if isinstance(s, oofun) else s) for s in r.input])
             return r.input[ind]._D(point, *args, **kwargs) if isinstance(r.input[ind], oofun) else {}
@@ -1392,9 +1413,10 @@ def min(inp,  *args,  **kwargs):
             lb_ub, definiteRange = inp._interval(domain, dtype)
             tmp1, tmp2 = lb_ub[0], lb_ub[1]
             return np.vstack((np.min(np.vstack(tmp1), 0), np.min(np.vstack(tmp2), 0))), np.all(definiteRange, 0)
-        r = oofun(f, inp, d = d, size = 1, _interval_ = interval)
+        r = oofun(f, inp, d = d, size = 1, _interval_ = interval, vectorized = True)
     elif type(inp) in (list, tuple, ooarray):
-        f = lambda *args: np.min([arg for arg in args])
+        f = lambda *args: np.min([arg for arg in args]) if points_number(args) is None \
+        else multiarray_reduce(np.minimum, args)
         def interval(domain, dtype):
             arg_inf, arg_sup, tmp, DefiniteRange = [], [], np.inf, True
             for _inp in inp:
@@ -1412,7 +1434,7 @@ def min(inp,  *args,  **kwargs):
                 r2[r2>tmp] = tmp
             return np.vstack((r1, r2)), DefiniteRange
             
-        r = oofun(f, inp, size = 1, _interval_ = interval, engine = 'min')
+        r = oofun(f, inp, size = 1, _interval_ = interval, engine = 'min', vectorized = True)
         def _D(point, *args, **kwargs):
             ind = np.argmin([(s(point) if isinstance(s, oofun) else s) for s in r.input])
             return r.input[ind]._D(point, *args, **kwargs) if isinstance(r.input[ind], oofun) else {}
@@ -1445,7 +1467,11 @@ def hstack(tup): # overload for oofun[ind]
     if not any(c):
         return np.hstack(tup)
     #an_oofun_ind = np.where(c)[0][0]
-    f = lambda *x: np.hstack(x).flatten()
+    def f(*x):
+        N = points_number(x)
+        if N is None:
+            return np.hstack(x).flatten()
+        return np.hstack([as_2d(elem, N) for elem in x]).view(multiarray)
     
     
   
@@ -1475,7 +1501,7 @@ def hstack(tup): # overload for oofun[ind]
         return np.max(orders)
     
             
-    r = oofun(f, tup, getOrder = getOrder, engine = 'hstack')
+    r = oofun(f, tup, getOrder = getOrder, engine = 'hstack', vectorized = True)
     
     #!!!!!!!!!!!!!!!!! TODO: sparse 
 
@@ -0,0 +1,18 @@
+from FuncDesigner import *
+a, b, c = oovars('a', 'b', 'c')
+f = sin(a)*cos(b) + 2*a + [1, 2, 3]
+g = f + f*b + sum(f)**2 + exp(-c) + c*a/(b+1)
+point = {a:[1, 2, 3], b:[0.5, 0.1, 0.2], c:1.5}
+
+g2 = g.compile()
+print(g(point))
+print(g2(point))
+
+# subtrees depending on fixed variables only are computed once
+g3 = g.compile(fixedVars = c)
+print(g3(point))
+"""
+[ 398.13943292  401.85424545  406.24771093]
+[ 398.13943292  401.85424545  406.24771093]
+[ 398.13943292  401.85424545  406.24771093]
+"""
@@ -0,0 +1,15 @@
+from FuncDesigner import *
+from numpy import array
+a, t, T, c = oovars('a', 't', 'T', 'c')
+point = {a: 0.7, T: 2.0, c: array([1.0, 2, 3])}
+
+# integrand and bounds can be oovars themselves
+print(integrator(a, (t, 0, 1))(point))
+f = integrator(sum(c*t) + a, (t, a, T))
+print(f(point))
+print(f.D(point))
+"""
+0.7
+11.44
+{a: -3.5999999999999996, T: 12.7, c: array([ 1.755,  1.755,  1.755])}
+"""
@@ -0,0 +1,26 @@
+from numpy import zeros
+from FuncDesigner import *
+from openopt import GLP
+
+# model of examples/exactGlobalNLP.py; interalg uses intervals of F and the constraints on halves of the boxes (see iqg.py),
+# the optimum obtained should be within fTol of the global one
+a, b, c = oovars(3)
+d = oovars(4)
+f1 = cos(5*a) + 0.2*(b-0.2)**2 +  exp(4*abs(c-0.9))
+f2 = 0.05*sum(sin(d-0.1*(a+b+c))) + 3 * abs(d[0] - 0.2)
+F =  f1 + f2 + 4 * abs(d[2] - 0.2)
+startPoint = {a:0.5, b:0.50123, c:0.5, d: zeros(4)}
+constraints = [a>0, a<1, b>0, b<1, c>0, c<1, d>-1, d<1, d[3] < 0.5]
+constraints += [
+                (a*b + sin(c) < 0.5)(tol=1e-5),
+                d < cos(a) + 0.5,
+                cos(d[0]) +a < sin(d[3]) + b,
+                (d[1] + c == 0.7)(tol=1e-3)
+                ]
+p = GLP(F, startPoint, fTol = 0.0005, constraints = constraints, dataHandling='raw')
+r = p.minimize('interalg', iprint = -1)
+print(r.istop, '%0.3f' % r.ff)
+assert r.istop == 1000 and abs(r.ff - 5.5576598) < 0.0005
+"""
+(1000, '5.558')
+"""
@@ -0,0 +1,18 @@
+from FuncDesigner import *
+from FuncDesigner.multiarray import multiarray
+from numpy import array, sum as npSum
+a, c = oovar('a'), oovar('c', size = 3)
+A = array([0.5, 1.0, 1.5])
+C = array([[1.0, 2, 3], [4, 5, 6], [7, 8, 9]])
+
+# user function with numpy gufunc-like signature is called once for all points
+g = oofun(lambda x, y: npSum(x**2, -1) * y, [c, a], signature = '(n),()->()')
+f = sum(c) + dot(c, [1, 0, 1]) * a + max([a, c[1:2]]) + g
+
+point = ooMultiPoint({a: A.view(multiarray), c: C.view(multiarray)})
+print(f(point).flatten())
+print([f({a: A[i], c: C[i]}) for i in range(3)])
+"""
+[  17.  107.  347.]
+[array([ 17.]), array([ 107.]), array([ 347.])]
+"""
@@ -0,0 +1,21 @@
+from FuncDesigner import *
+from numpy import arange, abs, shape
+from scipy.sparse import isspmatrix
+a, b, c = oovars('a', 'b', 'c')
+f = sum(a**2) + sum(sin(b)*a) * c - sum(a[2:10]) / 3.0
+point = {a: arange(1.0, 41)/40, b: arange(1.0, 41)/20, c: 1.5}
+
+# derivatives by adjoint sweep are same to forward ones
+r1 = f.D(point, mode = 'forward')
+r2 = f.D(point, mode = 'reverse')
+print(max([abs(r1[v] - r2[v]).max() for v in (a, b, c)]) < 1e-12)
+print(r2[c])
+
+# useSparse = True yields same types and shapes as forward mode
+r3 = f.D(point, mode = 'reverse', useSparse = True)
+print([(isspmatrix(r3[v]), shape(r3[v])) for v in (a, b, c)] == [(isspmatrix(r1[v]), shape(r1[v])) for v in (a, b, c)])
+"""
+True
+17.8707203017
+True
+"""
@@ -17,6 +17,82 @@ try:
 except:
     count_nonzero = lambda elem: len(flatnonzero(asarray(elem)))
 
+class sparseJacobian:
+    '''
+    CSR matrix of derivatives of a function with respect to all the variables;
+    the structure is built once from derivative blocks of each variable 
+    (dense blocks are considered as full), on later calls values are written 
+    into the preallocated data array in place and the same matrix object is returned
+    '''
+    def __init__(self, derivativeItems, oovarsIndDict, funcLen, n):
+        # derivativeItems: list of (oovar, derivative) 
+        from scipy.sparse import csr_matrix
+        self.funcLen = funcLen
+        self.blocks = []
+        rows, cols = [], []
+        for oov, val in derivativeItems:
+            ind_start, ind_end = oovarsIndDict[oov]
+            if isspmatrix(val):
+                val = _canonicalCSR(val)
+                I, J = np.repeat(np.arange(funcLen), np.diff(val.indptr)), val.indices
+                self.blocks.append((oov, val.indptr.copy(), val.indices.copy()))
+            else:
+                m = ind_end - ind_start
+                I, J = np.repeat(np.arange(funcLen), m), np.tile(np.arange(m), funcLen)
+                self.blocks.append((oov, None, m))
+            rows.append(I)
+            cols.append(J + ind_start)
+        rows, cols = hstack(rows), hstack(cols)
+        
+        # positions of blocks values in CSR data array
+        self.perm = np.lexsort((cols, rows))
+        indptr = hstack((0, cumsum(np.bincount(rows, minlength = funcLen))))
+        self.matrix = csr_matrix((np.zeros(rows.size), cols[self.perm], indptr), shape = (funcLen, n))
+    
+    def fill(self, pointDerivative):
+        # returns None if structure of the derivative differs from the stored one
+        if len(pointDerivative) != len(self.blocks):
+            return None
+        vals = []
+        for oov, indptr, indices in self.blocks:
+            val = pointDerivative.get(oov, None)
+            if val is None or isspmatrix(val) != (indptr is not None):
+                return None
+            if indptr is None:
+                val = asarray(val)
+                if val.size != self.funcLen * indices:
+                    return None
+                vals.append(val.ravel())
+            else:
+                val = _canonicalCSR(val)
+                if not (array_equal(val.indptr, indptr) and array_equal(val.indices, indices)):
+                    return None
+                vals.append(val.data)
+        self.matrix.data[:] = hstack(vals)[self.perm]
+        return self.matrix
+
+def _canonicalCSR(val):
+    # sorted indices without duplicates
+    val = val.tocsr()
+    if not val.has_canonical_format:
+        val = val.copy()
+        val.sum_duplicates()
+    return val
+
+def cachedSparseJacobian(cache, func, pointDerivative):
+    # cache is dict id(func) -> (func, sparseJacobian); 
+    # func is kept to prevent reusing its id by other objects
+    # (oofun __eq__ is overloaded, thus func itself isn't used as the key)
+    elem = cache.get(id(func), None)
+    return None if elem is None else elem[1].fill(pointDerivative)
+
+def newSparseJacobian(cache, func, pointDerivative, oovarsIndDict, funcLen, n):
+    items = list(pointDerivative.items())
+    items.sort(key=lambda elem: elem[0]._id)
+    J = sparseJacobian(items, oovarsIndDict, funcLen, n)
+    cache[id(func)] = (func, J)
+    return J.fill(pointDerivative)
+
 def pointDerivative2array(S, pointDerivative,  **kw): 
     useSparse = kw.get('useSparse', S.useSparse) # useSparse can be True, False, 'auto'
     # TODO: print warning of involving dense for sparse cases
@@ -33,6 +109,12 @@ def pointDerivative2array(S, pointDerivative,  **kw):
     oovarsIndDict = S.oovarsIndDict
     n = S.n
     
+    if func is not None and useSparse is not False and len(pointDerivative) != 0:
+        # sparsity structure of the func has been obtained on a previous call
+        r = cachedSparseJacobian(S._jacobianStructures, func, pointDerivative)
+        if r is not None:
+            return r
+    
     if len(pointDerivative) == 0: 
         if func is not None:
             funcLen = func(point).size
@@ -58,6 +140,9 @@ def pointDerivative2array(S, pointDerivative,  **kw):
     else:
         involveSparse = useSparse
         
+    if involveSparse and func is not None:
+        return newSparseJacobian(S._jacobianStructures, func, pointDerivative, oovarsIndDict, funcLen, n)
+        
     if involveSparse:
         r2 = []
         if funcLen == 1:
@@ -151,6 +236,7 @@ class FuncDesignerTranslator:
         #assert 'freeVars' not in kwargs, 'only "fixedVars" and "freeVars" arguments are allowed, not "freeVars"'
         
         self.useSparse = kwargs.get('useSparse', False)
+        self._jacobianStructures = {}
         if isinstance(PointOrVariables, dict):
             Point = PointOrVariables
             Variables = list(Point.keys())
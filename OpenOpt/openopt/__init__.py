@@ -17,6 +17,7 @@ from GUI import manage
 from oologfcn import OpenOptException
 from nonOptMisc import oosolver
 from mfa import MFA
+from lpFiles import readMPS, readLP
 
 
 isE = False
@@ -1,6 +1,5 @@
 # Example of export OpenOpt LP to MPS file
-# you should have lpsolve and its Python binding properly installed
-# (you may take a look at the instructions from openopt.org/LP)
+# (fixed or free MPS format; p.exportToLP(filename) writes CPLEX LP file)
 
 # You can solve problems defined in MPS files 
 # with a variety of solvers at NEOS server for free
@@ -26,5 +25,10 @@ success = p.exportToMPS('asdf')
 # success is False if a error occurred (read-only file system, no write access, etc)
 # elseware success is True
 
+# MPS and CPLEX LP files can be read into LP or MILP (if integer columns are present):
+# from openopt import readMPS, readLP
+# p2 = readMPS('asdf.mps')
+# r = p2.solve('glpk')
+
 # objFunValue should be 204.48841578
 # x_opt should be [ 9.89355041 -8.          1.5010645 ]
@@ -1,6 +1,5 @@
 # Example of export OpenOpt MILP to MPS file
-# you should have lpsolve and its Python binding properly installed
-# (you may take a look at the instructions from openopt.org/LP)
+# (fixed or free MPS format; p.exportToLP(filename) writes CPLEX LP file)
 
 # You can solve problems defined in MPS files 
 # with a variety of solvers at NEOS server for free
@@ -1,7 +1,7 @@
 from ooMisc import assignScript
 from nonOptMisc import isspmatrix
 from baseProblem import MatrixProblem
-from numpy import asarray, ones, inf, dot, nan, zeros, isnan, any, vstack, array, asfarray
+from numpy import asarray, ones, inf, nan, zeros, isnan, any, vstack, array, asfarray
 from ooMisc import norm
 
 class LCP(MatrixProblem):
@@ -17,5 +17,5 @@ class LCP(MatrixProblem):
         self.x0 = zeros(2*len(self.q))
         
     def objFunc(self, x):
-        return norm(dot(self.M, x[x.size/2:]) +self.q - x[:x.size/2], inf)
+        return norm(self.M.dot(x[x.size/2:]) +self.q - x[:x.size/2], inf)
 
@@ -9,6 +9,8 @@ class LP(MatrixProblem):
     allowedGoals = ['minimum', 'min', 'max', 'maximum']
     showGoal = True
     _lp_prepared = False
+    _canRefreshFixedVars = True
+    fConst = 0.0 # constant term of objective function for non-FuncDesigner models
 
     def __init__(self, *args, **kwargs):
         self.goal = 'minimum'
@@ -22,19 +24,10 @@ class LP(MatrixProblem):
         MatrixProblem._Prepare(self)
         if self.x0 is None: self.x0 = zeros(self.n)
         if hasattr(self.f, 'is_oovar'): # hence is oofun or oovar
-            # freeVars and fixedVars are already rendered to both not-None here (if it's the case)
-            # but current .D() implementation doesn't allow to use both arguments
-            # BTW translator ignores fixed vars in derivatives, so passing fixedVars here can be omitted 
-            # but is performed for more safety wrt future changes
-            _f = self._point2vector(self.f.D(self._x0, fixedVars = self.fixedVars)) 
-            self.f, self._f = _f, self.f
-            self.user.f = (self._f, )
-            self._init_f_vector = _f # we don't take p.goal into account here
-            _c = self._f(self._x0) - dot(self.f, self.x0)
-            self._c = _c
+            self._renderObjective(self.f)
         else:
             self._init_f_vector = self.f # we don't take p.goal into account here
-            self._c = 0
+            self._c = -self.fConst if self.goal in ['max', 'maximum'] else self.fConst
         self.f = atleast_1d(self.f)
         if not hasattr(self, 'n'): self.n = len(self.f)
         #print 'lb:', self.lb, 'ub:', self.ub
@@ -50,6 +43,22 @@ class LP(MatrixProblem):
         if self.goal in ['max', 'maximum']:
             self.f = -asfarray(self.f)
             
+    def _renderObjective(self, f):
+        # freeVars and fixedVars are already rendered to both not-None here (if it's the case)
+        # but current .D() implementation doesn't allow to use both arguments
+        # BTW translator ignores fixed vars in derivatives, so passing fixedVars here can be omitted 
+        # but is performed for more safety wrt future changes
+        _f = self._point2vector(f.D(self._x0, fixedVars = self.fixedVars)) 
+        self.f, self._f = _f, f
+        self.user.f = (self._f, )
+        self._init_f_vector = _f # we don't take p.goal into account here
+        self._c = self._f(self._x0) - dot(self.f, self._point2vector(self._x0))
+    
+    def _refreshFixedVars(self, values):
+        MatrixProblem._refreshFixedVars(self, values)
+        if self.isFDmodel:
+            self._renderObjective(self._f)
+
     # TODO: handle this and SDP finalize in single func finalize_for_max
     def __finalize__(self):
         MatrixProblem.__finalize__(self)
@@ -92,27 +101,25 @@ class LP(MatrixProblem):
         return r
 
     def exportToMPS(self, filename, format='fixed', startIndex=0):
-        try: from lp_solve import lpsolve
-        except ImportError: self.err('To export LP/MILP in files you should have lpsolve and its Python binding properly installed')
-        
-        maxNameLength = 8 if format != 'free' else 255
-        handler = self.get_lpsolve_handler(maxNameLength, startIndex)
-        
-        # TODO: uncomment it
+        from lpFiles import writeMPS
         ext = 'mps' if not filename.endswith('MPS') and not filename.endswith('mps') else ''
         if ext != '': filename += '.' + ext
-        
-        if format=='fixed':
-            r = bool(lpsolve('write_mps', handler, filename) )
-        elif format=='free':
-            r = bool(lpsolve('write_freemps', handler, filename) )
-        else:
-            self.err('incorrect MPS format, should be "fixed" or "free"')
-        if r != True: 
+        try:
+            return writeMPS(self, filename, format, startIndex)
+        except IOError:
             self.warn('Failed to write MPS file, maybe read-only filesystem, incorrect path or write access is absent')
-            
-        lpsolve('delete_lp', handler) 
-        return r
+            return False
+
+    def exportToLP(self, filename, startIndex=0):
+        # CPLEX LP format
+        from lpFiles import writeLP
+        ext = 'lp' if not filename.endswith('LP') and not filename.endswith('lp') else ''
+        if ext != '': filename += '.' + ext
+        try:
+            return writeLP(self, filename, startIndex)
+        except IOError:
+            self.warn('Failed to write LP file, maybe read-only filesystem, incorrect path or write access is absent')
+            return False
 
     def get_lpsolve_handler(self, maxNameLength=255, startIndex=0):
         try: from lp_maker import lp_maker, lpsolve
@@ -143,34 +150,37 @@ class LP(MatrixProblem):
         
         # set variables names
         if self.isFDmodel:
-            assert not isinstance(self.freeVars, set), 'error in openopt kernel, inform developers'
-            #assert len(self.freeVars) == self.n, 'not implemented yet for oovars of size > 1'
-            #names = [oov.name for oov in self.freeVars]
-            x0 = self._x0
-            names = []
-            #assert not isinstance(self.freeVars,  set), 'error in openopt kernel, inform developers'
-            for oov in self.freeVars:
-                if oov.name.startswith('unnamed'):
-                    L('delete_lp')
-                    self.err('For exporting FuncDesigner models into MPS files you cannot have variables with names starting with "unnamed"')
-                if ' ' in oov.name:
-                    L('delete_lp')
-                    self.err('For exporting FuncDesigner models into MPS files you cannot have variables with spaces in names')
-                Size = asarray(x0[oov]).size
-                if Size == 1:
-                    Name = oov.name
-                    names.append(Name)
-                else:
-                    tmp = [(oov.name + ('_%d' % (startIndex+j))) for j in range(Size)]
-                    names += tmp
-                    Name = tmp[-1]
-                if maxNameLength < len(Name):
-                    L('delete_lp')
-                    self.err('incorrect name "%s" - for exporting FuncDesigner models into MPS files you cannot have variables with names of length > maxNameLength=%d'% maxNameLength)
-                    
+            try:
+                names = self._getColNames(maxNameLength, startIndex)
+            except:
+                L('delete_lp')
+                raise
             # TODO: check are names unique
             L('set_col_name', names) 
         return lp_handle
+    
+    def _getColNames(self, maxNameLength=255, startIndex=0):
+        if not self.isFDmodel:
+            return ['C%d' % (i+1) for i in range(self.n)]
+        assert not isinstance(self.freeVars, set), 'error in openopt kernel, inform developers'
+        x0 = self._x0
+        names = []
+        for oov in self.freeVars:
+            if oov.name.startswith('unnamed'):
+                self.err('For exporting FuncDesigner models into MPS files you cannot have variables with names starting with "unnamed"')
+            if ' ' in oov.name:
+                self.err('For exporting FuncDesigner models into MPS files you cannot have variables with spaces in names')
+            Size = asarray(x0[oov]).size
+            if Size == 1:
+                Name = oov.name
+                names.append(Name)
+            else:
+                tmp = [(oov.name + ('_%d' % (startIndex+j))) for j in range(Size)]
+                names += tmp
+                Name = tmp[-1]
+            if maxNameLength < len(Name):
+                self.err('incorrect name "%s" - for exporting FuncDesigner models into MPS files you cannot have variables with names of length > maxNameLength=%d'% (Name, maxNameLength))
+        return names
         
 def List(x):
     if isinstance(x, list): return x
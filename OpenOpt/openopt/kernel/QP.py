@@ -3,8 +3,7 @@ import NLP
 
 from ooMisc import isspmatrix
 from baseProblem import MatrixProblem
-from numpy import asfarray, dot, nan, zeros, isfinite, all, ravel, diag, isscalar, arange, ndarray
-from copy import copy as PythonCopy
+from numpy import asfarray, dot, nan, zeros, isfinite, all, ravel, isscalar, arange, ndarray
 
 
 class QP(MatrixProblem):
@@ -92,7 +91,7 @@ class QP(MatrixProblem):
 
 ff = lambda x, QProb: QProb.objFunc(x)
 def dff(x, QProb):
-    r = dot(QProb.H, x)
+    r = QProb.matMultVec(QProb.H, x)
     if all(isfinite(QProb.f)) : r += QProb.f
     return r
 
@@ -122,38 +121,23 @@ from nonOptMisc import scipyInstalled
 import numpy as np
 
 def quad_render(arg, p):
-#    from FuncDesigner import oofun
+    # renders quadratic oofun with scalar output into 0.5 x^T H x + f^T x + c;
+    # entries of H are collected as (i, j, v) triplets in single traversal of sums and products,
+    # H is assembled at once (scipy.sparse CSC or dense ndarray for small probs)
+    from FuncDesigner import oofun
     from FuncDesigner.ooPoint import ooPoint
     from FuncDesigner.baseClasses import OOArray
     if isinstance(arg, OOArray):
         assert arg.size == 1, 'quad_render works with oofuns with scalar output only'
         arg = arg.item()
-    #assert type(arg) == oofun, 'oofun input expected'
-    assert p.fixedVars is None, 'quadratic rendering is unimplemented for fixedVars yet'
     
-    optVarSizes = p._optVarSizes
-#    print(optVarSizes.values(), np.array(optVarSizes.values()))
-    assert all(np.array(list(optVarSizes.values())) == 1), 'quadratic rendering is unimplemented for oovar(size=n) yet, use oovars(n) instead'
-        
-    oovarsIndDict = p._oovarsIndDict
     n = p.n
-    
-    if 1 and scipyInstalled and p.useSparse is not False:
+    if scipyInstalled and p.useSparse is not False:
         useSparse = p.useSparse
         if useSparse == 'auto':
-            useSparse = p.n > 150
+            useSparse = n > 150
     else:
         useSparse = False
-        
-    if useSparse:
-        from scipy.sparse import lil_matrix
-        H = lil_matrix((n, n))
-    else:
-        H = np.zeros((n, n))
-    f = np.zeros(n)
-    c = 0.0
-    
-    startPoint = p._x0
     
     if p.fixedVars is None or (p.freeVars is not None and len(p.freeVars)<len(p.fixedVars)):
         order_kw = {'Vars': p.freeVarsSet}
@@ -162,145 +146,204 @@ def quad_render(arg, p):
         order_kw = {'fixedVars': p.fixedVarsSet}
         Z = dict((v, np.zeros_like(p._x0[v]) if v not in p._fixedVars else p._x0[v]) for v in p._x0.keys())
     Z = ooPoint(Z)
-    D_kwargs = p._D_kwargs
-    D_kwargs['useSparse'] = useSparse
     order_kw['fixedVarsScheduleID'] = p._FDVarsID 
+    R = _quadTriplets(p, Z, order_kw, oofun)
     
-#    D = arg.D(Z, **D_kwargs)
-    
-    elems = PythonCopy(arg._summation_elements) if arg._isSum else [arg]
-    
-    while(len(elems) != 0):
-        elem = elems.pop()
-        if np.isscalar(elem) or type(elem) == np.ndarray:
-            c += elem
+    R.push(arg, 1.0)
+    while len(R.stack) != 0:
+        elem, K = R.stack.pop()
+        if not isinstance(elem, oofun):
+            R.c += np.sum(K * np.asarray(elem)) if not isscalar(K) else K * np.sum(elem)
             continue
         order = elem.getOrder(**order_kw)
-        assert order <= 2, 'constant,linear or quadratic function is expected'
         if order == 0:
-            c += elem(startPoint)
+            R.c += np.sum(K * elem(Z))
         elif order == 1:
-            # TODO: mb rework fd.sum() to sum(linear) + sum(nonlin)
-            pointDerivative = elem.D(Z, **D_kwargs)
-            if len(pointDerivative) != 0:
-                # TODO: check iadd with different types (dense/sparse)
-                asdf(p, pointDerivative, useSparse, f)
-#                tmp = p._pointDerivative2array(pointDerivative, useSparse = useSparse)
-#                if hasattr(tmp, 'toarray'):
-#                    tmp = tmp.toarray()
-#                f += tmp.flatten()
-            c += elem(Z)
-        elif order == 2:
-            if elem._isProd:
-                prod_elements =  elem._prod_elements
-                last_prod_elem = prod_elements[-1]
-                lastElemIsScalar = np.isscalar(last_prod_elem) or\
-                    (type(last_prod_elem) == np.ndarray and last_prod_elem.size == 1)
-                L = len(prod_elements)
-                if L > 2:
-                    assert lastElemIsScalar, 'unimplemented yet'
-                    assert len(prod_elements) == 3
-                    elem1, elem2, koeff = prod_elements
-                    squared_elem = None
-                else:# L == 2:
-                    if lastElemIsScalar:
-                        koeff = last_prod_elem
-                        tmp = prod_elements[0]
-                        if tmp._isSum:
-                            elems += [koeff * Elem for Elem in tmp._summation_elements]
-                            continue
-                        else:
-                            squared_elem = tmp.input[0] if not tmp.is_oovar else tmp
-                        elem1 = elem2 = None
-                    else:
-                        koeff = None
-                        elem1, elem2 = prod_elements
-                        squared_elem = None
-                if elem2 is not None and elem2._isSum:
-                    elem1, elem2 = elem2, elem1
-                if elem1 is not None and elem1._isSum:
-                    Tmp = koeff*elem2 if koeff is not None else elem2
-                    elems += [Tmp * Elem for Elem in elem1._summation_elements]
-                    continue
-            
-            else:
-                if elem.fun == np.sum: # oofun.sum()
-                    assert len(elem.input) == 1
-                    elems.append(elem.input[0])
-                    continue
-                else:
-                    squared_elem = elem.input[0] if not elem.is_oovar else elem
-                koeff = None
-            if squared_elem is not None:
-#                tmp = squared_elem.input[0] if not squared_elem.is_oovar else squared_elem
-#                assert tmp.is_oovar, 'unimplemented yet'
-#                d = tmp.D(Z, **D_kwargs)
-                d = squared_elem.D(Z, **D_kwargs)
-
-                #assert len(d) == 1, 'unimplemented yet'
-                if len(d) > 1:
-                    assert squared_elem._isSum, 'unimplemented yet'
-                    Tmp = squared_elem * koeff if koeff is not None else squared_elem
-                    elems += [Tmp * Elem for Elem in squared_elem._summation_elements]
-                    continue
-                oov, lin_coeff = list(d.items())[0]
-                const = squared_elem(Z)
-#                print('const:', const)
-#                const = tmp(Z)
-                if isscalar(lin_coeff):
-                    Tmp2 = np.float(lin_coeff ** 2)  
-                    Tmp1 = 2.0 * lin_coeff * const
+            R.linear(elem, K)
+        elif order != 2:
+            p.err('constant, linear or quadratic function is expected')
+        elif elem._isSum:
+            for Elem in elem._summation_elements:
+                R.push(Elem, K)
+        elif elem._neg_elem is not None:
+            R.push(elem._neg_elem, -K)
+        elif elem._isProd:
+            koeff, funcs = 1.0, []
+            for Elem in elem._prod_elements:
+                if not isinstance(Elem, oofun):
+                    koeff = koeff * np.asarray(Elem)
+                elif Elem.getOrder(**order_kw) == 0:
+                    koeff = koeff * Elem(Z)
                 else:
-                    Diag = diag(lin_coeff)
-                    Tmp2 = Diag **2.0
-                    Tmp1 = 2.0 * Diag * const
-                Tmp0 = const ** 2.0
-                if koeff is not None:
-                    Tmp2 *= koeff
-                    Tmp1 *= koeff
-                    Tmp0 *= koeff
-                Ind = oovarsIndDict[oov]
-#                assert Ind[1]-Ind[0] == 1, 'unimplemented yet'
-                if Ind[1]-Ind[0] == 1:
-                    H[Ind[0], Ind[0]] += Tmp2
-                    f[Ind[0]] += Tmp1
-                else:
-                    H[range(Ind[0], Ind[1]), range(Ind[0], Ind[1])] += Tmp2
-                    f[range(Ind[0], Ind[1])] += Tmp1
-                c += Tmp0 if isscalar(Tmp0) else Tmp0.sum()
-#                for k, v in d.items():
-#                    pass
-            else:
-                assert elem1.is_oovar and elem2.is_oovar, 'unimplemented yet'
-                Tmp = 1.0 if koeff is None else koeff
-                Ind1, Ind2 = oovarsIndDict[elem1], oovarsIndDict[elem2]
-                assert Ind1[1]-Ind1[0] == 1, 'unimplemented yet'
-                assert Ind2[1]-Ind2[0] == 1, 'unimplemented yet'
-                
-                H[Ind1[0], Ind2[0]] += Tmp
-                
-    H = H + H.T
-    return H, f, c
-
-#def updateH(H, ind1, ind2, elem):
-#    H[ind1, ind2] += elem
-
-def asdf(p, pointDerivative, useSparse, f):
-    if 1 or useSparse is False:
-        for k, v in pointDerivative.items():
-            Ind = p._oovarsIndDict[k]
-            if type(v) in (float, np.float64):
-                f[Ind[0]]+=v
+                    funcs.append(Elem)
+            if len(funcs) == 1:
+                R.push(funcs[0], _broadcastProd(K, koeff, R.size(funcs[0])))
+            elif len(funcs) == 2:
+                R.product(funcs[0], funcs[1], K, koeff)
             else:
-                f[Ind[0]:Ind[1]] += v if type(v) != ndarray else v.item()
+                p.err('unimplemented yet: quadratic rendering of product of %d oofuns' % len(funcs))
+        elif elem.fun is np.sum: # oofun.sum()
+            R.push(elem.input[0], K if isscalar(K) else np.sum(K))
+        elif len(elem.input) == 1 and isinstance(elem.input[0], oofun) and elem.input[0].getOrder(**order_kw) == 1: 
+            # order 2 of func with single linear input means squared input
+            R.product(elem.input[0], elem.input[0], K, 1.0)
+        else:
+            p.err('unimplemented yet: quadratic rendering of oofun %s' % elem.name)
+    
+    I, J, V = R.triplets()
+    if useSparse:
+        from scipy.sparse import coo_matrix
+        H = coo_matrix((V, (I, J)), shape=(n, n))
+        H = (H + H.T).tocsc()
     else:
-        tmp = p._pointDerivative2array(pointDerivative, useSparse = useSparse)
-        if hasattr(tmp, 'toarray'):
-            tmp = tmp.toarray()
-        f += tmp.flatten()
+        H = np.zeros((n, n))
+        np.add.at(H, (I, J), V)
+        H = H + H.T
+    Ind = np.hstack([elem[0] for elem in R.F]) if len(R.F) != 0 else np.zeros(0, int)
+    Vals = np.hstack([elem[1] for elem in R.F]) if len(R.F) != 0 else np.zeros(0)
+    f = np.bincount(Ind, weights = Vals, minlength = n).astype(float) if Ind.size != 0 else np.zeros(n)
+    c = R.c
+    return H, f, c if isscalar(c) else np.asarray(c).item()
 
+def _broadcastProd(K, koeff, size):
+    # weights of components of func with the size in sum(K * koeff * func)
+    r = K * koeff
+    return r if isscalar(r) or size != 1 else np.sum(r)
+
+class _quadTriplets:
+    # accumulates quadratic (I, J, V), linear (indexes, values) parts and constant of rendered func;
+    # H_half = sum(V at (I, J)), i.e. func = x^T H_half x + f^T x + c
+    def __init__(self, p, Z, order_kw, oofun):
+        self.p, self.Z, self.order_kw, self.oofun = p, Z, order_kw, oofun
+        self.I, self.J, self.V, self.F = [], [], [], []
+        self.c = 0.0
+        self.stack = []
+        
+    def push(self, elem, K):
+        # K is scalar or array of weights of elem components
+        if not isscalar(K) and np.asarray(K).size != 1 and self.size(elem) == 1:
+            K = np.sum(K)
+        self.stack.append((elem, K))
+        
+    def size(self, elem):
+        if not isinstance(elem, self.oofun):
+            return np.asarray(elem).size
+        if elem.is_oovar:
+            return np.asarray(self.Z[elem]).size
+        return np.asarray(elem(self.Z)).size
+    
+    def linearTerms(self, u):
+        # affine func u of oovars blocks as ([(x indexes, coeffs) for each term], const) 
+        # where k-th component u_k = sum(coeffs[k] * x[indexes[k]]) + const[k], 
+        # or None if u can't be rendered this way (then derivatives are involved)
+        oofun, oovarsIndDict = self.oofun, self.p._oovarsIndDict
+        if not isinstance(u, oofun):
+            return [], np.atleast_1d(np.asfarray(u)).flatten()
+        if u.is_oovar:
+            Ind = oovarsIndDict.get(u, None)
+            if Ind is None: # fixed oovar
+                return [], np.atleast_1d(np.asfarray(self.Z[u])).flatten()
+            return [(np.arange(Ind[0], Ind[1]), np.ones(Ind[1]-Ind[0]))], np.zeros(Ind[1]-Ind[0])
+        if u._neg_elem is not None:
+            r = self.linearTerms(u._neg_elem)
+            return None if r is None else ([(ind, -val) for ind, val in r[0]], -r[1])
+        if u._isSum:
+            Terms, Const = [], 0.0
+            for elem in u._summation_elements:
+                r = self.linearTerms(elem)
+                if r is None: return None
+                Terms += r[0]
+                Const = Const + r[1]
+            m = np.asarray(Const).size
+            return [(_tile(ind, m), _tile(val, m)) for ind, val in Terms], np.atleast_1d(Const)
+        if u._isProd and len(u._prod_elements) == 2 and not isinstance(u._prod_elements[1], oofun):
+            r = self.linearTerms(u._prod_elements[0])
+            if r is None: return None
+            koeff = np.asfarray(u._prod_elements[1]).flatten()
+            Const = r[1] * koeff
+            m = Const.size
+            return [(_tile(ind, m), val * koeff) for ind, val in r[0]], Const
+        if u.getOrder(**self.order_kw) == 0:
+            return [], np.atleast_1d(np.asfarray(u(self.Z))).flatten()
+        return None
+        
+    def linear(self, u, K):
+        r = self.linearTerms(u)
+        if r is not None:
+            for ind, val in r[0]:
+                self.F.append((ind, K * val if not isscalar(K) or K != 1.0 else val))
+            self.c += np.sum(K * r[1])
+            return
+        J, u0 = self.jacobian(u)
+        Km = K * np.ones(u0.size)
+        self.F.append((np.arange(self.p.n), _rmatvec(J, Km)))
+        self.c += np.sum(Km * u0)
     
+    def product(self, u, w, K, koeff):
+        # adds sum(K * koeff * u * w), u and w are linear
+        ru, rw = self.linearTerms(u), self.linearTerms(w)
+        if ru is not None and rw is not None:
+            (Tu, u0), (Tw, w0) = ru, rw
+            m = max(u0.size, w0.size)
+            Km = K * koeff * np.ones(m)
+            u0, w0 = _tile(u0, m), _tile(w0, m)
+            for ind1, val1 in Tu:
+                val1 = Km * _tile(val1, m)
+                ind1 = _tile(ind1, m)
+                for ind2, val2 in Tw:
+                    self.I.append(ind1)
+                    self.J.append(_tile(ind2, m))
+                    self.V.append(val1 * _tile(val2, m))
+                self.F.append((ind1, val1 * w0))
+            for ind2, val2 in Tw:
+                self.F.append((_tile(ind2, m), Km * _tile(val2, m) * u0))
+            self.c += np.sum(Km * u0 * w0)
+            return
+        (Ju, u0), (Jw, w0) = self.jacobian(u), self.jacobian(w)
+        m = max(u0.size, w0.size)
+        Km = K * koeff * np.ones(m)
+        if u0.size != m: Ju, u0 = _tileRows(Ju, m), _tile(u0, m)
+        if w0.size != m: Jw, w0 = _tileRows(Jw, m), _tile(w0, m)
+        if scipyInstalled:
+            from scipy.sparse import csr_matrix, diags
+            H = (csr_matrix(Ju).T * (diags(Km, 0) * csr_matrix(Jw))).tocoo()
+            I, J, V = H.row, H.col, H.data
+        else:
+            H = np.dot(Ju.T * Km, Jw)
+            I, J = np.nonzero(H)
+            V = H[I, J]
+        self.I.append(I); self.J.append(J); self.V.append(V)
+        n = self.p.n
+        self.F.append((np.arange(n), _rmatvec(Ju, Km * w0)))
+        self.F.append((np.arange(n), _rmatvec(Jw, Km * u0)))
+        self.c += np.sum(Km * u0 * w0)
+        
+    def jacobian(self, u):
+        p = self.p
+        D = u.D(self.Z, **p._D_kwargs)
+        u0 = np.atleast_1d(np.asfarray(u(self.Z))).flatten()
+        if len(D) == 0:
+            J = np.zeros((u0.size, p.n))
+        else:
+            J = p._pointDerivative2array(D, useSparse = 'auto')
+            J = J.tocsr() if isspmatrix(J) else np.asfarray(J).reshape(u0.size, p.n)
+        return J, u0
     
+    def triplets(self):
+        if len(self.I) == 0:
+            return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+        return np.hstack(self.I), np.hstack(self.J), np.hstack(self.V)
+
+def _tile(arr, m):
+    return arr if arr.size == m else np.tile(arr, m)
+
+def _tileRows(J, m):
+    return J[[0] * m] if isspmatrix(J) else np.tile(J, (m, 1))
+
+def _rmatvec(J, v):
+    # J^T v for dense or sparse J
+    return np.asarray(J.T.dot(v)).flatten() if isspmatrix(J) else np.dot(v, J)
+
 #    if p.fixedVars is None or (p.freeVars is not None and len(p.freeVars)<len(p.fixedVars)):
 #        Z = dict([(v, zeros_like(self._x0[v]) if v in self._freeVars else self._x0[v]) for v in self._x0.keys()])
 ##        varIsFixed = lambda v: v not in p.freeVars
@@ -1,4 +1,6 @@
 from baseProblem import MatrixProblem
+from nonOptMisc import scipyInstalled
+import numpy as np
 
 class STAB(MatrixProblem):
     _optionalData = []
@@ -36,23 +38,41 @@ def set_routine(p,  *args, **kw):
     index2node = dict((i, node) for i, node in enumerate(nodes))
     
     
-    x = fd.oovars(n, domain=bool)
-    objective = fd.sum(x)
-    startPoint = {x:[0]*n}
-    
-    fixedVars = {}
+    fixed = {}
    
     includedNodes = getattr(kw, 'includedNodes', None)
     if includedNodes is None:
         includedNodes = getattr(p, 'includedNodes', ())
     for node in includedNodes:
-        fixedVars[x[node2index[node]]] = 1
+        fixed[node2index[node]] = 1
 
     excludedNodes = getattr(kw, 'excludedNodes', None)
     if excludedNodes is None:
         excludedNodes = getattr(p, 'excludedNodes', ())
     for node in excludedNodes:
-        fixedVars[x[node2index[node]]] = 0
+        fixed[node2index[node]] = 0
+    
+    isolated = np.array([len(graph[node]) == 0 for node in nodes], bool)
+    if p.probType == 'DSP':
+        for i in np.flatnonzero(isolated):
+            fixed[i] = 1
+    
+    goal = 'min' if p.probType == 'DSP' else 'max' 
+    
+    if not is_interalg and scipyInstalled:
+        # large graphs: constraints matrix is built directly from edges, without FuncDesigner model
+        p = _matrixMILP(p.probType, graph, edges, node2index, isolated, fixed, goal)
+        for key, val in kw.items():
+            setattr(p, key, val)
+        r = p.solve(solver, **kw)
+        r.solution = [index2node[i] for i in range(n) if r.xf[i] > 0.5]
+        r.ff = len(r.solution)
+        return r
+    
+    x = fd.oovars(n, domain=bool)
+    objective = fd.sum(x)
+    startPoint = {x:[0]*n}
+    fixedVars = dict((x[i], val) for i, val in fixed.items())
 
     if p.probType == 'DSP':
         constraints = []
@@ -61,7 +81,6 @@ def set_routine(p,  *args, **kw):
         for node in nodes:
             adjacent_nodes_dict = graph[node]
             if len(adjacent_nodes_dict) == 0:
-                fixedVars[x[node2index[node]]] = 1
                 continue
             constraints.append(Engine(adjacent_nodes_dict, node))
     else:
@@ -71,7 +90,6 @@ def set_routine(p,  *args, **kw):
         [x[node2index[i]]+x[node2index[j]] <=1 for i, j in edges]
     
     P = openopt.GLP if is_interalg else openopt.MILP
-    goal = 'min' if p.probType == 'DSP' else 'max' 
     p = P(objective, startPoint, constraints = constraints, fixedVars = fixedVars, goal = goal)
     
     for key, val in kw.items():
@@ -80,3 +98,33 @@ def set_routine(p,  *args, **kw):
     r.solution = [index2node[i] for i in range(n) if r.xf[x[i]] == 1]
     r.ff = len(r.solution)
     return r
+
+def _matrixMILP(probType, graph, edges, node2index, isolated, fixed, goal):
+    import openopt
+    from scipy.sparse import coo_matrix
+    n, m = len(node2index), len(edges)
+    I = np.fromiter((node2index[i] for i, j in edges), int, m)
+    J = np.fromiter((node2index[j] for i, j in edges), int, m)
+    
+    if probType == 'DSP':
+        # each non-isolated node or some of its neighbours is in the set: -(adjacency + identity) x <= -1
+        if not graph.is_directed():
+            I, J = np.hstack((I, J)), np.hstack((J, I))
+        diag = np.flatnonzero(~isolated)
+        rows, cols = np.hstack((I, diag)), np.hstack((J, diag))
+        A = coo_matrix((np.ones(rows.size), (rows, cols)), shape = (n, n)).tocsr()
+        A.data[:] = -1.0 # duplicated entries (multigraphs, self-loops) are summed up
+        A = A[diag]
+    else:
+        # x[i] + x[j] <= 1 for each edge (i, j)
+        rows = np.hstack((np.arange(m), np.arange(m)))
+        A = coo_matrix((np.ones(2*m), (rows, np.hstack((I, J)))), shape = (m, n)).tocsr()
+    b = -np.ones(A.shape[0]) if probType == 'DSP' else np.ones(A.shape[0])
+    
+    lb, ub = np.zeros(n), np.ones(n)
+    for i, val in fixed.items():
+        lb[i] = ub[i] = val
+    kw = {'f': np.ones(n), 'lb': lb, 'ub': ub, 'intVars': list(range(n)), 'goal': goal}
+    if A.shape[0] != 0:
+        kw.update(A = A, b = b)
+    return openopt.MILP(**kw)
@@ -1,4 +1,5 @@
 from baseProblem import MatrixProblem
+from nonOptMisc import scipyInstalled
 import numpy as np
 
 class TSP(MatrixProblem):
@@ -207,6 +208,19 @@ class TSP(MatrixProblem):
             return r
             
         
+        if P == oo.MILP and len(Cons) == 0 and type(mainCr) in (str, np.str_) and scipyInstalled:
+            # constraints matrices are built directly from edges, without FuncDesigner model
+            From = np.fromiter((node2index[edge[0]] for edge in EdgesCoords), int, m)
+            To = np.fromiter((node2index[edge[1]] for edge in EdgesCoords), int, m)
+            p = _matrixMILP(n, From, To, _crValues(self, cr_values, mainCr, m), objective[0][2], self.allowRevisit)
+            for param in ('start', 'returnToStart'):
+                KW.pop(param, None)
+            r = p.solve(solver, **KW)
+            r.ff = p.ff
+            SolutionEdges = [(EdgesCoords[i][0], EdgesCoords[i][1], EdgesDescriptors[i]) for i in range(m) if r.xf[i] > 0.5]
+            self._setSolution(r, SolutionEdges)
+            return r
+        
         #TODO: fix ooarray lb/ub
         #u = np.array([1] + [fd.oovar(lb=2, ub=n) for i in range(n-1)])
         u = fd.hstack((1, fd.oovars(n-1, lb=2, ub=n)))
@@ -299,12 +313,7 @@ class TSP(MatrixProblem):
         
         for optCrName in usedValues:
             
-            tmp = cr_values.get(optCrName, [])
-
-            if len(tmp) == 0:
-                self.err('seems like graph edges have no attribute "%s" to perform optimization on it' % optCrName)
-            elif len(tmp) != m:
-                self.err('for optimization creterion "%s" at least one edge has no this attribute' % optCrName)
+            tmp = _crValues(self, cr_values, optCrName, m)
             if interalg_gdp:
                 F = []
                 lc = 0
@@ -346,32 +355,7 @@ class TSP(MatrixProblem):
                 SolutionEdges = [(EdgesCoords[i][0], EdgesCoords[i][1], EdgesDescriptors[i]) for i in [x_ind_val2edge_ind[(ind, x[ind](r))] for ind in range(n)]]
             else:
                 SolutionEdges = [(EdgesCoords[i][0], EdgesCoords[i][1], EdgesDescriptors[i]) for i in range(m) if r.xf[x[i]] == 1]
-            if len(SolutionEdges) == 0: 
-                r.nodes = r.edges = r.Edges = []
-                return r
-                
-            S = dict([(elem[0], elem) for elem in SolutionEdges])
-            
-            SE = [SolutionEdges[0]]
-            for i in range(len(SolutionEdges)-1):
-                SE.append(S[SE[-1][1]])
-            SolutionEdgesCoords = [(elem[0], elem[1]) for elem in SE]
-
-            nodes = [edge[1] for edge in SolutionEdgesCoords]
-            if self.start is not None:
-                shift_ind = nodes.index(self.start)
-                nodes = nodes[shift_ind:] + nodes[:shift_ind]
-            
-            if self.returnToStart:
-                nodes.append(nodes[0])
-
-            edges = SolutionEdgesCoords[1:] + [SolutionEdgesCoords[0]]
-            Edges = SE[1:] + [SE[0]]
-            if self.start is not None:
-                edges, Edges = edges[shift_ind:] + edges[:shift_ind], Edges[shift_ind:] + Edges[:shift_ind]
-            if not self.returnToStart:
-                edges, Edges = edges[:-1], Edges[:-1]
-            r.nodes, r.edges, r.Edges = nodes, edges, Edges
+            self._setSolution(r, SolutionEdges)
         else:
             r.solution = 'for MOP see r.solutions instead of r.solution'
             tmp_c, tmp_v = r.solutions.coords, r.solutions.values
@@ -390,6 +374,34 @@ class TSP(MatrixProblem):
             
         return r
 
+    def _setSolution(self, r, SolutionEdges):
+        if len(SolutionEdges) == 0: 
+            r.nodes = r.edges = r.Edges = []
+            return
+            
+        S = dict([(elem[0], elem) for elem in SolutionEdges])
+        
+        SE = [SolutionEdges[0]]
+        for i in range(len(SolutionEdges)-1):
+            SE.append(S[SE[-1][1]])
+        SolutionEdgesCoords = [(elem[0], elem[1]) for elem in SE]
+
+        nodes = [edge[1] for edge in SolutionEdgesCoords]
+        if self.start is not None:
+            shift_ind = nodes.index(self.start)
+            nodes = nodes[shift_ind:] + nodes[:shift_ind]
+        
+        if self.returnToStart:
+            nodes.append(nodes[0])
+
+        edges = SolutionEdgesCoords[1:] + [SolutionEdgesCoords[0]]
+        Edges = SE[1:] + [SE[0]]
+        if self.start is not None:
+            edges, Edges = edges[shift_ind:] + edges[:shift_ind], Edges[shift_ind:] + Edges[:shift_ind]
+        if not self.returnToStart:
+            edges, Edges = edges[:-1], Edges[:-1]
+        r.nodes, r.edges, r.Edges = nodes, edges, Edges
+
 class MOPsolutions(list):
     pass
 
@@ -400,6 +412,45 @@ class D:
         self.used_vals.add(item)
         return 1.0
     
+def _crValues(p, cr_values, name, m):
+    tmp = cr_values.get(name, [])
+    if len(tmp) == 0:
+        p.err('seems like graph edges have no attribute "%s" to perform optimization on it' % name)
+    elif len(tmp) != m:
+        p.err('for optimization creterion "%s" at least one edge has no this attribute' % name)
+    return tmp
+
+def _matrixMILP(n, From, To, cr_values, goal, allowRevisit):
+    import openopt as oo
+    from scipy.sparse import coo_matrix, vstack
+    m = From.size
+    N = m + n - 1 # edges x, then MTZ u[1], ..., u[n-1] (u[0] = 1 is not a variable)
+    Arange = np.arange(m)
+    
+    # number of outcoming and incoming edges for each node
+    D = coo_matrix((np.ones(2*m), (np.hstack((From, n + To)), np.hstack((Arange, Arange)))), shape = (2*n, N)).tocsr()
+    
+    # MTZ: u[i] - u[j] + (n-1) * x[k] <= n-2 for edge k = (i, j), i, j != 0
+    ind = np.flatnonzero(np.logical_and(From != 0, To != 0))
+    k = ind.size
+    rows = np.tile(np.arange(k), 3)
+    cols = np.hstack((m + From[ind] - 1, m + To[ind] - 1, ind))
+    vals = np.hstack((np.ones(k), -np.ones(k), np.tile(n - 1.0, k)))
+    A = coo_matrix((vals, (rows, cols)), shape = (k, N)).tocsr()
+    A.eliminate_zeros() # self-loops
+    b = np.tile(n - 2.0, k)
+    
+    kw = {'f': np.hstack((np.asarray(cr_values, float), np.zeros(n-1))), 
+          'lb': np.hstack((np.zeros(m), np.tile(2.0, n-1))), 'ub': np.hstack((np.ones(m), np.tile(float(n), n-1))), 
+          'x0': np.hstack((np.zeros(m), np.arange(2.0, n+1))), 'intVars': list(range(m)), 'goal': goal}
+    if allowRevisit:
+        A, b = vstack((A, -D), format = 'csr'), np.hstack((b, -np.ones(2*n)))
+    else:
+        kw.update(Aeq = D, beq = np.ones(2*n))
+    if A.shape[0] != 0:
+        kw.update(A = A, b = b)
+    return oo.MILP(**kw)
+
 def getUsedValues(Iterator):
     d = D()
     r = set()
@@ -26,6 +26,7 @@ ProbDefaults = {'diffInt': 1.5e-8,  'xtol': 1e-6,  'noise': 0}
 from runProbSolver import runProbSolver
 import GUI
 from fdmisc import setStartVectorAndTranslators
+from evaluationCache import evaluationCache
 
 
 class user:
@@ -68,6 +69,12 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
     isFinished = False
     invertObjFunc = False # True for goal = 'max' or 'maximum'
     nProc = 1 # number of processors to use
+    executor = None # object with map(func, points), e.g. concurrent.futures executor, for evaluation of independent points (populations of GLP solvers) instead of nProc processes
+    checkpoint = None # file name to save solver state periodically (interalg, ralg)
+    checkpointInterval = 600 # seconds between checkpoints
+    resumeFrom = None # checkpoint file name to continue solving from
+    _compiled = None # compiledProblem performing current solve, see p.compile()
+    _canRefreshFixedVars = False # whether prepared prob can be updated for other values of fixed oovars
 
     lastPrintedIter = -1
     
@@ -251,6 +258,14 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
         self.debug = True
         return self.solve(*args, **kwargs)
     
+    def compile(self, solver = None, **kwargs):
+        '''
+        returns compiledProblem for repeated solves of the FuncDesigner model 
+        with other values of fixed oovars and box bounds, see compiledProb.py
+        '''
+        from compiledProb import compiledProblem
+        return compiledProblem(self, solver, **kwargs)
+    
     def objFuncMultiple2Single(self, f):
         #this function can be overdetermined by child class
         if asfarray(f).size != 1: self.err('unexpected f size. The function should be redefined in OO child class, inform OO developers')
@@ -486,6 +501,9 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
             # TODO: get rid of start c, h = None, use [] instead
             A, b, Aeq, beq = [], [], [], []
             
+            # data for refreshing the prob with other values of fixed oovars
+            self._linearRenders, self._fixedConstraints = [], []
+            
             if type(self.constraints) not in (list, tuple, set):
                 self.constraints = [self.constraints]
             oovD = self._oovarsIndDict
@@ -589,11 +607,13 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
             else:
                 broadcast(formDictOfFixedFuncs, self.f, self.useAttachedConstraints, self.dictOfFixedFuncs, areFixed, self._x0)
 
-            if oosolver(self.solver).useLinePoints:
+            # solver is absent if the prob is prepared for export to file
+            solver = oosolver(self.solver) if hasattr(self, 'solver') else None
+            if solver is not None and solver.useLinePoints:
                 self._firstLinePointDict = {}
                 self._secondLinePointDict = {}
                 self._currLinePointDict = {}
-            inplaceLinearRender = oosolver(self.solver).__name__ == 'interalg'
+            inplaceLinearRender = solver is not None and solver.__name__ == 'interalg'
             
             if inplaceLinearRender and hasattr(self, 'f'):
                 D_kwargs2 = D_kwargs.copy()
@@ -631,12 +651,7 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
                 else:
                     self.handleConstraint(c, *handleConstraint_args)
 
-            if len(b) != 0:
-                self.A, self.b = Vstack(A), Hstack([asfarray(elem).flatten() for elem in b])#Vstack(b).flatten()
-                if hasattr(self.b, 'toarray'): self.b = self.b.toarray()
-            if len(beq) != 0:
-                self.Aeq, self.beq = Vstack(Aeq), Hstack([ravel(elem) for elem in beq])#Vstack(beq).flatten()
-                if hasattr(self.beq, 'toarray'): self.beq = self.beq.toarray()
+            self._setLinearConstraints(A, b, Aeq, beq)
             for vName, vVal in LB.items():
                 inds = oovD[vName]
                 lb[inds[0]:inds[1]] = vVal
@@ -664,6 +679,24 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
         if not hasattr(self, 'lb'): self.lb = -inf * ones(self.n)
         if not hasattr(self, 'ub'): self.ub =  inf * ones(self.n)        
 
+        self._castLinearConstraints()
+            
+        self._baseProblemIsPrepared = True
+
+    def _setLinearConstraints(self, A, b, Aeq, beq):
+        # A, Aeq are lists of rendered rows or None if the matrices are unchanged
+        if len(b) != 0:
+            if A is not None:
+                self.A = Vstack(A)
+            self.b = Hstack([asfarray(elem).flatten() for elem in b])#Vstack(b).flatten()
+            if hasattr(self.b, 'toarray'): self.b = self.b.toarray()
+        if len(beq) != 0:
+            if Aeq is not None:
+                self.Aeq = Vstack(Aeq)
+            self.beq = Hstack([ravel(elem) for elem in beq])#Vstack(beq).flatten()
+            if hasattr(self.beq, 'toarray'): self.beq = self.beq.toarray()
+    
+    def _castLinearConstraints(self):
         for fn in ('A', 'Aeq'):
             fv = getattr(self, fn)
             if fv is not None:
@@ -689,8 +722,6 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
             
         elif nA > SizeThreshold or nAeq > SizeThreshold:
             self.pWarn(scipyAbsentMsg)
-            
-        self._baseProblemIsPrepared = True
 
 
     def handleConstraint(self, c, StartPointVars, areFixed, oovD, A, b, Aeq, beq, Z, D_kwargs, LB, UB, inplaceLinearRender):
@@ -747,7 +778,7 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
             
         if isFixed:
             # TODO: get rid of self.contol, use separate contols for each constraint
-            
+            self._fixedConstraints.append((c, Contol2))
             if not c(self._x0, tol=Contol2):
                 s = """'constraint "%s" with all-fixed optimization variables it depends on is infeasible in start point, 
                 hence the problem is infeasible, maybe you should change start point'""" % c.name
@@ -807,18 +838,21 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
             if f_order < 2:
                 Aeq.append(self._pointDerivative2array(D))      
                 beq.append(-f(Z)+_lb)
+                self._addLinearRender(f, 1, _lb, True, Aeq[-1])
             elif self.h is None: self.h = [f-_lb]
             else: self.h.append(f-_lb)
         elif isfinite(_ub):
             if f_order < 2:
                 A.append(self._pointDerivative2array(D))                       
                 b.append(-f(Z)+_ub)
+                self._addLinearRender(f, 1, _ub, False, A[-1])
             elif self.c is None: self.c = [f - _ub]
             else: self.c.append(f - _ub)
         elif isfinite(_lb):
             if f_order < 2:
                 A.append(-self._pointDerivative2array(D))                       
                 b.append(f(Z) - _lb)                        
+                self._addLinearRender(f, -1, _lb, False, A[-1])
             elif self.c is None: self.c = [- f + _lb]
             else: self.c.append(- f + _lb)
         else:
@@ -836,6 +870,49 @@ class baseProblem(oomatrix, residuals, ooTextOutput):
 #                print('!', f, _lb, _ub, Contol)
         return False
 
+    def _addLinearRender(self, f, sign, bound, isEquality, row):
+        # rows of A, Aeq are sign * derivative of f, entries of b, beq are sign * (bound - f(Z));
+        # the row is kept for refreshing if f is linear wrt fixed oovars as well
+        self._linearRenders.append((f, sign, bound, isEquality, row if f.getOrder() < 2 else None))
+
+    def _refreshFixedVars(self, values):
+        # values: {fixed oovar: new value}
+        # updates data of prepared FuncDesigner prob that depend on the values
+        from FuncDesigner import oopoint, _getDiffVarsID
+        for v in values:
+            if v not in self._fixedVars:
+                self.err('%s is not a fixed variable of the problem' % v.name)
+        values = dict((v, v.aux_domain[val] if type(val) in (str, string_) else val) for v, val in values.items())
+        render = lambda point: oopoint([(v, values.get(v, val)) for v, val in point.items()], 
+                                       maxDistributionSize = self.maxDistributionSize)
+        self._x0, self._Z = render(self._x0), render(self._Z)
+        fixed = self._FDtranslator['fixed']
+        fixed[:] = [(v, self._x0[v]) for v, val in fixed]
+        self._FDtranslator['prevX'] = nan
+        # values of funcs on fixed oovars are stored by oofuns for the schedule ID
+        self._FDVarsID = self._D_kwargs['fixedVarsScheduleID'] = _getDiffVarsID()
+
+        for c, tol in self._fixedConstraints:
+            if not c(self._x0, tol=tol):
+                self.err('constraint "%s" with all-fixed optimization variables it depends on is infeasible' % c.name)
+        self.dictOfFixedFuncs = dict((oof, oof(self._x0)) for oof in self.dictOfFixedFuncs)
+        
+        Z, A, b, Aeq, beq = self._Z, [], [], [], []
+        for f, sign, bound, isEquality, row in self._linearRenders:
+            if row is None:
+                row = sign * self._pointDerivative2array(f.D(Z, **self._D_kwargs))
+            (Aeq if isEquality else A).append(row)
+            (beq if isEquality else b).append(sign * (bound - f(Z)))
+        renderMatrices = any([elem[4] is None for elem in self._linearRenders])
+        if renderMatrices:
+            for fn in ('_A', '_Aeq'):
+                if fn in self.__dict__:
+                    delattr(self, fn)
+            self._setLinearConstraints(A, b, Aeq, beq)
+            self._castLinearConstraints()
+        else:
+            self._setLinearConstraints(None, b, None, beq)
+
 def formDictOfFixedFuncs(oof, dictOfFixedFuncs, areFixed, startPoint):
     dep = set([oof]) if oof.is_oovar else oof._getDep()
     if areFixed(dep):
@@ -898,6 +975,13 @@ class NonLinProblem(baseProblem, nonLinFuncs, Args):
     #lines with |info_user-info_numerical| / (|info_user|+|info_numerical+1e-15) greater than maxViolation will be shown
     maxViolation = 1e-2
     JacobianApproximationStencil = 1
+    # for finite-difference derivatives of non-FuncDesigner funcs and population evaluation (de, galileo, pswarm):
+    vectorizedFuncs = False # True if f, c, h accept 2-D array (one point per row) and return one row of values per point
+    fPattern = cPattern = hPattern = None # Jacobian nonzeros (m x n array, list of them for several funcs) or 'auto'
+    cacheSize = 0 # number of points with f, c, h values and derivatives stored in p.cache, 0 means no cache
+    cache = None # evaluationCache, could be taken from other problem with same funcs
+    compileModel = False # evaluate FuncDesigner funcs via compiled plans (oofun.compile())
+    _canRefreshFixedVars = True
     def __init__(self, *args, **kwargs):
         baseProblem.__init__(self, *args, **kwargs)
         if not hasattr(self, 'args'): self.args = Args()
@@ -983,6 +1067,11 @@ class NonLinProblem(baseProblem, nonLinFuncs, Args):
                     if not hasattr(self, 'df_iter'):
                         self.df_iter = True
         
+        if self.cache is None and self.cacheSize != 0:
+            self.cache = evaluationCache(self.cacheSize)
+        if self.cache is not None:
+            self.nEvals['cacheHits'] = self.nEvals['cacheMisses'] = 0
+        
         if self.prepared == True:
             return
             
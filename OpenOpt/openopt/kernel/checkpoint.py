@@ -0,0 +1,55 @@
+import os, pickle
+from time import time
+
+# p.checkpoint = 'file name', p.checkpointInterval = seconds:
+# solver state is periodically saved to the file;
+# p.solve(..., resumeFrom = 'file name') continues the run from the saved state.
+
+def checkpointIsDue(p):
+    if p.checkpoint is None:
+        return False
+    if not hasattr(p, '_checkpointTime'):
+        p._checkpointTime = time()
+        return False
+    return time() - p._checkpointTime >= p.checkpointInterval
+
+def saveCheckpoint(p, state):
+    # state is dict of picklable solver data;
+    # file is written to temporary one and then renamed,
+    # thus interrupted saving doesn't spoil previous checkpoint
+    S = {'solver': p.solver.__name__, 'probType': p.probType, 'n': p.n, 'iter': p.iter, 'state': state}
+    fn = p.checkpoint
+    tmp = fn + '.tmp'
+    file = open(tmp, 'wb')
+    try:
+        pickle.dump(S, file, -1)
+        file.flush()
+        os.fsync(file.fileno())
+    finally:
+        file.close()
+    if hasattr(os, 'replace'):
+        os.replace(tmp, fn)
+    else:
+        if os.name == 'nt' and os.path.exists(fn): # rename can't overwrite on Windows
+            os.remove(fn)
+        os.rename(tmp, fn)
+    p._checkpointTime = time()
+    p.debugmsg('checkpoint has been saved to %s (iter %d)' % (fn, p.iter))
+
+def loadCheckpoint(p):
+    # returns saved solver state or None if p.resumeFrom is not set
+    if p.resumeFrom is None:
+        return None
+    try:
+        file = open(p.resumeFrom, 'rb')
+    except IOError:
+        p.err('cannot open checkpoint file %s' % p.resumeFrom)
+    try:
+        S = pickle.load(file)
+    finally:
+        file.close()
+    for key, val in (('solver', p.solver.__name__), ('probType', p.probType), ('n', p.n)):
+        if S.get(key, None) != val:
+            p.err('checkpoint %s has been made for %s=%s while current one is %s' % (p.resumeFrom, key, S.get(key, None), val))
+    p.info('resuming from checkpoint %s (iter %d)' % (p.resumeFrom, S['iter']))
+    return S['state']
@@ -0,0 +1,110 @@
+# Repeated solves of same FuncDesigner model with other values of fixed oovars (parameters),
+# box bounds of free oovars and start point, e.g. for rolling-horizon planning
+
+from numpy import ndarray, atleast_1d, isfinite, all
+from copy import copy as PythonCopy
+from evaluationCache import evaluationCache
+
+# prob attributes that can be modified inplace by solvers and runProbSolver are copied
+_copy = lambda val: PythonCopy(val) if type(val) in (ndarray, list, dict, set) else val
+
+class compiledProblem:
+    '''
+    FuncDesigner prob prepared once for many solves:
+        cp = p.compile('glpk')
+        r = cp.solve({demand: d1})
+        r = cp.solve({demand: d2}, ub = {production: capacity})
+    values of fixed oovars are kept between solves (cp.values),
+    box bounds (lb, ub) are given for current solve only,
+    previous solution is used as start point unless warmStart = False.
+
+    Dependency discovery, translators and rendering of linear constraints
+    are performed by 1st solve, next ones only refresh data depending on fixed oovars values
+    (derivatives of linear constraints are rendered again only if they have parametric coefficients).
+    Probs that can't be refreshed this way (e.g. QP or solved by interalg) are prepared again for each solve.
+    '''
+    def __init__(self, p, solver = None, **kwargs):
+        if not p._isFDmodel():
+            p.err('compiled problems are implemented for FuncDesigner models only')
+        if hasattr(p, 'was_involved'):
+            p.err('the prob has been already solved, it should be compiled before')
+        self.p, self.solver, self.kwargs = p, solver, kwargs
+        self.values = {}
+        self.nSolves = 0
+        self.canRefresh = False
+        self._initialState = self._getState(p)
+        self._preparedState = None
+        self._bounds = ({}, {})
+        self._xf, self._xk = None, None
+
+    def solve(self, values = None, lb = None, ub = None, warmStart = True, **kwargs):
+        p = self.p
+        if values is not None:
+            self.values.update(self._render(values))
+        self._bounds = (self._render(lb) if lb is not None else {}, self._render(ub) if ub is not None else {})
+        Kwargs = self.kwargs.copy()
+        Kwargs.update(kwargs)
+
+        if self.canRefresh:
+            self._setState(self._preparedState)
+            p._refreshFixedVars(self.values)
+            if warmStart and self._xk is not None:
+                p.x0 = self._xk.copy()
+        else:
+            if self.nSolves != 0:
+                self._setState(self._initialState)
+            x0 = self._render(p.x0)
+            if warmStart and self._xf is not None:
+                x0.update((v, val) for v, val in self._xf.items() if v in x0)
+            x0.update(self.values)
+            p.x0 = x0
+        if self.nSolves != 0 and getattr(p, 'cache', None) is not None:
+            # stored values are obtained with other values of fixed oovars
+            p.cache = evaluationCache(p.cache.size)
+
+        p._compiled = self
+        try:
+            r = p.solve(self.solver, **Kwargs)
+        finally:
+            p._compiled = None
+        self.nSolves += 1
+        self._xf = r.xf
+        xk = getattr(p, 'xk', None)
+        self._xk = atleast_1d(xk).copy() if isinstance(xk, ndarray) and xk.size == p.n and all(isfinite(xk)) else None
+        return r
+
+    def _prepared(self, p):
+        # called by runProbSolver after the prob has been prepared
+        if self._preparedState is None and p._canRefreshFixedVars and p.isFDmodel \
+        and p.solver.__name__ != 'interalg': # interalg renders linear funcs inplace
+            self._preparedState = self._getState(p)
+            self.canRefresh = True
+        lb, ub = self._bounds
+        for bounds, vector in ((lb, p.lb), (ub, p.ub)):
+            for v, val in bounds.items():
+                if v not in p._oovarsIndDict:
+                    p.err('box bounds can be changed for free variables only, %s is not the one' % v.name)
+                ind_start, ind_end = p._oovarsIndDict[v]
+                vector[ind_start:ind_end] = val
+
+    def _render(self, point):
+        # {oovar or ooarray: value} -> {oovar: value}
+        r = {}
+        for key, val in point.items():
+            if isinstance(key, (list, tuple, ndarray)):
+                val = atleast_1d(val)
+                if len(key) != val.size:
+                    self.p.err('length of oovars array %s and its value differ' % key)
+                for i in range(val.size):
+                    r[key[i]] = val[i]
+            else:
+                r[key] = val
+        return r
+
+    def _getState(self, p):
+        return dict((key, _copy(val)) for key, val in p.__dict__.items())
+
+    def _setState(self, state):
+        D = self.p.__dict__
+        D.clear()
+        D.update((key, _copy(val)) for key, val in state.items())
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+_copy = lambda val: val.copy() if hasattr(val, 'copy') else val
+
+class evaluationCache:
+    '''
+    Bounded LRU cache of f, c, h values and their derivatives,
+    keyed by the function type and the free variables vector x.
+    Can be shared by several problems with the same funcs (p2.cache = p.cache),
+    e.g. for repeated solves with other solvers or start points.
+    '''
+    def __init__(self, size = 1000):
+        self.size = int(size)
+        self._data = OrderedDict()
+
+    def _key(self, funcType, x):
+        return (funcType, x.dtype.str, x.tobytes() if hasattr(x, 'tobytes') else x.tostring())
+
+    def get(self, funcType, x):
+        # returns copy of the stored value or None
+        key = self._key(funcType, x)
+        val = self._data.pop(key, None)
+        if val is None:
+            return None
+        self._data[key] = val # now it's the most recently used
+        return _copy(val)
+
+    def put(self, funcType, x, val):
+        key = self._key(funcType, x)
+        self._data.pop(key, None)
+        self._data[key] = _copy(val)
+        while len(self._data) > self.size:
+            self._data.popitem(last = False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
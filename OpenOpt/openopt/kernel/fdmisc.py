@@ -116,13 +116,12 @@ def setStartVectorAndTranslators(p):
     startDictData = []
     if fixedVars is not None:
         for v in p.probDep & p._fixedVars:
-            val = startPoint.get(v, 'absent')
-            if val == 'absent':
+            if v not in startPoint:
                 p.err('value for fixed variable %s is absent in start point' % v.name)
-            startDictData.append((v, val))
+            startDictData.append((v, startPoint[v]))
 
     #vector2point = lambda x: oopoint(startDictData + [(oov, x[oovar_indexes[i]:oovar_indexes[i+1]]) for i, oov in enumerate(freeVars)])
-    p._FDtranslator = {'prevX':nan}
+    p._FDtranslator = {'prevX':nan, 'fixed':startDictData}
     def vector2point(x): 
 #        x = asarray(x)
 #        if not str(x.dtype).startswith('float'):
@@ -148,6 +147,10 @@ def setStartVectorAndTranslators(p):
 
     oovarsIndDict = dict([(oov, (oovar_indexes[i], oovar_indexes[i+1])) for i, oov in enumerate(freeVars)])
 
+    from FuncDesigner.translator import cachedSparseJacobian, newSparseJacobian
+    # sparsity structures of funcs derivatives, obtained once per problem
+    jacobianStructures = {}
+    
     def pointDerivative2array(pointDerivative, useSparse = 'auto',  func=None, point=None): 
         
         # useSparse can be True, False, 'auto'
@@ -156,6 +159,11 @@ def setStartVectorAndTranslators(p):
         if useSparse is True and not scipyInstalled:
             p.err('to handle sparse matrices you should have module scipy installed') 
 
+        if func is not None and useSparse is not False and len(pointDerivative) != 0:
+            r = cachedSparseJacobian(jacobianStructures, func, pointDerivative)
+            if r is not None:
+                return r
+
         if len(pointDerivative) == 0: 
             if func is not None:
                 funcLen = func(point).size
@@ -183,6 +191,8 @@ def setStartVectorAndTranslators(p):
             nTotal = n * funcLen#sum([prod(elem.shape) for elem in pointDerivative.values()])
             nNonZero = sum((elem.size if isspmatrix(elem) else count_nonzero(elem)) for elem in pointDerivative.values())
             involveSparse = 4*nNonZero < nTotal and nTotal > 1000
+        if involveSparse and func is not None:
+            return newSparseJacobian(jacobianStructures, func, pointDerivative, oovarsIndDict, funcLen, n)
         if involveSparse:
             r2 = []
             if funcLen == 1:
@@ -250,7 +260,7 @@ def setStartVectorAndTranslators(p):
                 if r.ndim == 1:
                     r[indexes[0]:indexes[1]] = val.flatten() if type(val) == ndarray else val
                 else:
-                    r[:, indexes[0]:indexes[1]] = val if val.shape == r.shape else val.reshape((funcLen, prod(val.shape)/funcLen))
+                    r[:, indexes[0]:indexes[1]] = val if val.shape == r.shape else val.reshape((funcLen, prod(val.shape)//funcLen))
             # TODO: mb remove it
             if useSparse is True and funcLen == 1: 
                 return SparseMatrixConstructor(r)
@@ -0,0 +1,610 @@
+import re
+from array import array
+import numpy as np
+from numpy import inf, isfinite, asarray, asfarray, zeros, ones, flatnonzero, logical_and
+from oologfcn import OpenOptException
+from nonOptMisc import scipyInstalled, isspmatrix, Vstack
+
+# Native readers and writers of MPS (fixed and free) and CPLEX LP files.
+# Writers go through columns (MPS) or rows (LP) of sparse A, Aeq without densifying them,
+# readers consume the file line by line and keep matrix entries in compact arrays,
+# so models with millions of rows can be moved between OpenOpt and other tools.
+
+_rowsChunk = 4096 # number of matrix rows or columns rendered into a single write() call
+
+def _linearData(p):
+    # returns c, const, M (constraint matrix for columnwise or rowwise access), rhs, row types, int columns
+    p._Prepare()
+    n = p.n
+    f = asfarray(p._init_f_vector).flatten()
+    const = float(p._c if p.isFDmodel else p.fConst)
+    A, Aeq = p.A, p.Aeq
+    if A is None: A = zeros((0, n))
+    if Aeq is None: Aeq = zeros((0, n))
+    b = asfarray(p.b).flatten() if p.b is not None else zeros(0)
+    beq = asfarray(p.beq).flatten() if p.beq is not None else zeros(0)
+    rhs = np.hstack((b, beq))
+    # rows with infinite rhs are redundant, they are written as free ones
+    types = ['N' if not isfinite(val) else 'L' for val in b.tolist()] + ['E'] * beq.size
+    if scipyInstalled:
+        from scipy.sparse import csc_matrix
+        M = csc_matrix(Vstack([A if isspmatrix(A) else asfarray(A).reshape(-1, n), \
+                               Aeq if isspmatrix(Aeq) else asfarray(Aeq).reshape(-1, n)]) if len(rhs) != 0 else zeros((0, n)))
+    else:
+        M = np.vstack((asfarray(A).reshape(-1, n), asfarray(Aeq).reshape(-1, n)))
+    if M.shape != (rhs.size, n):
+        p.err('incorrect shape of linear constraints matrices')
+    intVars = set(asarray(getattr(p, '_intVars_vector', []), int).tolist())
+    return f, const, M, rhs, types, intVars
+
+def _columns(M):
+    # yields (row indexes, values) of M columns
+    if isspmatrix(M):
+        indptr, indices, data = M.indptr.tolist(), M.indices.tolist(), M.data.tolist()
+        for j in range(M.shape[1]):
+            yield indices[indptr[j]:indptr[j+1]], data[indptr[j]:indptr[j+1]]
+    else:
+        for j in range(M.shape[1]):
+            ind = flatnonzero(M[:, j])
+            yield ind.tolist(), M[ind, j].tolist()
+
+def _rows(M):
+    if isspmatrix(M):
+        M = M.tocsr()
+        indptr, indices, data = M.indptr.tolist(), M.indices.tolist(), M.data.tolist()
+        for i in range(M.shape[0]):
+            yield indices[indptr[i]:indptr[i+1]], data[indptr[i]:indptr[i+1]]
+    else:
+        for i in range(M.shape[0]):
+            ind = flatnonzero(M[i])
+            yield ind.tolist(), M[i, ind].tolist()
+
+def _fixedNumber(val):
+    # number that fits 12 positions of fixed MPS field
+    s = '%.12g' % val
+    k = 11
+    while len(s) > 12:
+        s = '%.*g' % (k, val)
+        k -= 1
+    return s
+
+def _freeNumber(val):
+    return repr(float(val))
+
+def writeMPS(p, filename, format='fixed', startIndex=0):
+    if format not in ('fixed', 'free'):
+        p.err('incorrect MPS format, should be "fixed" or "free"')
+    fixed = format == 'fixed'
+    f, const, M, rhs, types, intVars = _linearData(p)
+    colNames = p._getColNames(8 if fixed else 255, startIndex)
+    m = rhs.size
+    rowNames = ['R%d' % (i+1) for i in range(m)]
+    if fixed and m > 9999999:
+        p.err('too many rows for fixed MPS format, use format="free" instead')
+    Num = _fixedNumber if fixed else _freeNumber
+    if fixed:
+        entry = lambda name1, name2, val: '    %-8s  %-8s  %12s\n' % (name1, name2, Num(val))
+        marker = lambda kind: "    MARKER    'MARKER'                 '%s'\n" % kind
+        header = lambda Type, name: ' %-2s %s\n' % (Type, name)
+        bound = lambda Type, name, val = None: ' %-2s BND       %-8s' % (Type, name) + ('  %12s\n' % Num(val) if val is not None else '\n')
+    else:
+        entry = lambda name1, name2, val: ' %s %s %s\n' % (name1, name2, Num(val))
+        marker = lambda kind: " MARKER 'MARKER' '%s'\n" % kind
+        header = lambda Type, name: ' %s %s\n' % (Type, name)
+        bound = lambda Type, name, val = None: ' %s BND %s' % (Type, name) + (' %s\n' % Num(val) if val is not None else '\n')
+
+    file = open(filename, 'w')
+    try:
+        name = str(p.name).replace(' ', '_') if p.name is not None else 'unnamed'
+        file.write('NAME          %s\n' % name)
+        if p.goal in ['max', 'maximum']:
+            file.write('OBJSENSE\n    MAX\n')
+        Lines = ['ROWS\n', header('N', 'R0')]
+        for i in range(m):
+            Lines.append(header(types[i], rowNames[i]))
+            if len(Lines) >= _rowsChunk:
+                file.writelines(Lines)
+                Lines = []
+        Lines.append('COLUMNS\n')
+        f = f.tolist()
+        isInt = False
+        for j, (ind, vals) in enumerate(_columns(M)):
+            if (j in intVars) != isInt:
+                isInt = not isInt
+                Lines.append(marker('INTORG' if isInt else 'INTEND'))
+            cn = colNames[j]
+            if f[j] != 0 or len(ind) == 0:
+                Lines.append(entry(cn, 'R0', f[j]))
+            Lines += [entry(cn, rowNames[i], val) for i, val in zip(ind, vals)]
+            if len(Lines) >= _rowsChunk:
+                file.writelines(Lines)
+                Lines = []
+        if isInt:
+            Lines.append(marker('INTEND'))
+        Lines.append('RHS\n')
+        if const != 0:
+            Lines.append(entry('RHS', 'R0', -const))
+        for i, val in enumerate(rhs.tolist()):
+            if val != 0 and types[i] != 'N':
+                Lines.append(entry('RHS', rowNames[i], val))
+            if len(Lines) >= _rowsChunk:
+                file.writelines(Lines)
+                Lines = []
+        Lines.append('BOUNDS\n')
+        for j, (lb, ub) in enumerate(zip(asfarray(p.lb).tolist(), asfarray(p.ub).tolist())):
+            cn = colNames[j]
+            if lb == ub:
+                Lines.append(bound('FX', cn, lb))
+            elif lb == -inf and ub == inf:
+                Lines.append(bound('FR', cn))
+            else:
+                if lb == -inf:
+                    Lines.append(bound('MI', cn))
+                elif lb != 0 or ub < 0:
+                    Lines.append(bound('LO', cn, lb))
+                if ub != inf:
+                    Lines.append(bound('UP', cn, ub))
+                elif j in intVars:
+                    # some readers set default upper bound 1 for integer columns
+                    Lines.append(bound('PL', cn))
+            if len(Lines) >= _rowsChunk:
+                file.writelines(Lines)
+                Lines = []
+        Lines.append('ENDATA\n')
+        file.writelines(Lines)
+    finally:
+        file.close()
+    return True
+
+_lpNameForbidden = re.compile(r'[\s:+\-*^<>=\[\]\\]')
+
+def writeLP(p, filename, startIndex=0):
+    f, const, M, rhs, types, intVars = _linearData(p)
+    colNames = p._getColNames(255, startIndex)
+    for name in colNames:
+        if _lpNameForbidden.search(name) or name[0] in '0123456789.' or name.lower() in ('inf', 'infinity', 'free'):
+            p.err('variable name "%s" is not allowed in CPLEX LP format' % name)
+
+    def expression(ind, vals):
+        if len(ind) == 0:
+            return ' 0 ' + colNames[0]
+        terms = [(' - ' if val < 0 else ' + ') + repr(abs(float(val))) + ' ' + colNames[j] for j, val in zip(ind, vals)]
+        # CPLEX restricts length of lines
+        return '\n  '.join(''.join(terms[k:k+8]) for k in range(0, len(terms), 8))
+
+    file = open(filename, 'w')
+    try:
+        if p.name is not None:
+            file.write('\\ Problem name: %s\n' % p.name)
+        file.write('Maximize\n' if p.goal in ['max', 'maximum'] else 'Minimize\n')
+        ind = flatnonzero(f)
+        obj = ' obj:' + expression(ind.tolist(), f[ind].tolist())
+        if const != 0:
+            obj += (' - ' if const < 0 else ' + ') + repr(abs(const))
+        file.write(obj + '\nSubject To\n')
+        Lines = []
+        for i, (ind, vals) in enumerate(_rows(M)):
+            if types[i] == 'N':
+                continue
+            Lines.append(' R%d:%s %s %s\n' % (i+1, expression(ind, vals), '<=' if types[i] == 'L' else '=', repr(float(rhs[i]))))
+            if len(Lines) >= _rowsChunk:
+                file.writelines(Lines)
+                Lines = []
+        Lines.append('Bounds\n')
+
+        # columns that are absent in objective and constraints should be mentioned in bounds
+        used = f != 0
+        if isspmatrix(M):
+            used |= np.diff(M.indptr) != 0
+        else:
+            used |= np.any(M != 0, 0)
+        Str = lambda val: repr(float(val)) if isfinite(val) else ('-inf' if val < 0 else 'inf')
+        for j, (lb, ub) in enumerate(zip(asfarray(p.lb).tolist(), asfarray(p.ub).tolist())):
+            cn = colNames[j]
+            if lb == ub:
+                Lines.append(' %s = %s\n' % (cn, Str(lb)))
+            elif lb == -inf and ub == inf:
+                Lines.append(' %s free\n' % cn)
+            elif ub == inf:
+                if lb != 0 or not used[j]:
+                    Lines.append(' %s >= %s\n' % (cn, Str(lb)))
+            elif lb == 0:
+                Lines.append(' %s <= %s\n' % (cn, Str(ub)))
+            else:
+                Lines.append(' %s <= %s <= %s\n' % (Str(lb), cn, Str(ub)))
+            if len(Lines) >= _rowsChunk:
+                file.writelines(Lines)
+                Lines = []
+        if len(intVars) != 0:
+            Lines.append('Generals\n')
+            intVars = sorted(intVars)
+            Lines += [' ' + ' '.join(colNames[j] for j in intVars[k:k+8]) + '\n' for k in range(0, len(intVars), 8)]
+        Lines.append('End\n')
+        file.writelines(Lines)
+    finally:
+        file.close()
+    return True
+
+
+class _linearModel:
+    # data of LP/MILP being read; matrix entries are stored in compact arrays
+    def __init__(self):
+        self.name = None
+        self.goal = 'minimum'
+        self.colNames, self.colInd, self.intVars = [], {}, set()
+        self.rows, self.cols, self.vals = array('i'), array('i'), array('d')
+        self.fCols, self.fVals = array('i'), array('d')
+        self.const = 0.0
+        self.lb, self.ub = {}, {} # non-default bounds
+        self.rowLo, self.rowHi = array('d'), array('d')
+
+    def col(self, name, isInt = False):
+        j = self.colInd.get(name, None)
+        if j is None:
+            j = self.colInd[name] = len(self.colNames)
+            self.colNames.append(name)
+            if isInt: self.intVars.add(j)
+        return j
+
+    def prob(self, **kwargs):
+        from LP import LP
+        from MILP import MILP
+        n, m = len(self.colNames), len(self.rowLo)
+        f = zeros(n)
+        np.add.at(f, np.frombuffer(self.fCols, dtype=np.intc) if len(self.fCols) else zeros(0, int),
+                  np.frombuffer(self.fVals) if len(self.fVals) else zeros(0))
+        lb, ub = zeros(n), inf * ones(n)
+        for j, val in self.lb.items(): lb[j] = val
+        for j, val in self.ub.items(): ub[j] = val
+
+        rows = np.frombuffer(self.rows, dtype=np.intc) if len(self.rows) else zeros(0, int)
+        cols = np.frombuffer(self.cols, dtype=np.intc) if len(self.cols) else zeros(0, int)
+        vals = np.frombuffer(self.vals) if len(self.vals) else zeros(0)
+        nz = vals != 0 # e.g. "0 x" terms of empty rows
+        rows, cols, vals = rows[nz], cols[nz], vals[nz]
+        if scipyInstalled:
+            from scipy.sparse import coo_matrix
+            M = coo_matrix((vals, (rows, cols)), shape=(m, n)).tocsr()
+        else:
+            M = zeros((m, n))
+            np.add.at(M, (rows, cols), vals)
+        lo = np.frombuffer(self.rowLo) if m else zeros(0)
+        hi = np.frombuffer(self.rowHi) if m else zeros(0)
+
+        eq = flatnonzero(lo == hi)
+        indHi = flatnonzero(logical_and(lo != hi, isfinite(hi)))
+        indLo = flatnonzero(logical_and(lo != hi, isfinite(lo)))
+        A = Vstack([M[indHi], -M[indLo]]) if indHi.size + indLo.size != 0 else None
+        if A is not None and isspmatrix(A): A = A.tocsr()
+        b = np.hstack((hi[indHi], -lo[indLo]))
+        Aeq, beq = (M[eq], hi[eq]) if eq.size != 0 else (None, None)
+
+        kw = {'f': f, 'lb': lb, 'ub': ub, 'goal': self.goal, 'fConst': self.const}
+        if A is not None: kw.update(A = A, b = b)
+        if Aeq is not None: kw.update(Aeq = Aeq, beq = beq)
+        if self.name is not None: kw['name'] = self.name
+        if len(self.intVars) != 0: kw['intVars'] = sorted(self.intVars)
+        kw.update(kwargs)
+        p = (MILP if len(self.intVars) != 0 else LP)(**kw)
+        p.colNames = self.colNames
+        return p
+
+_MPSwithValue = set(('UP', 'LO', 'FX', 'LI', 'UI'))
+
+def readMPS(filename, format = 'free', **kwargs):
+    '''
+    p = readMPS(filename, format = 'free', **kwargs) returns LP or MILP (if integer columns are present),
+    kwargs are passed to the prob constructor, column names are stored in p.colNames.
+    format = 'fixed' parses fields by their positions (column names with spaces are allowed then),
+    'free' splits lines by whitespaces, it can be used for most of fixed MPS files as well.
+    Negative upper bound of column with default lower bound sets the latter to -inf.
+    '''
+    if format not in ('fixed', 'free'):
+        raise OpenOptException('incorrect MPS format, should be "fixed" or "free"')
+    fixed = format == 'fixed'
+    L = _linearModel()
+    rowInd, freeRows, rhs, ranges = {}, set(), {}, {}
+    obj = None
+    section = None
+    isInt = False
+    file = open(filename, 'r')
+    try:
+        for lineno, line in enumerate(file):
+            if line[:1] == '*' or line.strip() == '':
+                continue
+            if line[0] not in ' \t':
+                T = line.split()
+                section = T[0].upper()
+                if section == 'NAME':
+                    L.name = line[4:].strip() if len(T) > 1 else None
+                elif section == 'OBJSENSE' and len(T) > 1:
+                    L.goal = 'maximum' if T[1].upper().startswith('MAX') else 'minimum'
+                elif section == 'ENDATA':
+                    break
+                elif section not in ('ROWS', 'COLUMNS', 'RHS', 'RANGES', 'BOUNDS', 'OBJSENSE'):
+                    raise OpenOptException('unsupported MPS section %s in line %d' % (section, lineno+1))
+                continue
+            if fixed:
+                T = [fld for fld in (line[1:3].strip(), line[4:12].strip(), line[14:22].strip(), line[24:36].strip(), \
+                                      line[39:47].strip(), line[49:61].strip()) if fld != '']
+                if section == 'COLUMNS' and "'MARKER'" in line:
+                    T = line.split()
+            else:
+                T = line.split()
+
+            if section == 'COLUMNS':
+                if len(T) >= 3 and T[1] == "'MARKER'":
+                    isInt = T[2] == "'INTORG'"
+                    continue
+                j = L.col(T[0], isInt)
+                for k in range(1, len(T)-1, 2):
+                    rn, val = T[k], float(T[k+1])
+                    if rn == obj:
+                        L.fCols.append(j)
+                        L.fVals.append(val)
+                    else:
+                        i = rowInd.get(rn, None)
+                        if i is None:
+                            if rn in freeRows: continue
+                            raise OpenOptException('unknown row %s in line %d' % (rn, lineno+1))
+                        L.rows.append(i)
+                        L.cols.append(j)
+                        L.vals.append(val)
+            elif section == 'ROWS':
+                Type, rn = T[0].upper(), T[1]
+                if Type == 'N':
+                    if obj is None:
+                        obj = rn
+                    else:
+                        freeRows.add(rn) # other free rows are ignored
+                elif Type in ('L', 'G', 'E'):
+                    rowInd[rn] = len(L.rowLo)
+                    L.rowLo.append(-inf if Type == 'L' else 0.0)
+                    L.rowHi.append(inf if Type == 'G' else 0.0)
+                else:
+                    raise OpenOptException('incorrect row type %s in line %d' % (Type, lineno+1))
+            elif section in ('RHS', 'RANGES'):
+                Dict = rhs if section == 'RHS' else ranges
+                for k in range(len(T) % 2, len(T)-1, 2):
+                    rn, val = T[k], float(T[k+1])
+                    if rn == obj:
+                        if section == 'RHS': L.const = -val
+                    elif rn in rowInd:
+                        Dict[rowInd[rn]] = val
+            elif section == 'BOUNDS':
+                Type = T[0].upper()
+                if Type in _MPSwithValue or (Type == 'BV' and len(T) == 4):
+                    cn, val = T[-2], float(T[-1])
+                else:
+                    cn, val = T[-1], None
+                if cn not in L.colInd:
+                    raise OpenOptException('unknown column %s in line %d' % (cn, lineno+1))
+                j = L.colInd[cn]
+                if Type in ('LI', 'UI', 'BV'):
+                    L.intVars.add(j)
+                if Type in ('UP', 'UI'):
+                    L.ub[j] = val
+                    if val < 0 and j not in L.lb: L.lb[j] = -inf
+                elif Type in ('LO', 'LI'):
+                    L.lb[j] = val
+                elif Type == 'FX':
+                    L.lb[j] = L.ub[j] = val
+                elif Type == 'FR':
+                    L.lb[j], L.ub[j] = -inf, inf
+                elif Type == 'MI':
+                    L.lb[j] = -inf
+                elif Type == 'PL':
+                    L.ub[j] = inf
+                elif Type == 'BV':
+                    L.lb[j], L.ub[j] = 0.0, 1.0
+                else:
+                    raise OpenOptException('unsupported bound type %s in line %d' % (Type, lineno+1))
+            elif section == 'OBJSENSE':
+                L.goal = 'maximum' if T[0].upper().startswith('MAX') else 'minimum'
+            else:
+                raise OpenOptException('unexpected data in line %d' % (lineno+1))
+    finally:
+        file.close()
+
+    lo, hi = L.rowLo, L.rowHi
+    for i, val in rhs.items():
+        if lo[i] != -inf: lo[i] = val
+        if hi[i] != inf: hi[i] = val
+    for i, R in ranges.items():
+        if lo[i] == -inf: # L row
+            lo[i] = hi[i] - abs(R)
+        elif hi[i] == inf: # G row
+            hi[i] = lo[i] + abs(R)
+        elif R > 0:
+            hi[i] = lo[i] + R
+        else:
+            lo[i] = hi[i] + R
+    return L.prob(**kwargs)
+
+
+_lpSections = {'minimize':'min', 'minimum':'min', 'min':'min', 'maximize':'max', 'maximum':'max', 'max':'max',
+               'subject to':'st', 'such that':'st', 'st':'st', 's.t.':'st', 'st.':'st',
+               'bounds':'bounds', 'bound':'bounds', 'general':'int', 'generals':'int', 'gen':'int',
+               'integer':'int', 'integers':'int', 'binary':'bin', 'binaries':'bin', 'bin':'bin', 'end':'end',
+               'semi-continuous':None, 'semis':None, 'semi':None, 'sos':None, 'lazy constraints':None, 'user cuts':None}
+_lpToken = re.compile(r'\s*(?:(<=|=<|>=|=>|<|>|=)|([+-])|((?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|([^\s:<>=+\-\[\]\^]+)\s*(:)?|(\S))')
+_lpSenses = {'<=':'L', '=<':'L', '<':'L', '>=':'G', '=>':'G', '>':'G', '=':'E'}
+
+def _lpSection(line, lineno):
+    # returns (section or None, rest of the line)
+    s = ' '.join(line.lower().split())
+    if s in _lpSections:
+        if _lpSections[s] is None:
+            raise OpenOptException('CPLEX LP section "%s" (line %d) is not implemented' % (line.strip(), lineno+1))
+        return _lpSections[s], ''
+    if line[0] in ' \t':
+        return None, line
+    # objective or 1st constraint can follow the keyword in the same line
+    for key in ('subject to', 'such that'):
+        if s.startswith(key + ' '):
+            return 'st', line.split(None, 2)[2]
+    T = line.split(None, 1)
+    key = T[0].lower()
+    if len(T) == 2 and _lpSections.get(key, None) in ('min', 'max', 'st'):
+        return _lpSections[key], T[1]
+    return None, line
+
+def _lpTokens(s, lineno):
+    # list of (kind, value), kind is 'op', 'sign', 'num', 'name', 'label'
+    r = []
+    for m in _lpToken.finditer(s):
+        op, sign, num, name, colon, other = m.groups()
+        if op is not None: r.append(('op', _lpSenses[op]))
+        elif sign is not None: r.append(('sign', -1.0 if sign == '-' else 1.0))
+        elif num is not None: r.append(('num', float(num)))
+        elif name is not None:
+            if colon is not None: r.append(('label', name))
+            elif name.lower() in ('inf', 'infinity'): r.append(('num', inf))
+            else: r.append(('name', name))
+        elif other is not None and other.strip() != '':
+            raise OpenOptException('unsupported symbol "%s" in line %d of CPLEX LP file (quadratic terms are not implemented)' % (other, lineno+1))
+    return r
+
+def _lpLinear(tokens, L, lineno):
+    # linear expression -> (columns, coefficients, constant)
+    cols, vals, const = [], [], 0.0
+    sign, coef = 1.0, None
+    for kind, val in tokens:
+        if kind == 'sign':
+            if coef is not None:
+                const += sign * coef
+                sign, coef = 1.0, None
+            sign *= val
+        elif kind == 'num':
+            coef = val if coef is None else coef * val
+        elif kind == 'name':
+            cols.append(L.col(val))
+            vals.append(sign * (coef if coef is not None else 1.0))
+            sign, coef = 1.0, None
+        else:
+            raise OpenOptException('incorrect expression in line %d of CPLEX LP file' % (lineno+1))
+    if coef is not None:
+        const += sign * coef
+    return cols, vals, const
+
+def _lpNumber(tokens, lineno):
+    sign = 1.0
+    for kind, val in tokens:
+        if kind == 'sign': sign *= val
+        elif kind == 'num': return sign * val
+    raise OpenOptException('number is expected in line %d of CPLEX LP file' % (lineno+1))
+
+def readLP(filename, **kwargs):
+    '''
+    p = readLP(filename, **kwargs) reads CPLEX LP file, returns LP or MILP (if integer columns are present),
+    kwargs are passed to the prob constructor, column names are stored in p.colNames.
+    Columns are numbered in order of their 1st appearance in the file.
+    '''
+    L = _linearModel()
+    section = None
+    tokens, startLine = [], 0
+
+    def flush(tokens, lineno):
+        if len(tokens) == 0: return
+        if section in ('min', 'max'):
+            if tokens[0][0] == 'label': tokens = tokens[1:]
+            cols, vals, const = _lpLinear(tokens, L, lineno)
+            L.fCols.extend(cols)
+            L.fVals.extend(vals)
+            L.const += const
+        elif section == 'st':
+            if tokens[0][0] == 'label': tokens = tokens[1:]
+            ops = [k for k, (kind, val) in enumerate(tokens) if kind == 'op']
+            if len(ops) == 2: # lo <= expr <= hi
+                lo, hi = _lpNumber(tokens[:ops[0]], lineno), _lpNumber(tokens[ops[1]+1:], lineno)
+                if tokens[ops[0]][1] == 'G': lo, hi = hi, lo
+                cols, vals, const = _lpLinear(tokens[ops[0]+1:ops[1]], L, lineno)
+            elif len(ops) == 1:
+                cols, vals, const = _lpLinear(tokens[:ops[0]], L, lineno)
+                val = _lpNumber(tokens[ops[0]+1:], lineno)
+                sense = tokens[ops[0]][1]
+                lo, hi = (-inf if sense == 'L' else val), (inf if sense == 'G' else val)
+            else:
+                raise OpenOptException('incorrect constraint in line %d of CPLEX LP file' % (lineno+1))
+            i = len(L.rowLo)
+            L.rowLo.append(lo - const)
+            L.rowHi.append(hi - const)
+            L.rows.extend([i] * len(cols))
+            L.cols.extend(cols)
+            L.vals.extend(vals)
+
+    def bound(tokens, lineno):
+        names = [val for kind, val in tokens if kind == 'name']
+        if len(names) == 2 and names[1].lower() == 'free':
+            j = L.col(names[0])
+            L.lb[j], L.ub[j] = -inf, inf
+            return
+        if len(names) != 1:
+            raise OpenOptException('incorrect bound in line %d of CPLEX LP file' % (lineno+1))
+        j = L.col(names[0])
+        ops = [k for k, (kind, val) in enumerate(tokens) if kind == 'op']
+        k = [k for k, (kind, val) in enumerate(tokens) if kind == 'name'][0]
+        for o in ops:
+            sense = tokens[o][1]
+            if o > k: # x <= val
+                val = _lpNumber(tokens[o+1:], lineno)
+            else: # val <= x
+                val = _lpNumber(tokens[:o], lineno)
+                sense = {'L':'G', 'G':'L', 'E':'E'}[sense]
+            if sense in ('G', 'E'): L.lb[j] = val
+            if sense in ('L', 'E'): L.ub[j] = val
+            # negative upper bound doesn't change default lower one, like in CPLEX
+
+    file = open(filename, 'r')
+    try:
+        for lineno, line in enumerate(file):
+            if line.startswith('\\Problem name:') or line.startswith('\\ Problem name:'):
+                L.name = line.split(':', 1)[1].strip()
+            line = line.split('\\', 1)[0]
+            if line.strip() == '':
+                continue
+            newSection, rest = _lpSection(line, lineno)
+            if newSection is not None:
+                flush(tokens, startLine)
+                tokens = []
+                section = newSection
+                if section in ('min', 'max'):
+                    L.goal = 'maximum' if section == 'max' else 'minimum'
+                elif section == 'end':
+                    break
+                line = rest
+                if line.strip() == '':
+                    continue
+            if section in ('min', 'max'):
+                tokens += _lpTokens(line, lineno)
+            elif section == 'st':
+                for tok in _lpTokens(line, lineno):
+                    kind = tok[0]
+                    # constraint is finished by number after relation sign, e.g. "c1: x + y <= 5",
+                    # ranged constraints "lo <= x + y <= hi" have no names before the 1st sign
+                    if len(tokens) != 0 and (kind == 'label' or (finished and kind != 'num')):
+                        flush(tokens, startLine)
+                        tokens = []
+                    if len(tokens) == 0:
+                        startLine, hasName, hasOp, nameBeforeOp, finished = lineno, False, False, False, False
+                    tokens.append(tok)
+                    if kind == 'op':
+                        hasOp, nameBeforeOp, finished = True, hasName, False
+                    elif kind == 'name':
+                        hasName, finished = True, False
+                    elif kind == 'num':
+                        finished = hasOp and nameBeforeOp
+            elif section == 'bounds':
+                bound(_lpTokens(line, lineno), lineno)
+            elif section in ('int', 'bin'):
+                for name in line.split():
+                    j = L.col(name)
+                    L.intVars.add(j)
+                    if section == 'bin':
+                        L.lb[j], L.ub[j] = 0.0, 1.0
+            else:
+                raise OpenOptException('unexpected data in line %d of CPLEX LP file' % (lineno+1))
+        flush(tokens, startLine)
+    finally:
+        file.close()
+    return L.prob(**kwargs)
@@ -3,8 +3,9 @@ import numpy as np
 from setDefaultIterFuncs import USER_DEMAND_EXIT
 from ooMisc import killThread, setNonLinFuncsNumber
 from nonOptMisc import scipyInstalled, Vstack, isspmatrix, isPyPy
+from parallelDerivatives import getDerivativesExecutor, getPointsExecutor
 try:
-    from DerApproximator import get_d1
+    from DerApproximator import get_d1, get_sparsity_pattern, get_column_groups
     DerApproximatorIsInstalled = True
 except:
     DerApproximatorIsInstalled = False
@@ -82,6 +83,16 @@ class nonLinFuncs:
 
         if x.shape[0] != p.n and (x.ndim<2 or x.shape[1] != p.n): 
             p.err('x with incorrect shape passed to non-linear function')
+            
+        # values for all the funcs are cached, subset ind is taken from them
+        useCache = p.cache is not None and not getDerivative and not isspmatrix(x) and x.ndim == 1
+        if useCache:
+            r = p.cache.get(userFunctionType, x)
+            if r is not None:
+                p.nEvals['cacheHits'] += 1
+                return r if ind is None else r[ind]
+            p.nEvals['cacheMisses'] += 1
+            indToTake, ind = ind, None
 
         #TODO: code cleanup (below)
         if getDerivative or x.ndim <= 1 or x.shape[0] == 1:
@@ -105,6 +116,8 @@ class nonLinFuncs:
                                                funcs[i].D(x, fixedVars = p.fixedVars, useSparse=p.useSparse, fixedVarsScheduleID=p._FDVarsID, exactShape=True), 
                                                useSparse=p.useSparse, func=funcs[i], point=x)) \
                       for i in range(len(funcs))]
+            elif p.compileModel:
+                funcs2 = p._getCompiledFuncs(userFunctionType, funcs)
             else:
                 if p.freeVars is None or (p.fixedVars is not None and len(p.freeVars) < len(p.fixedVars)):
                     funcs2 = [(lambda x, i=i: \
@@ -191,16 +204,15 @@ class nonLinFuncs:
 #                else:
 #                    X = [p._vector2point(x[i]) for i in range(nXvectors)]
 #                    r = hstack([[fun(xx) for xx in X] for fun in Funcs]).reshape(1, -1)
+            elif p.vectorizedFuncs and ind is None:
+                # whole 2-D array of points is passed to each func
+                r = hstack([np.asarray(fun(*(x, ) + Args), float).reshape(nXvectors, -1) for fun in Funcs])
+                if userFunctionType == 'f': r = r.flatten()
             else:
-                X = [(x[i],) + Args for i in range(nXvectors)] 
-                
-                #r = hstack([[fun(*xx) for xx in X] for fun in Funcs])
-                R = []
-                for xx in X:
-                    tmp = [fun(*xx) for fun in Funcs]
-                    r_ = hstack(tmp[0]) if len(tmp) == 1 and isinstance(tmp[0], (list, tuple)) else hstack(tmp) if len(tmp) > 1 else tmp[0]
-                    R.append(r_)
-                
+                evaluator = _pointValues(Funcs, Args)
+                # points are independent, they can be evaluated concurrently (order of results is kept)
+                executor = getPointsExecutor(p, (id(p), userFunctionType, 'points')) if ind is None else None
+                R = list(executor.map(evaluator, x)) if executor is not None else [evaluator(xx) for xx in x]
                 r = hstack(R)#.T
                 #print(r.shape, userFunctionType)
                 
@@ -226,20 +238,51 @@ class nonLinFuncs:
             else:
                 finiteDiffNumbers[finiteDiffNumbers < diffInt] = diffInt[finiteDiffNumbers < diffInt]
 
+            patterns = getattr(p, userFunctionType + 'Pattern')
+            if patterns is not None and not isinstance(patterns, (list, tuple)):
+                patterns = [patterns]
+            if patterns is not None and len(patterns) != len(funcs2):
+                p.err('number of %sPattern elements (%d) differs from number of the funcs (%d)' % (userFunctionType, len(patterns), len(funcs2)))
+            # with vectorized funcs, Jacobian sparsity or several processes 
+            # all the funcs are differentiated, then required rows are taken
+            batched = p.vectorizedFuncs or patterns is not None or p.nProc != 1
+
             R = []
             #r = zeros((nFuncsToObtain, p.n))
-            for index, fun in enumerate(Funcs):
+            for index, fun in enumerate(funcs2 if batched else Funcs):
                 """                                                 getting derivatives                                                 """
                 def func(x):
                     _r = fun(*((x,) + Args))
                     return _r if type(_r) not in (list, tuple) or len(_r)!=1 else _r[0]
+                pattern = None if patterns is None else patterns[index]
+                if type(pattern) == str:
+                    if pattern != 'auto':
+                        p.err('incorrect %sPattern value "%s", should be array, list of arrays or "auto"' % (userFunctionType, pattern))
+                    # detected once, in the first point
+                    if not hasattr(p, '_detectedPatterns'): p._detectedPatterns = {}
+                    key = (userFunctionType, index)
+                    if key not in p._detectedPatterns:
+                        p._detectedPatterns[key] = get_sparsity_pattern(func, x, diffInt = finiteDiffNumbers, vectorized = p.vectorizedFuncs)
+                    pattern = p._detectedPatterns[key]
+                groups = None
+                if pattern is not None:
+                    # CPR grouping of the pattern columns is obtained once per pattern
+                    if not hasattr(p, '_patternGroups'): p._patternGroups = {}
+                    key = (userFunctionType, index)
+                    if key not in p._patternGroups or p._patternGroups[key][0] is not pattern:
+                        p._patternGroups[key] = (pattern, get_column_groups(pattern))
+                    groups = p._patternGroups[key][1]
                 d1 = get_d1(func, x, pointVal = None, diffInt = finiteDiffNumbers, 
-                            stencil=p.JacobianApproximationStencil, exactShape=True)
+                            stencil=p.JacobianApproximationStencil, exactShape=True, 
+                            vectorized = p.vectorizedFuncs, sparsityPattern = pattern, columnGroups = groups, 
+                            executor = getDerivativesExecutor(p, (id(p), userFunctionType, index)))
                 #r[agregate_counter:agregate_counter+d1.size] = d1
                 R.append(d1)
                     
 #                agregate_counter += atleast_1d(v).shape[0]
             r = vstack(R)
+            if batched and ind is not None:
+                r = r[ind]
             
         #if type(r) == matrix: r = r.A
 
@@ -288,6 +331,11 @@ class nonLinFuncs:
         #if userFunctionType == 'f' and p.isObjFunValueASingleNumber and r.size == 1:
             #r = r.item()
 
+        if useCache:
+            p.cache.put(userFunctionType, x, r)
+            if indToTake is not None:
+                r = r[indToTake]
+
         if userFunctionType == 'f' and hasattr(p, 'solver') and p.solver.funcForIterFcnConnection=='f' and hasattr(p, 'f_iter') and not getDerivative:
             if p.nEvals['f']%p.f_iter == 0 or nXvectors > 1:
                 p.iterfcn(x, r)
@@ -323,6 +371,18 @@ class nonLinFuncs:
         #TODO: patterns!
         nFuncs = getattr(p, 'n'+funcType)
         x = atleast_1d(x)
+        
+        # derivatives of all the funcs are cached, rows ind are taken from them
+        useCache = p.cache is not None
+        if useCache:
+            derivatives = p.cache.get(derivativesType, x)
+            if derivatives is not None:
+                p.nEvals['cacheHits'] += 1
+                if not isinstance(derivatives, ndarray) and (useSparse is False or not hasattr(p, 'solver') or not p.solver._canHandleScipySparse):
+                    derivatives = derivatives.toarray()
+                return derivatives if ind is None else derivatives[ind]
+            p.nEvals['cacheMisses'] += 1
+            indToTake, ind = ind, None
         if hasattr(p.userProvided, derivativesType) and getattr(p.userProvided, derivativesType):
                
             funcs = getattr(p.user, derivativesType)
@@ -409,9 +469,34 @@ class nonLinFuncs:
             if p.isObjFunValueASingleNumber and type(derivatives) == ndarray and derivatives.ndim > 1:
                 derivatives = derivatives.flatten()
         
+        if useCache:
+            p.cache.put(derivativesType, x, derivatives)
+            if indToTake is not None:
+                derivatives = derivatives[indToTake]
+        
         return derivatives
 
 
+    def _getCompiledFuncs(p, userFunctionType, funcs):
+        # compiled evaluation plans of FuncDesigner funcs (p.compileModel = True), built once per problem
+        if not hasattr(p, '_compiledFuncs'): p._compiledFuncs = {}
+        r = p._compiledFuncs.get(userFunctionType, None)
+        if r is not None: 
+            return r
+        from FuncDesigner import oofun
+        if p.freeVars is None or (p.fixedVars is not None and len(p.freeVars) < len(p.fixedVars)):
+            kw = {'Vars': p.freeVars}
+        else:
+            kw = {'fixedVars': p.fixedVars}
+        r = []
+        for fun in funcs:
+            if isinstance(fun, oofun):
+                r.append(fun.compile(fixedVarsScheduleID=p._FDVarsID, **kw))
+            else: # e.g. ooarray
+                r.append(lambda x, fun=fun: fun(x))
+        p._compiledFuncs[userFunctionType] = r
+        return r
+
     # the funcs below are not implemented properly yet
     def user_d2f(p, x):
         assert x.ndim == 1
@@ -513,3 +598,11 @@ def getFuncsAndExtractIndexes(p, funcs, ind, userFunctionType):
         #Funcs.append(lambda x, i=i: Funcs2[i][0](x)[Funcs2[i][1]])
     return Funcs#, inner_ind
     
+
+class _pointValues:
+    # values of all funcs at single point; picklable if the funcs are, thus can be passed to executors
+    def __init__(self, funcs, args):
+        self.funcs, self.args = funcs, args
+    def __call__(self, x):
+        tmp = [fun(*(x,) + self.args) for fun in self.funcs]
+        return hstack(tmp[0]) if len(tmp) == 1 and isinstance(tmp[0], (list, tuple)) else hstack(tmp) if len(tmp) > 1 else tmp[0]
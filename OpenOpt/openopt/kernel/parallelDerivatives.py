@@ -0,0 +1,68 @@
+from multiprocessing import Pool
+import sys
+
+# Functions are module-level, worker processes inherit them by fork,
+# thus only points and function values are pickled
+_funcs = {}
+
+def _worker(args):
+    key, x = args
+    return _funcs[key](x)
+
+class _boundExecutor:
+    # executor for DerApproximator.get_d1: map() evaluates function registered with the key
+    def __init__(self, pool, key):
+        self.pool, self.key = pool, key
+    def map(self, func, points):
+        return self.pool.map(self.key, func, points)
+
+class derivativesPool:
+    '''
+    Evaluates perturbed points of finite-difference derivatives in nProc worker processes.
+    Each function (f, c, h and their numbers) is registered at its first use,
+    the processes are restarted to inherit it;
+    function of later calls with the same key is expected to be the same.
+    '''
+    def __init__(self, nProc):
+        self.nProc = nProc
+        self.pool = None
+        self.keys = set()
+
+    def executor(self, key):
+        return _boundExecutor(self, key)
+
+    def map(self, key, func, points):
+        if key not in self.keys:
+            self.close()
+            _funcs[key] = func
+            self.keys.add(key)
+        if self.pool is None:
+            self.pool = Pool(processes = self.nProc)
+        return self.pool.map(_worker, [(key, x) for x in points])
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def finish(self):
+        self.close()
+        for key in self.keys:
+            _funcs.pop(key, None)
+        self.keys = set()
+
+def getDerivativesExecutor(p, key):
+    # None if derivatives should be obtained in the process itself
+    if p.nProc == 1:
+        return None
+    if not hasattr(p, '_derivativesPool'):
+        if sys.platform == 'win32':
+            p.warn('nProc > 1 requires fork-based multiprocessing, unavailable on Windows; 1 process will be used')
+            p._derivativesPool = None
+        else:
+            p._derivativesPool = derivativesPool(p.nProc)
+    return None if p._derivativesPool is None else p._derivativesPool.executor(key)
+
+def getPointsExecutor(p, key):
+    # for independent points, e.g. populations of GLP solvers: user-provided p.executor or the pool of nProc processes
+    return p.executor if p.executor is not None else getDerivativesExecutor(p, key)
@@ -48,9 +48,9 @@ def runProbSolver(p_, solver_str_or_instance=None, *args, **kwargs):
     #p = copy.deepcopy(p_, memo=None, _nil=[])
     p = p_
     if len(args) != 0: p.err('unexpected args for p.solve()')
-    if hasattr(p, 'was_involved'): p.err("""You can't run same prob instance for twice. 
+    if hasattr(p, 'was_involved') and p._compiled is None: p.err("""You can't run same prob instance for twice. 
     Please reassign prob struct. 
-    You can avoid it via using FuncDesigner oosystem.""")
+    You can avoid it via using FuncDesigner oosystem or p.compile().""")
     else: p.was_involved = True
 
     if solver_str_or_instance is None:
@@ -143,6 +143,8 @@ def runProbSolver(p_, solver_str_or_instance=None, *args, **kwargs):
     T = time()
     C = clock()
     p._Prepare()
+    if p._compiled is not None:
+        p._compiled._prepared(p)
     p.initTime = time() - T
     p.initCPUTime = clock() - C
     if p.initTime > 1 or p.initCPUTime > 1:
@@ -315,6 +317,10 @@ def runProbSolver(p_, solver_str_or_instance=None, *args, **kwargs):
 
         if p.istop == 0: p.istop = 1000
     finally:
+        if getattr(p, '_derivativesPool', None) is not None:
+            p._derivativesPool.finish()
+        if getattr(p, '_boxesEvaluator', None) is not None: # interalg with nProc > 1
+            p._boxesEvaluator.close()
         if p.isFDmodel:
             for v in p.freeVarsSet | p.fixedVarsSet:
                 if v.fields != ():
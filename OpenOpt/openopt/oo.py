@@ -105,6 +105,7 @@ def LP(*args, **kwargs):
     (see also other r fields)
     Solvers available for now:
     pclp (BSD) - premature but pure Python implementation with permissive license
+    rsimplex (BSD) - revised simplex with sparse LU of basis, bounds are handled implicitly, requires scipy
     lpSolve (LGPL) - requires lpsolve + Python bindings installations (all mentioned is available in http://sourceforge.net/projects/lpsolve)
     cvxopt_lp (GPL) - requires CVXOPT (http://abel.ee.ucla.edu/cvxopt)
     glpk(GPL2) - requires CVXOPT(http://abel.ee.ucla.edu/cvxopt) & glpk (www.gnu.org/software/glpk)
@@ -607,7 +608,9 @@ def MINLP(*args, **kwargs):
         p.discreteVars = {0: [1, 2.5], 15: (3.1, 4), 150: [4,5, 6]}
     discrtol (default 1e-5) - tolerance required for discrete constraints 
     available solvers: 
-    branb (branch-and-bound) - translation of fminconset routine, requires non-default string parameter nlpSolver
+    branb (branch-and-bound with NLP relaxations), requires non-default string parameter nlpSolver, 
+        optional: nodeSelection = 'hybrid' (default) | 'best' | 'depth', branching = 'pseudocost' (default) | 'first', 
+        node relaxations are solved concurrently for p.nProc > 1 or p.executor (see nodesPerStep)
     """
     return CMINLP(*args, **kwargs)
 
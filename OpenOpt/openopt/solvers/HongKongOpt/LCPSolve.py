@@ -45,6 +45,9 @@ THE SOFTWARE.
 from numpy import *
 
 def LCPSolve(M,q, pivtol=1e-8): # pivtol = smallest allowable pivot element
+    if hasattr(M, 'tocsc'): # scipy.sparse matrix: LU-based pivoting instead of dense tableau
+        from LCPSparse import LCPSolveSparse
+        return LCPSolveSparse(M, q, pivtol)
     rayTerm = False
     loopcount = 0
     if (q >= 0.).all(): # Test missing in Rob Dittmar's code
@@ -0,0 +1,152 @@
+''' Sparse versions of LCPSolve and QPSolve (require scipy).
+
+   LCPSolveSparse(M, q): Lemke's complementary pivoting for
+       w = M z + q, w and z >= 0, w'z = 0
+   with scipy.sparse M. Instead of pivoting the whole n x (2n+2) tableau
+   the basis B (n columns of [I, -M, -1]) is kept as sparse LU factorization
+   with product-form (eta) updates; only the entering column B^-1 a is computed
+   on each iteration. Returns are the same as for LCPSolve.
+   B is refactorized after "refactor" updates, by default (None) when time spent
+   on the updates since previous factorization exceeds the one of the factorization
+   (it minimizes average time per iteration since the updates cost grows linearly).
+
+   QPSolveSparse(Q, e, A, b, Aeq, beq, lb, ub): QPSolve with sparse Q, A, Aeq:
+   the KKT matrix is factorized by splu instead of being inverted, M = A0 inv(B) A0'
+   is assembled by blocks of columns and kept sparse if it has few nonzeros.
+'''
+
+from time import time
+from numpy import asfarray, zeros, ones, arange, argmin, flatnonzero, maximum, concatenate, isfinite
+from openopt.kernel.nonOptMisc import isspmatrix
+from LCPSolve import LCPSolve
+
+def LCPSolveSparse(M, q, pivtol=1e-8, refactor=None):
+    from scipy.sparse import csc_matrix, eye, hstack
+    from scipy.sparse.linalg import splu
+    q = asfarray(q).flatten()
+    n = q.size
+    if (q >= 0.).all():
+        return q, zeros(n), (1, 0., 0)
+
+    # columns of [I, -M, -1] correspond to w, z and the artificial variable z0
+    C = hstack((eye(n), -csc_matrix(M), csc_matrix(-ones((n, 1))))).tocsc()
+    def column(k):
+        v = zeros(n)
+        ind = slice(C.indptr[k], C.indptr[k+1])
+        v[C.indices[ind]] = C.data[ind]
+        return v
+
+    # artificial variable enters the basis instead of w with most negative q
+    basis = arange(n)
+    r = argmin(q)
+    basis[r] = 2*n
+    cand = r + n
+    xB = q - q[r]
+    xB[r] = -q[r]
+
+    state = {}
+    def factorize():
+        t = time()
+        state['lu'] = splu(C[:, basis].tocsc())
+        state['etas'] = []
+        state['time'], state['etaTime'] = time() - t, 0.0
+    def ftran(v):
+        w = state['lu'].solve(v)
+        t = time()
+        for r, alpha in state['etas']:
+            wr = w[r] / alpha[r]
+            w -= wr * alpha
+            w[r] = wr
+        state['etaTime'] += time() - t
+        return w
+    factorize()
+
+    rayTerm = False
+    loopcount = 0
+    while True:
+        loopcount += 1
+        alpha = ftran(column(cand))
+        ind = flatnonzero(alpha > pivtol)
+        if ind.size == 0:
+            rayTerm = True
+            break
+        quots = xB[ind] / alpha[ind]
+        ties = ind[quots <= quots.min()]
+        # on ties z0 leaves, that finishes the algorithm
+        tmp = flatnonzero(basis[ties] == 2*n)
+        r = ties[tmp[0]] if tmp.size != 0 else ties[0]
+
+        theta = xB[r] / alpha[r]
+        xB -= theta * alpha
+        xB[r] = theta
+        oldVar = basis[r]
+        basis[r] = cand
+        state['etas'].append((r, alpha))
+        if oldVar == 2*n:
+            break
+        cand = oldVar - n if oldVar >= n else oldVar + n
+        if (len(state['etas']) >= refactor) if refactor is not None else (state['etaTime'] > state['time']):
+            factorize()
+            xB = maximum(state['lu'].solve(q), 0.0) # remove round-off negatives
+
+    vars = zeros(2*n+1)
+    vars[basis] = xB
+    w, z = vars[:n], vars[n:2*n]
+    return w, z, (2 if rayTerm else 1, vars[2*n], loopcount)
+
+def QPSolveSparse(Q, e, A=None, b=None, Aeq=None, beq=None, lb=None, ub=None, maxDensity=0.1, blockSize=256):
+    '''
+    (x, retcode) = QPSolveSparse(...), the same as QPSolve, x is None on ray termination
+    (LCP of size = number of inequalities and finite bounds is solved)
+    '''
+    from scipy.sparse import csc_matrix, csr_matrix, eye, vstack, hstack, bmat
+    from scipy.sparse.linalg import splu
+    nvars = Q.shape[0]
+    e = asfarray(e).flatten()
+    rowsA, rowsb = ([csr_matrix(A)], [asfarray(b).flatten()]) if A is not None else ([], [])
+    I = eye(nvars, format='csr')
+    if lb is not None:
+        ind = flatnonzero(isfinite(lb))
+        rowsA.append(-I[ind])
+        rowsb.append(-asfarray(lb)[ind])
+    if ub is not None:
+        ind = flatnonzero(isfinite(ub))
+        rowsA.append(I[ind])
+        rowsb.append(asfarray(ub)[ind])
+    A = vstack(rowsA).tocsr() if len(rowsA) != 0 else csr_matrix((0, nvars))
+    b = concatenate(rowsb) if len(rowsb) != 0 else zeros(0)
+    n_ineq = A.shape[0]
+
+    # see QPSolve for the KKT system and the LCP derived from it
+    if Aeq is not None:
+        Aeq = csr_matrix(Aeq)
+        B = bmat([[csc_matrix(Q), Aeq.T], [-Aeq, None]]).tocsc()
+        A0 = hstack((A, csr_matrix((n_ineq, Aeq.shape[0])))).tocsr()
+        ee = concatenate((e, asfarray(beq).flatten()))
+    else:
+        B, A0, ee = csc_matrix(Q), A, e
+    lu = splu(B)
+
+    if n_ineq == 0:
+        return lu.solve(-ee)[:nvars], (1, 0., 0)
+
+    # M = A0 inv(B) A0' by blocks of columns, thus dense inv(B) A0' is never stored whole
+    A0T = A0.T.tocsc()
+    blocks = []
+    for j in range(0, n_ineq, blockSize):
+        Y = lu.solve(A0T[:, j:j+blockSize].toarray())
+        blocks.append(csc_matrix(A0.dot(Y)))
+    M = hstack(blocks).tocsr()
+    q = b + A0.dot(lu.solve(ee))
+    if M.nnz > maxDensity * n_ineq ** 2:
+        M = M.toarray()
+
+    s, lmbd, retcode = LCPSolve(M, q)
+    if retcode[0] != 1:
+        return None, retcode
+    kk = -ee
+    kk[:nvars] -= A.T.dot(lmbd)
+    return lu.solve(kk)[:nvars], retcode
+
+def isSparseQP(*args):
+    return any(isspmatrix(arg) for arg in args)
@@ -22,6 +22,7 @@ THE SOFTWARE.
 
 from numpy import *
 from LCPSolve import LCPSolve
+from LCPSparse import QPSolveSparse, isSparseQP
 
 def QPSolve(Q, e, A=None, b=None, Aeq=None, beq=None, lb=None, ub=None):
     '''
@@ -32,7 +33,10 @@ def QPSolve(Q, e, A=None, b=None, Aeq=None, beq=None, lb=None, ub=None):
     into an LCP problem. It does well up to few hundred variables
     and dense problems (it doesn't take advantage of sparsity).
     It fails if Aeq is not full row rank, or if Q is singular.
+    If any of Q, A, Aeq is scipy.sparse matrix, QPSolveSparse is used.
     '''
+    if isSparseQP(Q, A, Aeq):
+        return QPSolveSparse(Q, e, A, b, Aeq, beq, lb, ub)
     nvars = Q.shape[0] # also e.shape[0]
     # convert lb and ub (if present) into Ax <=> b conditions, but
     # skip redundant rows: the ones where lb[i] == -Inf or ub[i] == Inf
@@ -11,8 +11,8 @@ class lcpsolve(baseSolver):
     __alg__ = "Lemke's Complementary Pivot algorithm"
     __optionalDataThatCanBeHandled__ = []
     #iterfcnConnected = True
-    #_canHandleScipySparse = True
-    __info__ = '''  '''
+    _canHandleScipySparse = True
+    __info__ = ''' scipy.sparse M is handled by LU-based pivoting (requires scipy) '''
     pivtol = 1e-8
 
     def __init__(self): pass
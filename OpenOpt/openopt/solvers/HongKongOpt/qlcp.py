@@ -23,6 +23,7 @@ THE SOFTWARE.
 from numpy import *
 from scipy.linalg import lu_factor, lu_solve
 from LCPSolve import LCPSolve
+from LCPSparse import QPSolveSparse, isSparseQP
 
 def qlcp(Q, e, A=None, b=None, Aeq=None, beq=None, lb=None, ub=None, QI=None):
     '''
@@ -39,7 +40,10 @@ def qlcp(Q, e, A=None, b=None, Aeq=None, beq=None, lb=None, ub=None, QI=None):
     its inverse, such as DFP or BFGS.
     Returns: x, the solution (or None in case of failure due to ray 
     termination in the LCP solver).
+    If any of Q, A, Aeq is scipy.sparse matrix, QPSolveSparse is used (QI is ignored then).
     '''
+    if isSparseQP(Q, A, Aeq):
+        return QPSolveSparse(Q, e, A, b, Aeq, beq, lb, ub)[0]
     nvars = Q.shape[0] # also e.shape[0]
     # convert lb and ub (if present) into Ax <=> b conditions, but
     # skip redundant rows: the ones where lb[i] == -Inf or ub[i] == Inf
@@ -145,7 +149,7 @@ def qlcp(Q, e, A=None, b=None, Aeq=None, beq=None, lb=None, ub=None, QI=None):
     ee = concatenate((e, beq)) if Aeq != None else e
     
     if A == None: # if no ineq constraints, no need of LCP: just solve a linear system
-        xmu = linalg.solve(B, ee)
+        xmu = linalg.solve(B, -ee)
         x = xmu[:nvars]
     else:   # ve have to compute B's inverse, possibly using Q's inverse (if passed as parameter)
         if QI == None:
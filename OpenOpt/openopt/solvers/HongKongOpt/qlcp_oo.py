@@ -11,6 +11,7 @@ class qlcp(baseSolver):
     #__isIterPointAlwaysFeasible__ = True
     
     __optionalDataThatCanBeHandled__ = ['lb', 'ub', 'A', 'b', 'Aeq', 'beq']
+    _canHandleScipySparse = True
     
     def __init__(self): pass
     def __solver__(self, p):
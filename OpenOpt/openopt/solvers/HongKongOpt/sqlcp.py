@@ -85,8 +85,8 @@ def sqlcp(f, x0, df=None, A=None, b=None, Aeq=None, beq=None, lb=None, ub=None,
         niter += 1
         
         # compute the b, beq, lb and ub for the QP sub-problem (as bx, beqx, lbx, ubx)
-        bx = b if b == None else b-dot(A,x)
-        beqx = beq if beq == None else beq-dot(Aeq,x)
+        bx = b if b == None else b-A.dot(x)
+        beqx = beq if beq == None else beq-Aeq.dot(x)
         lbx = lb if lb == None else lb - x
         ubx = ub if ub == None else ub - x
 
@@ -10,7 +10,7 @@ class sqlcp(baseSolver):
     __alg__ = "an SQP implementation"
     __optionalDataThatCanBeHandled__ = ['A', 'Aeq', 'b', 'beq', 'lb', 'ub']
     iterfcnConnected = True
-    #_canHandleScipySparse = True
+    _canHandleScipySparse = True
     QPsolver=None
     __info__ = '''SQP solver. Approximates f in x0 with paraboloid with same gradient and hessian,
     then finds its minimum with a quadratic solver (qlcp by default) and uses it as new point, 
@@ -1,8 +1,11 @@
+PythonSum = sum
 from openopt.kernel.baseSolver import baseSolver
 from openopt.kernel.ooMisc import isSolved
 from openopt.kernel.setDefaultIterFuncs import IS_NAN_IN_X, SMALL_DELTA_X, SMALL_DELTA_F
+from openopt.kernel.parallelDerivatives import getPointsExecutor
 #from numpy import asarray, inf, ones, nan
 from numpy import *
+from heapq import heappush, heappop, heapify
 #import openopt
 from openopt import NLP, OpenOptException
 
@@ -11,123 +14,161 @@ class branb(baseSolver):
     __license__ = "BSD"
     __authors__ = "Ingar Solberg, Institutt for teknisk kybernetikk, Norges Tekniske Hrgskole, Norway, translated to Python by Dmitrey"
     __homepage__ = ''
-    __alg__ = "branch-and-cut (currently the implementation is quite primitive)"
+    __alg__ = "branch-and-bound with NLP relaxations"
     __info__ = ''
     __optionalDataThatCanBeHandled__ = ['A', 'Aeq', 'b', 'beq', 'lb', 'ub', 'discreteVars', 'c', 'h']
     iterfcnConnected = True
     __isIterPointAlwaysFeasible__ = lambda self, p: True
     #eps = 1e-7
     nlpSolver = None
+    nodeSelection = 'hybrid' # 'depth' (depth-first), 'best' (best bound) or 'hybrid' (depth-first until 1st solution is found, best bound then)
+    branching = 'pseudocost' # or 'first' (1st violated discrete variable)
+    nodesPerStep = None # number of nodes solved concurrently (via p.executor or p.nProc processes), default p.nProc
+
 
-    
     def __init__(self): pass
 
     def __solver__(self, p):
         if self.nlpSolver is None: p.err('you should explicitely provide parameter nlpSolver (name of NLP solver to use for NLP subproblems)')
-        
+        if self.nodeSelection not in ('hybrid', 'best', 'depth'):
+            p.err('branb: nodeSelection should be "hybrid", "best" or "depth"')
+        if self.branching not in ('pseudocost', 'first'):
+            p.err('branb: branching should be "pseudocost" or "first"')
+
         # TODO: check it
         # it can be removed in other place during prob preparation
         for key in [IS_NAN_IN_X, SMALL_DELTA_X, SMALL_DELTA_F]:
             if key in p.kernelIterFuncs.keys():
                 p.kernelIterFuncs.pop(key)
-        
+
         p.nlpSolver = self.nlpSolver
-        startPoint = p.point(p.x0)
-        startPoint._f = inf
-        fPoint = fminconset(p, startPoint, p)
+        fPoint = fminconset(p, self)
         p.iterfcn(fPoint)
         p.istop = 1000
-        
-        
-def fminconset(p_current, bestPoint, p):
-    p2 = milpTransfer(p)
-    p2.lb, p2.ub = p_current.lb, p_current.ub
-    
-    
-    try:
-        r = p2.solve(p.nlpSolver)
-        curr_NLP_Point = p.point(r.xf)
-        curr_NLP_Point._f = r.ff
-    except OpenOptException:
-        r = None
-    
-    resultPoint = p.point(bestPoint.x)
-    if r is None or r.istop <0 or curr_NLP_Point.f() >= bestPoint.f(): 
-        resultPoint._f  = inf
-        return resultPoint
-    elif r.istop == 0:
-        pass# TODO: fix it
-    
-    # check if all discrete constraints are satisfied
-    x = curr_NLP_Point.x
-    k = -1
-    for i in p.discreteVars.keys():#range(m):	# check x-vector
-        # TODO: replace it by "for i, val in dict.itervalues()"
-        if not any(abs(x[i] - p.discreteVars[i]) < p.discrtol):
-            k=i	# Violation of this set constraint.
-            break # Go and split for this x-component
-
-    if k != -1:		# some discrete constraint violated => recursive search is required
-        p.debugmsg('k='+str(k)+' x[k]=' + str(x[k]) + ' p.discreteVars[k]=' +str(p.discreteVars[k]))
-        Above=where(p.discreteVars[k]>x[k])[0]
-        Below=where(p.discreteVars[k]<x[k])[0]
-        resultPoint._f = inf
-    else:
-        if curr_NLP_Point.f() < bestPoint.f():
-            bestPoint = curr_NLP_Point
-        p.iterfcn(curr_NLP_Point)
-        if p.istop:
-            if bestPoint.betterThan(curr_NLP_Point):
+
+
+class _node:
+    def __init__(self, lb, ub, x0, bound, depth, branch = None):
+        # x0 is solution of parent relaxation (warm start), bound is its objective value,
+        # branch is (discrete var index, 0 for down / 1 for up, distance of parent x[index] to the new bound)
+        self.lb, self.ub, self.x0, self.bound, self.depth, self.branch = lb, ub, x0, bound, depth, branch
+
+def fminconset(p, solver):
+    discreteVars = dict((i, array([0, 1]) if v is bool or isinstance(v, str) else asarray(v)) for i, v in p.discreteVars.items())
+    keys = sorted(discreteVars.keys())
+
+    relaxation = _relaxation(p)
+    executor = getPointsExecutor(p, (id(p), 'branb'))
+    nodesPerStep = 1 if executor is None else solver.nodesPerStep or max((p.nProc, 1))
+    costs = _pseudoCosts()
+
+    bestPoint = p.point(p.x0)
+    bestPoint._f = inf
+    depthFirst = solver.nodeSelection != 'best'
+    nodes, nCreated = [], 0
+    push = lambda node: nodes.append(node) if depthFirst else heappush(nodes, (node.bound, nCreated, node))
+    push(_node(p.lb, p.ub, p.x0, -inf, 0))
+
+    while len(nodes) != 0:
+        batch = []
+        while len(nodes) != 0 and len(batch) < nodesPerStep:
+            node = nodes.pop() if depthFirst else heappop(nodes)[2]
+            if node.bound < bestPoint.f():
+                batch.append(node)
+
+        Args = [(node.lb, node.ub, node.x0) for node in batch]
+        # relaxations of different nodes are independent, thus they can be solved concurrently
+        R = executor.map(relaxation, Args) if len(batch) > 1 else [relaxation(arg) for arg in Args]
+
+        for node, res in zip(batch, R):
+            if res is None: # infeasible or failed
+                continue
+            x, f = res
+            costs.update(node, f)
+            if f >= bestPoint.f():
+                continue
+
+            violated = [i for i in keys if not any(abs(x[i] - discreteVars[i]) < p.discrtol)]
+            if len(violated) == 0:
+                bestPoint = p.point(x)
+                bestPoint._f = f
                 p.iterfcn(bestPoint)
-            raise isSolved
-        return curr_NLP_Point#bestPoint#x, h, exitflag
-    
+                if p.istop:
+                    raise isSolved
+                if depthFirst and solver.nodeSelection == 'hybrid':
+                    depthFirst = False
+                    nodes = [(Node.bound, j, Node) for j, Node in enumerate(nodes)]
+                    heapify(nodes)
+                    nCreated = len(nodes)
+                continue
 
-    # Solve first subproblem if it exists
-    if Below.size != 0:
-        below = Below[-1]# index of largest set element below x(k)
-        
-        p3 = milpTransfer(p)
-        p3.x0 = x.copy()
-        
-        ub1 = p_current.ub.copy()
-        ub1[k] = min((ub1[k], p.discreteVars[k][below]))	# new upper bound on x[k] for 1st subproblem
-        ub1[k] = p.discreteVars[k][below]
-        p3.ub = ub1
-        p3.lb = p_current.lb
-        
-        Point_B =  fminconset(p3, bestPoint, p)
-        resultPoint = Point_B
-        if p.discreteConstraintsAreSatisfied(Point_B.x) and Point_B.betterThan(bestPoint):
-            bestPoint = Point_B
-            #p.iterfcn(bestPoint)
-
-    # Solve second subproblem if it exists
-    if Above.size != 0:
-        above = Above[0]# index of smallest set element above x(k)
-        
-        p4 = milpTransfer(p)
-        p4.x0 = x.copy()
-        
-        lb1=p_current.lb.copy()
-        lb1[k]=max((lb1[k], p.discreteVars[k][above]))# new upper bound on x[k] for 1st subproblem
-        lb1[k] =  p.discreteVars[k][above]
-        p4.lb = lb1
-        p4.ub = p_current.ub
-        
-        Point_A =  fminconset(p4, bestPoint, p)
-        resultPoint = Point_A
-        if p.discreteConstraintsAreSatisfied(Point_A.x) and Point_A.betterThan(bestPoint):
-            bestPoint = Point_A        
-            #p.iterfcn(bestPoint)
-    
-    if Below.size != 0 and Above.size != 0:
-        if Point_A.f() < Point_B.f():
-            resultPoint = Point_A
-        else:
-            resultPoint = Point_B
-            
-    return resultPoint#bestPoint
+            # branching
+            if solver.branching == 'first':
+                k = violated[0]
+            else:
+                k = violated[argmax([costs.score(i, x[i], discreteVars[i]) for i in violated])]
+            p.debugmsg('k='+str(k)+' x[k]=' + str(x[k]) + ' p.discreteVars[k]=' +str(discreteVars[k]))
+            values = discreteVars[k]
+            Below, Above = values[values < x[k]], values[values > x[k]]
+            children = []
+            if Below.size != 0 and Below[-1] >= node.lb[k]:
+                ub = node.ub.copy()
+                ub[k] = Below[-1] # largest set element below x[k]
+                children.append(_node(node.lb, ub, x, f, node.depth+1, (k, 0, x[k] - Below[-1])))
+            if Above.size != 0 and Above[0] <= node.ub[k]:
+                lb = node.lb.copy()
+                lb[k] = Above[0] # smallest set element above x[k]
+                children.append(_node(lb, node.ub, x, f, node.depth+1, (k, 1, Above[0] - x[k])))
+
+            # for depth-first the child nearest to x is handled first
+            children.sort(key = lambda node: -node.branch[2])
+            for child in children:
+                push(child)
+                nCreated += 1
+    return bestPoint
+
+class _pseudoCosts:
+    # average objective increase per unit of the branched variable change, for down and up branches
+    def __init__(self):
+        self.sums, self.nums = {}, {}
+
+    def update(self, node, f):
+        if node.branch is None: return
+        k, direction, dist = node.branch
+        key = (k, direction)
+        self.sums[key] = self.sums.get(key, 0.0) + max((f - node.bound, 0.0)) / dist
+        self.nums[key] = self.nums.get(key, 0) + 1
+
+    def get(self, key):
+        if key in self.nums:
+            return self.sums[key] / self.nums[key]
+        # uninitialized: average of known ones
+        return PythonSum(self.sums.values()) / PythonSum(self.nums.values()) if len(self.nums) != 0 else 1.0
+
+    def score(self, k, x, values):
+        down, up = x - values[values < x], values[values > x] - x
+        down = down[-1] if down.size != 0 else 0.0
+        up = up[0] if up.size != 0 else 0.0
+        return max((self.get((k, 0)) * down, 1e-6)) * max((self.get((k, 1)) * up, 1e-6))
+
+class _relaxation:
+    # NLP relaxation of a node; module-level class, thus it can be passed to p.executor
+    def __init__(self, p):
+        self.p = p
+
+    def __call__(self, args):
+        lb, ub, x0 = args
+        p2 = milpTransfer(self.p)
+        p2.lb, p2.ub, p2.x0 = lb, ub, clip(x0, lb, ub)
+        try:
+            r = p2.solve(self.p.nlpSolver)
+        except OpenOptException:
+            return None
+        if r.istop < 0:
+            return None
+        elif r.istop == 0:
+            pass# TODO: fix it
+        return r.xf, r.ff
 
 def milpTransfer(originProb):
     newProb = NLP(originProb.f, originProb.x0)
@@ -144,8 +185,3 @@ def milpTransfer(originProb):
     newProb.iprint = -1
     newProb.nlpSolver = originProb.nlpSolver 
     return newProb
-
-
-        
-        
-        
@@ -1,6 +1,6 @@
 #from numpy import asfarray, argmax, sign, inf, log10
 from openopt.kernel.baseSolver import baseSolver
-from numpy import asfarray,  inf,  atleast_1d
+from numpy import asfarray,  inf,  atleast_1d, ravel
 from openopt.kernel.setDefaultIterFuncs import SMALL_DELTA_X,  SMALL_DELTA_F
 
 class galileo(baseSolver):
@@ -21,6 +21,7 @@ class galileo(baseSolver):
     crossoverRate = 1.0 # 1.0 means always
     mutationRate = 0.05 # not very often
     useInteger = False # use float by default
+    seed = None # seed of random generator, None means it's initialized by current time
     _requiresFiniteBoxBounds = True
 
 
@@ -33,9 +34,14 @@ class galileo(baseSolver):
 
         #create an initial population of 10 chromosomes
         P = Population(self.population)# CHECKME! is the Population size optimal?
+        if self.seed is not None:
+            P.generator.seed(self.seed)
 
         #use fitness as our evaluation function
         P.evalFunc = lambda x: -p.f(x) # fitness
+        
+        # all new chromosomes are evaluated by single call of p.f with 2-D array
+        P.batchEvalFunc = lambda X: -p.f(asfarray(X))
 
         #minimum values the genes can take
         P.chromoMinValues = p.lb.tolist()
@@ -241,6 +247,7 @@ class Population:
     self.mutationCount = 0
 
     self.evalFunc = None
+    self.batchEvalFunc = None # if set, fitness of all chromosomes to be evaluated is obtained by single call
     self.mutateFunc = None
     self.selectFunc = None
     self.crossoverFunc = None
@@ -280,6 +287,7 @@ class Population:
     Be sure to assign an evalFunc
     """
 
+    self.evaluateBatch(self.currentGeneration)
     self.sumFitness = 0.0
     self.avgFitness = 0.0
     self.maxFitness = self.currentGeneration[0].getFitness()
@@ -296,6 +304,19 @@ class Population:
 
     self.avgFitness = self.sumFitness/len(self.currentGeneration)
 
+  def evaluateBatch(self, chromos):
+    """Evaluates chromosomes without cached fitness values by single call
+    of batchEvalFunc with list of their genes (if batchEvalFunc is assigned).
+    """
+    if self.batchEvalFunc is None:
+      return
+    toEval = [chromo for chromo in chromos if chromo.fitness is None]
+    if len(toEval) == 0:
+      return
+    fitness = ravel(self.batchEvalFunc([chromo.genes for chromo in toEval]))
+    for chromo, f in zip(toEval, fitness):
+      chromo.fitness = f
+
   def mutate(self):
     """At probability mutationRate, mutates each gene of each chromosome. That
     is, each gene has a mutationRate chance of being randomly re-initialized.
@@ -338,6 +359,7 @@ class Population:
     replace_Generational.
     """
 
+    self.evaluateBatch(self.nextGeneration)
     return self.replaceFunc()
 
   def select_Roulette(self):
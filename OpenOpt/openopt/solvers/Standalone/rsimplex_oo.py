@@ -0,0 +1,206 @@
+from numpy import asarray, asfarray, zeros, ones, hstack, where, inf, nan, isfinite, abs, arange, \
+logical_and, logical_or, logical_not, argmax, sqrt, flatnonzero, empty
+from openopt.kernel.baseSolver import baseSolver
+from openopt.kernel.nonOptMisc import scipyInstalled, scipyAbsentMsg
+from openopt.kernel.setDefaultIterFuncs import SOLVED_WITH_UNIMPLEMENTED_OR_UNKNOWN_REASON, IS_MAX_ITER_REACHED, \
+FAILED_WITH_UNIMPLEMENTED_OR_UNKNOWN_REASON
+
+class rsimplex(baseSolver):
+    __name__ = 'rsimplex'
+    __license__ = "BSD"
+    __authors__ = ''
+    __alg__ = 'two-phase primal revised simplex method for bounded variables, sparse LU of basis with product-form updates'
+    __info__ = '''
+    requires scipy (sparse matrices and splu); bounds lb <= x <= ub are handled implicitly (not as rows),
+    Ax <= b rows get slack variables, Aeq x = beq and infeasible rows get artificial ones (phase 1)
+    Parameters:
+        refactor - number of basis updates before its new LU factorization (default 64)
+        maxPivots - None (default) means 10 * (nRows + nCols) + 1000
+    '''
+    __optionalDataThatCanBeHandled__ = ['A', 'Aeq', 'b', 'beq', 'lb', 'ub']
+    _canHandleScipySparse = True
+    refactor = 64
+    maxPivots = None
+
+    def __init__(self): pass
+
+    def __solver__(self, p):
+        if not scipyInstalled:
+            p.err(scipyAbsentMsg)
+        from scipy.sparse import csc_matrix, hstack as sp_hstack, vstack as sp_vstack, eye as sp_eye
+        n, nLinInEq, nLinEq = p.n, p.b.size, p.beq.size
+
+        # rows: [A I; Aeq 0], columns: x, slacks of A x <= b
+        A = csc_matrix(p.A) if nLinInEq != 0 else csc_matrix((0, n))
+        Aeq = csc_matrix(p.Aeq) if nLinEq != 0 else csc_matrix((0, n))
+        M = sp_vstack((sp_hstack((A, sp_eye(nLinInEq, nLinInEq))),
+                       sp_hstack((Aeq, csc_matrix((nLinEq, nLinInEq)))))).tocsc()
+        rhs = hstack((p.b, p.beq)).astype(float)
+        lb, ub = hstack((p.lb, zeros(nLinInEq))), hstack((p.ub, inf*ones(nLinInEq)))
+        c = hstack((p.f, zeros(nLinInEq))).astype(float)
+
+        maxPivots = self.maxPivots if self.maxPivots is not None else 10 * (M.shape[0] + M.shape[1]) + 1000
+        x, status, nPivots = revisedSimplex(c, M, rhs, lb, ub, nLinInEq, self.refactor, maxPivots, p)
+        p.iter = nPivots
+        if status == 'optimal':
+            p.istop, p.msg = SOLVED_WITH_UNIMPLEMENTED_OR_UNKNOWN_REASON, 'optimal solution has been obtained'
+            p.xf = x[:n]
+        elif status == 'max pivots':
+            p.istop, p.msg = IS_MAX_ITER_REACHED, 'max number of pivots (%d) has been reached' % maxPivots
+            p.xf = x[:n]
+        else:
+            p.istop, p.msg = FAILED_WITH_UNIMPLEMENTED_OR_UNKNOWN_REASON, 'problem is ' + status
+            p.xf = nan * ones(n)
+
+
+def revisedSimplex(c, M, rhs, lb, ub, nSlacks, refactor, maxPivots, p):
+    '''
+    x, status, nPivots = revisedSimplex(c, M, rhs, lb, ub, nSlacks, refactor, maxPivots, p)
+    minimizes c x subject to M x = rhs, lb <= x <= ub,
+    last nSlacks columns of M are slacks of the first nSlacks rows (unit columns);
+    status is 'optimal', 'infeasible', 'unbounded' or 'max pivots'
+    '''
+    from scipy.sparse import csc_matrix, hstack as sp_hstack
+    m, N = M.shape
+    nCols = N - nSlacks
+
+    # nonbasic variables are set to their finite bound (lower one if any) or 0 for free ones
+    x = where(isfinite(lb), lb, where(isfinite(ub), ub, 0.0))
+    x[nCols:] = 0.0
+    r = rhs - M.dot(x)
+
+    # initial basis: slacks of the rows they are feasible for, artificial variables for the others
+    basis = empty(m, int)
+    slackRows = arange(nSlacks)
+    feasibleSlacks = r[:nSlacks] >= 0
+    basis[slackRows[feasibleSlacks]] = nCols + slackRows[feasibleSlacks]
+    artRows = hstack((slackRows[logical_not(feasibleSlacks)], arange(nSlacks, m)))
+    nArt = artRows.size
+    artSigns = where(r[artRows] >= 0, 1.0, -1.0)
+    basis[artRows] = N + arange(nArt)
+    M = sp_hstack((M, csc_matrix((artSigns, (artRows, arange(nArt))), shape = (m, nArt)))).tocsc()
+    lb, ub = hstack((lb, zeros(nArt))), hstack((ub, inf * ones(nArt)))
+    x = hstack((x, zeros(nArt)))
+    x[basis] = abs(r)
+
+    engine = simplexEngine(M, rhs, lb, ub, x, basis, refactor, maxPivots)
+
+    if nArt != 0:
+        c1 = hstack((zeros(N), ones(nArt)))
+        status = engine.run(c1)
+        if status != 'optimal':
+            return engine.x[:N], status, engine.nPivots
+        if engine.x[N:].sum() > 1e-7 * max((1.0, abs(rhs).max())):
+            return engine.x[:N], 'infeasible', engine.nPivots
+        p.debugmsg('rsimplex: phase 1 finished, %d pivots' % engine.nPivots)
+        # artificial variables are fixed to zero, basic ones leave basis by degenerate pivots
+        engine.ub[N:] = 0.0
+        engine.x[N:] = 0.0
+        engine.refresh()
+
+    status = engine.run(hstack((c, zeros(nArt))))
+    return engine.x[:N], status, engine.nPivots
+
+
+class simplexEngine:
+    pivTol = 1e-9
+    feasTol = 1e-9
+    dualTol = 1e-9
+    maxDegenerate = 50 # Bland's rule is used after so many pivots without objective change
+
+    def __init__(self, M, rhs, lb, ub, x, basis, refactor, maxPivots):
+        self.M, self.MT, self.rhs, self.lb, self.ub, self.x, self.basis = M, M.T.tocsr(), rhs, lb, ub, x, basis
+        self.refactor, self.maxPivots = refactor, maxPivots
+        self.nPivots = 0
+        self.isBasic = zeros(M.shape[1], bool)
+        self.isBasic[basis] = True
+        self.colNorms = sqrt(asarray(M.multiply(M).sum(0)).flatten()) + 1.0
+        self.factorize()
+
+    def factorize(self):
+        from scipy.sparse.linalg import splu
+        self.lu = splu(self.M[:, self.basis].tocsc())
+        self.etas = []
+
+    def refresh(self):
+        # LU of current basis and its variables values
+        self.factorize()
+        x, basis = self.x, self.basis
+        x[basis] = 0.0
+        x[basis] = self.ftran(self.rhs - self.M.dot(x))
+
+    def ftran(self, v):
+        # B^-1 v
+        w = self.lu.solve(asfarray(v))
+        for r, alpha in self.etas:
+            wr = w[r] / alpha[r]
+            w -= wr * alpha
+            w[r] = wr
+        return w
+
+    def btran(self, v):
+        # B^-T v
+        v = asfarray(v).copy()
+        for r, alpha in reversed(self.etas):
+            v[r] = (v[r] - (alpha.dot(v) - alpha[r] * v[r])) / alpha[r]
+        return self.lu.solve(v, trans = 'T')
+
+    def run(self, c):
+        M, lb, ub, x, basis, isBasic = self.M, self.lb, self.ub, self.x, self.basis, self.isBasic
+        fixed = lb == ub
+        free = logical_and(lb == -inf, ub == inf)
+        nDegenerate = 0
+        while True:
+            # pricing
+            y = self.btran(c[basis])
+            d = c - self.MT.dot(y)
+            atLower, atUpper = x <= lb, x >= ub
+            canIncrease = logical_and(d < -self.dualTol, logical_or(atLower, free))
+            canDecrease = logical_and(d > self.dualTol, logical_or(atUpper, free))
+            eligible = logical_and(logical_or(canIncrease, canDecrease), logical_not(logical_or(isBasic, fixed)))
+            ind = flatnonzero(eligible)
+            if ind.size == 0:
+                return 'optimal'
+            if self.nPivots >= self.maxPivots:
+                return 'max pivots'
+            q = ind[0] if nDegenerate > self.maxDegenerate else ind[argmax(abs(d[ind]) / self.colNorms[ind])]
+            direction = 1.0 if d[q] < 0 else -1.0
+
+            # ratio test (Harris two-pass), delta is change of basic variables per unit step of x[q]
+            alpha = self.ftran(M[:, q].toarray().flatten())
+            delta = -direction * alpha
+            xB, lbB, ubB = x[basis], lb[basis], ub[basis]
+            dec, inc = delta < -self.pivTol, delta > self.pivTol
+            limit, relaxed = inf * ones(delta.size), inf * ones(delta.size)
+            limit[dec] = (xB[dec] - lbB[dec]) / -delta[dec]
+            relaxed[dec] = (xB[dec] - lbB[dec] + self.feasTol) / -delta[dec]
+            limit[inc] = (ubB[inc] - xB[inc]) / delta[inc]
+            relaxed[inc] = (ubB[inc] - xB[inc] + self.feasTol) / delta[inc]
+            tMax = relaxed.min() if relaxed.size != 0 else inf
+            flip = ub[q] - lb[q]
+
+            if flip <= tMax and flip < inf:
+                # x[q] moves to its another bound, basis is not changed
+                t, r = flip, -1
+            elif tMax == inf:
+                return 'unbounded'
+            else:
+                cand = flatnonzero(limit <= tMax)
+                r = cand[argmax(abs(delta[cand]))]
+                t = max((limit[r], 0.0))
+
+            nDegenerate = nDegenerate + 1 if t == 0 else 0
+            x[basis] = xB + t * delta
+            x[q] += direction * t
+            self.nPivots += 1
+            if r == -1:
+                x[q] = ub[q] if direction > 0 else lb[q]
+                continue
+
+            leaving = basis[r]
+            x[leaving] = lb[leaving] if delta[r] < 0 else ub[leaving]
+            basis[r] = q
+            isBasic[leaving], isBasic[q] = False, True
+            self.etas.append((r, alpha))
+            if len(self.etas) >= self.refactor:
+                self.refresh()
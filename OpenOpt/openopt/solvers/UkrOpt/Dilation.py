@@ -1,4 +1,4 @@
-from numpy import dot, zeros, float64, diag, ones, ndarray, isfinite, all, asarray
+from numpy import dot, zeros, float64, diag, ones, ndarray, isfinite, all, any, asarray
 from numpy.linalg import norm
 
 class Dilation():
@@ -40,3 +40,86 @@ class Dilation():
             vec2 = w * g.T
             self.b += dot(vec1, vec2)
             
+
+
+class limitedMemoryDilation(object):
+    '''
+    space dilation matrix B = diag(d) * P0 * (I + w_1 g_1 g_1^T) * ... * (I + w_k g_k g_k^T), ||g_i|| = 1,
+    where P0 is product of permanent factors (e.g. projections wrt linear equality constraints);
+    when number of dilations exceeds maxDilations they are dropped (like B restoration in ralg)
+    and accumulation starts again from the latest one.
+    Products of factors are stored in compact form I + G^T R G with upper triangular R,
+    thus B and B^T are applied in O(n * maxDilations) without forming n x n matrix
+    '''
+    def __init__(self, n, maxDilations, d = None, T = float64):
+        self.n, self.T = n, T
+        self.d = ones(n, dtype = T) if d is None else asarray(d, T)
+        self.P0 = _factorsProduct(n, None, T)
+        self.Q = _factorsProduct(n, maxDilations, T)
+        
+    def matvec(self, vec):
+        return self.d * self.P0.matvec(self.Q.matvec(vec))
+        
+    def rmatvec(self, vec):
+        return self.Q.rmatvec(self.P0.rmatvec(self.d * vec))
+        
+    def dilate(self, g, w, permanent = False):
+        # B = B * (I + w g g^T), g is normalized direction in the dilated space 
+        (self.P0 if permanent else self.Q).append(asarray(g, self.T).flatten(), w)
+        
+    def copy(self):
+        r = limitedMemoryDilation.__new__(limitedMemoryDilation)
+        r.n, r.T, r.d = self.n, self.T, self.d.copy()
+        r.P0, r.Q = self.P0.copy(), self.Q.copy()
+        return r
+    
+    def getDilatedVector(self, vec):
+        tmp = self.rmatvec(vec)
+        if any(tmp): tmp /= norm(tmp)
+        return self.matvec(tmp)
+        
+    def updateDilationMatrix(self, vec, alp=2.0):
+        g = self.rmatvec(vec)
+        ng = norm(g)
+        if all(isfinite(g)) and ng > 1e-50:
+            self.dilate(g / ng, 1.0/alp-1.0)
+
+
+class _factorsProduct(object):
+    # (I + w_1 g_1 g_1^T) * ... * (I + w_k g_k g_k^T) = I + G^T R G, k <= maxNum (None means unlimited),
+    # G rows are allocated by chunks
+    def __init__(self, n, maxNum, T):
+        self.n, self.maxNum, self.T = n, maxNum, T
+        self.k = 0
+        self.G = zeros((0, n), T)
+        self.R = zeros((0, 0), T)
+        
+    def matvec(self, vec):
+        if self.k == 0: return vec
+        G = self.G[:self.k]
+        return vec + dot(dot(self.R, dot(G, vec)), G)
+        
+    def rmatvec(self, vec):
+        if self.k == 0: return vec
+        G = self.G[:self.k]
+        return vec + dot(dot(dot(G, vec), self.R), G)
+        
+    def append(self, g, w):
+        k = self.k
+        if k == self.maxNum: 
+            if k == 0: return
+            k = 0
+        c = w * dot(self.R[:k, :k], dot(self.G[:k], g))
+        if self.G.shape[0] == k:
+            G = zeros((2*k+1 if self.maxNum is None else min(2*k+1, self.maxNum), self.n), self.T)
+            G[:k] = self.G[:k]
+            self.G = G
+        self.G[k] = g
+        R = zeros((k+1, k+1), self.T)
+        R[:k, :k], R[:k, k], R[k, k] = self.R[:k, :k], c, w
+        self.R, self.k = R, k+1
+    
+    def copy(self):
+        r = _factorsProduct(self.n, self.maxNum, self.T)
+        r.G, r.R, r.k = self.G[:self.k].copy(), self.R.copy(), self.k
+        return r
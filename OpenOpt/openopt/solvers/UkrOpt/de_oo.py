@@ -10,7 +10,7 @@ nanPenalty = 1e10
 #global asdf
 #asdf = 0
 try:
-    from np import random
+    from numpy import random
     Rand = random.rand
     Seed = random.seed
     Randint = random.randint
@@ -211,15 +211,10 @@ class de(baseSolver):
                     barycenter2 = np.array([old_pop[j] for j in r2_ints[0]])
             else: #directed search
                 r_ints = Randint(NP, size=(2*num_ind))
-                list = [ (j,constr_vals[j],vals[j]) for j in r_ints]
-                list_arr = np.array(list, dtype=[('i', int),
-                                                  ('constr_val', float),
-                                                  ('val', float)])
-                list_arr.sort(order=['constr_val','val'])
-                best_list = list_arr[0:num_ind]
-                best_arr = np.array([j for (j,c,f) in best_list], 'i')
-                worst_list = list_arr[num_ind:2*num_ind]
-                worst_arr = np.array([j for (j,c,f) in worst_list], 'i')
+                # sort by constraints, then by objective values
+                r_ints = r_ints[np.lexsort((vals[r_ints], constr_vals[r_ints]))]
+                best_arr = r_ints[0:num_ind]
+                worst_arr = r_ints[num_ind:2*num_ind]
                 
                 try:
                     barycenter1 = ((old_pop[worst_arr]).sum(0))/num_ind
@@ -244,13 +239,7 @@ class de(baseSolver):
             pop = beta + Ft*delta
             
             #CROSSOVER
-            cross_v = np.ones((NP,D))
-            const_v = Rand(NP,D)
-
-            const_v = np.ceil(const_v - Cr) 
-            cross_v = cross_v - const_v
-            
-            pop = old_pop*const_v + pop*cross_v
+            pop = np.where(Rand(NP,D) > Cr, old_pop, pop)
 
             #CHECK CONSTRAINTS
             
@@ -274,15 +263,10 @@ class de(baseSolver):
             bool_v = bool_constr_v + bool_v
             
             bool_v = bool_v > 0 
-            old_sel_v = (bool_v*1).reshape(NP,1) #converting from bool to int array
-            sel_v = np.ones((NP,1)) - old_sel_v
-            
-            pop = old_pop*old_sel_v + pop*sel_v
             
-            old_sel_v = old_sel_v.reshape(NP)
-            sel_v = sel_v.reshape(NP)
-            vals = old_vals*old_sel_v + vals*sel_v
-            constr_vals = old_constr_vals*old_sel_v + constr_vals*sel_v
+            pop = np.where(bool_v.reshape(NP,1), old_pop, pop)
+            vals = np.where(bool_v, old_vals, vals)
+            constr_vals = np.where(bool_v, old_constr_vals, constr_vals)
             #END SELECTION
             
             if Old_best.betterThan(Best):
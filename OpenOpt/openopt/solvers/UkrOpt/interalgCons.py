@@ -1,6 +1,7 @@
 from numpy import empty, logical_and, logical_not, take, zeros, isfinite, any, \
 asarray, ndarray, bool_#where
 from interalgT import adjustDiscreteVarBounds, truncateByPlane
+from interalgParallel import mergeNLH
 import numpy as np
 
 # for PyPy
@@ -60,7 +61,11 @@ def processConstraints(C0, y, e, _s, p, dataType):
             residual_0 += Res0
         else:
             # may be logical constraint and doesn't have kw fullOutput at all
-            T0, res, DefiniteRange2 = c.nlh(y, e, p, dataType)
+            evaluator = getattr(p, '_boxesEvaluator', None)
+            if evaluator is None:
+                T0, res, DefiniteRange2 = c.nlh(y, e, p, dataType)
+            else:
+                T0, res, DefiniteRange2 = evaluator(itn+1, y, e, mergeNLH)
         DefiniteRange = logical_and(DefiniteRange, DefiniteRange2)
         
         assert T0.ndim <= 1, 'unimplemented yet'
@@ -9,11 +9,12 @@ from bisect import bisect, bisect_left, bisect_right
 import numpy as np
 from FuncDesigner import oopoint
 from interalgT import *
+from interalgNodes import nodesPool, getNodesField
 
 try:
-    from bottleneck import nanargmin, nanmin, nanargmax, nanmax
+    from bottleneck import nanmin, nanmax
 except ImportError:
-    from numpy import nanmin, nanargmin, nanargmax, nanmax
+    from numpy import nanmin, nanmax
     
     
 def nanargmin_axis(a, axis = None):
@@ -72,6 +73,11 @@ def nanargmax_axis(A, axis = None):
 if isPyPy:
     nanargmin = nanargmin_axis
     nanargmax = nanargmax_axis
+else:
+    try:
+        from bottleneck import nanargmin, nanargmax
+    except ImportError:
+        from numpy import nanargmin, nanargmax
     
     
 def func82(y, e, vv, f, dataType, p, Th = None):
@@ -280,11 +286,19 @@ def func3(an, maxActiveNodes, dataHandling):
     if m <= maxActiveNodes:
         return an, []#array([], object)
     
-    an1, _in = an[:maxActiveNodes], an[maxActiveNodes:]    
+    isPool = isinstance(an, nodesPool)
+    if isPool:
+        M = maxActiveNodes
+    else:
+        an1, _in = an[:maxActiveNodes], an[maxActiveNodes:]    
         
-    if getattr(an1[0], 'tnlh_curr_best', None) is not None:
+    # only head of the nodes is involved, the pool is kept sorted by tnlh_curr_best in r14
+    tnlh_curr_best = an.field('tnlh_curr_best', slice(0, maxActiveNodes)) if isPool \
+    else getattr(an1[0], 'tnlh_curr_best', None)
+    if tnlh_curr_best is not None:
         #t0 = an1[0].tnlh_curr_best
-        tnlh_curr_best_values = asarray([node.tnlh_curr_best for node in an1])
+        tnlh_curr_best_values = tnlh_curr_best if isPool \
+        else asarray([node.tnlh_curr_best for node in an1])
         
         #changes
         tmp = 2 ** (-tnlh_curr_best_values)
@@ -310,9 +324,14 @@ def func3(an, maxActiveNodes, dataHandling):
         # IMPORTANT!
         if M == 0: M = 1
         
-        tmp1, tmp2 = an1[:M], an1[M:]
-        an1 = tmp1
-        _in = tmp2 + _in#hstack((tmp2, _in))
+        if not isPool:
+            tmp1, tmp2 = an1[:M], an1[M:]
+            an1 = tmp1
+            _in = tmp2 + _in#hstack((tmp2, _in))
+    
+    if isPool:
+        # active nodes are removed from the pool head, the pool itself becomes _in
+        an1, _in = an.split(M if M < maxActiveNodes else maxActiveNodes), an
         
     # TODO: implement it for MOP as well
 #    cond_min_uf = 0 and dataHandling == 'raw' and hasattr(an[0], 'key')            
@@ -543,19 +562,15 @@ def func12(an, maxActiveNodes, p, Solutions, vv, varTols, fo):
         an1Candidates, _in = func3(_in, maxActiveNodes, p.solver.dataHandling)
 
         #print nanmax(2**(-an1Candidates[0].tnlh_curr)) ,  nanmax(2**(-an1Candidates[-1].tnlh_curr))
-        yc, ec, oc, ac, SIc = asarray([t.y for t in an1Candidates]), \
-        asarray([t.e for t in an1Candidates]), \
-        asarray([t.o for t in an1Candidates]), \
-        asarray([t.a for t in an1Candidates]), \
-        asarray([t._s for t in an1Candidates])
+        yc, ec, oc, ac, SIc = [getNodesField(an1Candidates, field) for field in ('y', 'e', 'o', 'a', '_s')]
 
         
         if p.probType == 'MOP':
             tnlhf_curr = asarray([t.tnlh_all for t in an1Candidates])
             tnlhf = None        
         elif p.solver.dataHandling == 'raw':
-            tnlhf = asarray([t.tnlhf for t in an1Candidates]) 
-            tnlhf_curr = asarray([t.tnlh_curr for t in an1Candidates]) 
+            tnlhf = getNodesField(an1Candidates, 'tnlhf')
+            tnlhf_curr = getNodesField(an1Candidates, 'tnlh_curr')
         else:
             tnlhf, tnlhf_curr = None, None
         
@@ -568,8 +583,8 @@ def func12(an, maxActiveNodes, p, Solutions, vv, varTols, fo):
             
             indT = func4(p, yc, ec, oc, ac, fo, tnlhf_curr)
 
-            if an1Candidates[0].indtc is not None:
-                indtc = asarray([t.indtc for t in an1Candidates])
+            indtc = getNodesField(an1Candidates, 'indtc')
+            if indtc is not None:
                 indT = logical_or(indT, indtc)
         else:
             residual = None
@@ -804,7 +819,6 @@ def func12(an, maxActiveNodes, p, Solutions, vv, varTols, fo):
         #, NEW_ux, NEW__in, NEW__s
     return y, e, _in, _s
 
-Fields = ['key', 'y', 'e', 'nlhf','nlhc', 'indtc','residual','o', 'a', '_s']
 MOP_Fields = ['y', 'e', 'nlhf','nlhc', 'indtc','residual','o', 'a', '_s']
 
 #FuncValFields = ['key', 'y', 'e', 'nlhf','nlhc', 'o', 'a', '_s','r18', 'r19']
@@ -874,11 +888,8 @@ def func11(y, e, nlhc, indTC, residual, o, a, _s, p):
             
 #            residual = None
 
-            return [si(Fields, Tmp[i], y[i], e[i], nlhf[i], 
-                          nlhc[i] if nlhc is not None else None, 
-                          indTC[i] if indTC is not None else None, 
-                          residual[i] if residual is not None else None, 
-                          o[i], a[i], _s[i]) for i in range(m)]
+            return nodesPool(key = Tmp, y = y, e = e, nlhf = nlhf, nlhc = nlhc, indtc = indTC, 
+                             residual = residual, o = o, a = a, _s = _s)
     
 #    else:
 #        r18, r19 = r3[:, :n], r3[:, n:]
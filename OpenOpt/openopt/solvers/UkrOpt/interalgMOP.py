@@ -1,7 +1,7 @@
 PythonSum = sum
-from numpy import isnan, array, atleast_1d, asarray, logical_and, all, logical_or, any, \
-arange, vstack, inf, logical_not, take, abs, hstack, empty, \
-isfinite, argsort, ones, zeros, log1p, array_split#where
+from numpy import isnan, array, asarray, logical_and, all, logical_or, any, \
+arange, vstack, inf, logical_not, take, abs, hstack, \
+isfinite, argsort, ones, zeros, log1p, array_split, searchsorted, minimum, maximum, errstate#where
 
 # for PyPy
 from openopt.kernel.nonOptMisc import where
@@ -16,89 +16,44 @@ def r43_seq(Arg):
     targets_vals, targets_tols, solutionsF, lf, uf = Arg
     lf, uf = asarray(lf), asarray(uf)
     if lf.size == 0 or len(solutionsF) == 0: return None
+    solutionsF = asarray(solutionsF, float).reshape(len(solutionsF), -1)
 
     m = len(lf)
     n = lf.shape[2]/2
     r = zeros((m, 2*n))
-
-    for _s in solutionsF:
-        s = atleast_1d(_s)
-        tmp = ones((m, 2*n))
+    
+    # solutions are handled by chunks, tmp is (chunk size, m, 2*n) array
+    L = max((1, 2**18 // r.size))
+    for k in range(0, solutionsF.shape[0], L):
+        S = solutionsF[k:k+L]
+        tmp = ones((S.shape[0], m, 2*n))
         for i in range(len(targets_vals)):
-            val, tol = targets_vals[i], targets_tols[i]#, t.val, t.tol
-            #TODO: mb optimize it
+            val, tol = targets_vals[i], targets_tols[i]
             o, a = lf[:, i], uf[:, i] 
-            if val == inf:
-                ff = s[i] + tol
-                ind = a > ff
-                if any(ind):
-                    t1 = a[ind]
-                    t2 = o[ind]
-                    t_diff = t1-t2
-                    t_diff[t_diff<1e-200] = 1e-200
+            s = S[:, i].reshape(-1, 1, 1)
+            t_diff = a - o
+            t_diff[t_diff<1e-200] = 1e-200
+            with errstate(over='ignore', invalid='ignore'):
+                if val == inf:
+                    ff = s + tol
                     # TODO: check discrete cases
-                    Tmp = (ff-t2) / t_diff
-
-                    tmp[ind] *= Tmp
+                    tmp = where(a > ff, tmp * ((ff-o) / t_diff), tmp)
                     tmp[ff<o] = 0.0
-                    
-            elif val == -inf:
-                ff = s[i] - tol
-                ind = o < ff
-                if any(ind):
-                    t1 = a[ind]
-                    t2 = o[ind]
-                    t_diff = t1-t2
-                    t_diff[t_diff<1e-200] = 1e-200
-                    
-                    Tmp = (t1-ff) / t_diff
-
-                    tmp[ind] *= Tmp
+                elif val == -inf:
+                    ff = s - tol
+                    tmp = where(o < ff, tmp * ((a-ff) / t_diff), tmp)
                     tmp[a<ff] = 0.0
-            else: # finite val
-                ff = abs(s[i]-val) - tol
-                if ff <= 0:
-                    continue
-                _lf, _uf = o - val, a - val
-                ind = logical_or(_lf < ff, _uf > - ff)
-                _lf = _lf[ind]
-                _uf = _uf[ind]
-                _lf[_lf>ff] = ff
-                _lf[_lf<-ff] = -ff
-                _uf[_uf<-ff] = -ff
-                _uf[_uf>ff] = ff
-                
-                r20 = a[ind] - o[ind]
-                r20[r20<1e-200] = 1e-200
-                _diff = _uf - _lf
-                _diff[_diff<1e-200] = 1e-200
-                
-                Tmp = 1.0 - (_uf - _lf) / r20
-                
-                tmp[ind] *= Tmp
-                #raise('unimplemented yet')    
-#            if any(tmp<0) or any(tmp>1):
-#                raise 0
+                else: # finite val
+                    ff = abs(s-val) - tol
+                    _lf, _uf = o - val, a - val
+                    ind = logical_and(ff > 0, logical_or(_lf < ff, _uf > - ff))
+                    _lf = minimum(maximum(_lf, -ff), ff)
+                    _uf = minimum(maximum(_uf, -ff), ff)
+                    tmp = where(ind, tmp * (1.0 - (_uf - _lf) / t_diff), tmp)
         
-        # debug
-#        s1, s2 = tmp[tmp==0].size, tmp[tmp==1].size
-#        s1, s2 = s1 / float(tmp.size), s2 / float(tmp.size)
-#        print 'size 0: %0.2f   size 1: %0.2f  rest: %0.2f' % (s1, s2,  1-s1-s2)
-        # debug end
-        new = 0
-        if new:
-            ind_0 = tmp == 0.0
-            ind_1 = tmp == 1.0
-            r[ind_1] = inf
-            ind_m = logical_not(logical_and(ind_0, ind_1))
-            #r[ind_m] -= log1p(-tmp[ind_m]) * 1.4426950408889634
-            r[ind_m] -= log1p(-tmp[ind_m]) * 1.4426950408889634
-            #r20 = log2(1-tmp[ind_m]) #* 1.4426950408889634
-            
-        else:
-            r -= log1p(-tmp) * 1.4426950408889634 # log2(e)
-            
-        #r -= r20
+        # same summation order as for solutions one by one
+        for Tmp in log1p(-tmp) * 1.4426950408889634: # log2(e)
+            r -= Tmp
     return r
 
 from multiprocessing import Pool
@@ -272,91 +227,70 @@ def r14MOP(p, nlhc, residual, definiteRange, y, e, vv, asdf1, C, r40, g, nNodes,
 
 
 def r44(Solutions, r5Coords, r5F, targets, sigma):
-#    print Solutions.F
-#    if len(Solutions.F) != Solutions.coords.shape[0]:
-#        raise 0
-    # TODO: rework it
-    #sf = asarray(Solutions.F)
+    # Solutions.F is contiguous 2-D array of objective values (one row per solution), 
+    # scores S of them (less is better) are used for dominance checks
     nIncome, nOutcome = 0, 0
-    m= len(r5Coords)
-    #n = len(r5Coords[0])
-    # TODO: mb use inplace r5Coords / r5F modification instead?
-    for j in range(m):
-        if isnan(r5F[0][0]):
-            continue
-        if Solutions.coords.size == 0:
-            Solutions.coords = array(r5Coords[j]).reshape(1, -1)
-            Solutions.F.append(r5F[0])
-            nIncome += 1
-            continue
-        M = Solutions.coords.shape[0] 
-        
-        r47 = empty(M, bool)
-        r47.fill(False)
-#        r48 = empty(M, bool)
-#        r48.fill(False)
-        for i, target in enumerate(targets):
-            
-            f = r5F[j][i]
-            
-            # TODO: rewrite it
-            F = asarray([Solutions.F[k][i] for k in range(M)])
-            #d = f - F # vector-matrix
-            
-            val, tol = target.val, target.tol
-            Tol = sigma * tol
-            if val == inf:
-                r52 = f > F + Tol
-#                r36olution_better = f <= F#-tol
-            elif val == -inf:
-                r52 = f < F - Tol
-#                r36olution_better = f >= F#tol
-            else:
-                r52 = abs(f - val) < abs(F - val) - Tol
-#                r36olution_better = abs(f - val) >= abs(Solutions.F[i] - val)#-tol # abs(Solutions.F[i] - target)  < abs(f[i] - target) + tol
-            
-            r47 = logical_or(r47, r52)
-#            r48 = logical_or(r48, r36olution_better)
+    m = len(r5Coords)
+    if m == 0 or isnan(r5F[0][0]):
+        return nIncome, nOutcome
+    Tol = sigma * asarray([t.tol for t in targets], float)
+    s = r45(r5F, targets)
+    
+    start = 0
+    if Solutions.coords.size == 0:
+        Solutions.coords = array(r5Coords[0]).reshape(1, -1)
+        Solutions.F = array(r5F[0], float).reshape(1, -1)
+        nIncome, start = 1, 1
         
-        accept_c = all(r47)
-        #print sum(asarray(Solutions.F))/asarray(Solutions.F).size
-        if accept_c:
-            nIncome += 1
-            #new
-            r48 = empty(M, bool)
-            r48.fill(False)
-            for i, target in enumerate(targets):
-                f = r5F[j][i]
-                F = asarray([Solutions.F[k][i] for k in range(M)])
-                val, tol = target.val, target.tol
-                if val == inf:
-                    r36olution_better = f < F
-                elif val == -inf:
-                    r36olution_better = f > F
-                else:
-                    r36olution_better = abs(f - val) > abs(F - val)
-                r48 = logical_or(r48, r36olution_better)
-
-            r49 = logical_not(r48)
-            remove_s = any(r49)
-            if remove_s:
-                r50 = where(r49)[0]
-                nOutcome += r50.size
-                Solutions.coords[r50[0]] = r5Coords[j]
-                Solutions.F[r50[0]] = r5F[j]
-                
-                if r50.size > 1:
-                    r49[r50[0]] = False
-                    indLeft = logical_not(r49)
-                    indLeftPositions = where(indLeft)[0]
-                    newSolNumber = Solutions.coords.shape[0] - r50.size + 1
-                    Solutions.coords = take(Solutions.coords, indLeftPositions, axis=0, out = Solutions.coords[:newSolNumber])
-                    Solutions.F = [Solutions.F[i] for i in indLeftPositions]
-            else:
-                Solutions.coords = vstack((Solutions.coords, r5Coords[j]))
-                Solutions.F.append(r5F[j])
+    coords, F = Solutions.coords, Solutions.F
+    S = r45(F, targets)
+    
+    candidates = arange(start, m)
+    if all(isfinite(S)):
+        # candidates rejected by current archive will be rejected after any its updates as well
+        candidates = candidates[logical_not(r46(S, s[start:], Tol))]
+    
+    for j in candidates:
+        accept_c = all(any(s[j] < S - Tol, 1))
+        if not accept_c:
+            continue
+        nIncome += 1
+        r50 = where(logical_not(any(s[j] > S, 1)))[0]
+        if r50.size != 0:
+            nOutcome += r50.size
+            coords[r50[0]], F[r50[0]], S[r50[0]] = r5Coords[j], r5F[j], s[j]
+            if r50.size > 1:
+                indLeft = ones(S.shape[0], bool)
+                indLeft[r50[1:]] = False
+                coords, F, S = coords[indLeft], F[indLeft], S[indLeft]
+        else:
+            coords, F, S = vstack((coords, r5Coords[j])), vstack((F, r5F[j])), vstack((S, s[j]))
+    Solutions.coords, Solutions.F = coords, F
     return nIncome, nOutcome
 
+def r45(F, targets):
+    # objective values -> scores, less is better
+    S = array(F, float).reshape(len(F), len(targets))
+    for i, target in enumerate(targets):
+        if target.val == inf:
+            S[:, i] = -S[:, i]
+        elif target.val != -inf:
+            S[:, i] = abs(S[:, i] - target.val)
+    return S
+
+def r46(S, s, Tol):
+    # mask of finite candidates s rejected by some of solutions S:
+    # solution k rejects candidate j if S[k] - Tol <= s[j] for all targets, 
+    # thus only solutions from the prefix of S sorted by 1st score are involved
+    ST = S - Tol
+    ST = ST[argsort(ST[:, 0], kind = 'mergesort')]
+    ind = where(all(isfinite(s), 1))[0]
+    P = searchsorted(ST[:, 0], s[ind, 0], 'right')
+    r = zeros(s.shape[0], bool)
+    for j, k in zip(ind, P):
+        if k != 0:
+            r[j] = any(all(ST[:k] <= s[j], 1))
+    return r
 
 
 #r43 = lambda targets, SolutionsF, lf, uf: r43_seq([t.val for t in targets], [t.tol for t in targets], SolutionsF, lf, uf)
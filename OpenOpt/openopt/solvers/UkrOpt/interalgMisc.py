@@ -1,6 +1,6 @@
 PythonMin, PythonMax = min, max
-from numpy import isnan, array, atleast_1d, asarray, all, searchsorted, logical_or, any, nan, \
-vstack, inf, where, logical_not, min, abs, insert, logical_xor, argsort, zeros_like
+from numpy import isnan, atleast_1d, asarray, all, searchsorted, logical_or, any, nan, \
+inf, where, logical_not, min, abs, logical_xor, argsort, zeros_like, zeros
 
 # for PyPy
 from openopt.kernel.nonOptMisc import isPyPy
@@ -12,6 +12,7 @@ except ImportError:
         raise ImportError('function append() is absent in PyPy yet')
         
 from interalgLLR import *
+from interalgParallel import mergeIntervals
 
 try:
     from bottleneck import nanmin, nanmax
@@ -97,19 +98,17 @@ def r14(p, nlhc, residual, definiteRange, y, e, vv, asdf1, C,
             tmp = o.copy()
             tmp[tmp > fo_prev] = -inf
             M = atleast_1d(nanmax(tmp, 1))
-            for i, node in enumerate(nodes):
-                node.th_key = M[i]
-                node.fo = fo_prev       
+            nodes.th_key = M
+            nodes.fo = fo_prev       
                 
         if 0 or p.__isNoMoreThanBoxBounded__():#nlhc is not None and not isSNLE:
-            for node in nodes: node.tnlhf = node.nlhf 
+            nodes.tnlhf = nodes.nlhf 
         else:
-            for node in nodes: node.tnlhf = node.nlhc + node.nlhf 
-            
-        an = nodes + _in#hstack((nodes, _in))
+            nodes.tnlhf = nodes.nlhc + nodes.nlhf 
+        # breaks ties of tnlh_curr_best (e.g. zero values before a feasible point has been obtained)
+        nodes.tnlhf_best = atleast_1d(nanmin(nodes.tnlhf, 1))
         
-        #tnlh_fixed = vstack([node.tnlhf for node in an])
-        tnlh_fixed_local = vstack([node.nlhf for node in nodes])#tnlh_fixed[:len(nodes)]
+        tnlh_fixed_local = nodes.nlhf.copy()
 #        if isSNLE:
 #            tnlh_curr = tnlh_fixed_local#vstack([node.nlhc for node in nodes])
         if 1:
@@ -137,9 +136,14 @@ def r14(p, nlhc, residual, definiteRange, y, e, vv, asdf1, C,
                 tmp2[o > fo_prev] = nan
                 tnlh_curr = tnlh_fixed_local - log2(tmp2)
         tnlh_curr_best = nanmin(tnlh_curr, 1)
-        for i, node in enumerate(nodes):
-            node.tnlh_curr = tnlh_curr[i]
-            node.tnlh_curr_best = tnlh_curr_best[i]
+        nodes.tnlh_curr = tnlh_curr
+        nodes.tnlh_curr_best = tnlh_curr_best
+        
+        # _in is sorted by tnlh_curr_best already (see below), 
+        # thus only new nodes and ones with updated tnlh have to be placed
+        an = nodes if len(_in) == 0 else _in.prepend(nodes)
+        unsorted = zeros(len(an), bool)
+        unsorted[:len(nodes)] = True
         
         # TODO: use it instead of code above
         #tnlh_curr = tnlh_fixed_local - log2(where() - o)
@@ -166,13 +170,13 @@ def r14(p, nlhc, residual, definiteRange, y, e, vv, asdf1, C,
     if p.solver.dataHandling == 'raw':
         
         if fo != fo_prev and not  isSNLE:
-            fos = array([node.fo for node in an])
+            fos = an.fo
             
             #prev
             #ind_update = where(fos > fo + 0.01* fTol)[0]
             
             #new
-            th_keys = array([node.th_key for node in an])
+            th_keys = an.th_key
             delta_fos = fos - fo
             ind_update = where(10 * delta_fos > fos - th_keys)[0]
             
@@ -180,38 +184,37 @@ def r14(p, nlhc, residual, definiteRange, y, e, vv, asdf1, C,
 #                  print 'o MB:', float(o_tmp.nbytes) / 1e6
 #                  print 'percent:', 100*float(ind_update.size) / len(an) 
             if update_nlh:
-                #nodesToUpdate = an[ind_update]
-                nodesToUpdate = [an[i] for i in ind_update]
 #                    from time import time
 #                    tt = time()
-                updateNodes(nodesToUpdate, fo)
+                updateNodes(an, ind_update, fo)
+                unsorted[ind_update] = True
 #                    if not hasattr(p, 'Time'):
 #                        p.Time = time() - tt
 #                    else:
 #                        p.Time += time() - tt
                     
-            tmp = array([node.key for node in an])
+            tmp = an.key
             cond = tmp > fo
             r10 = where(cond)[0]
-            g = PythonMin([an[i].key for i in r10]+[g])
+            g = PythonMin(tmp[r10].tolist()+[g])
             ind_remain = where(logical_not(cond))[0]
-            an = [an[i] for i in ind_remain]
+            an.take(ind_remain)
+            unsorted = unsorted[ind_remain]
 
-        NN = atleast_1d([node.tnlh_curr_best for node in an])
+        NN = an.tnlh_curr_best.copy()
         r10 = logical_or(isnan(NN), NN == inf)
 
         if any(r10):
             ind = where(logical_not(r10))[0]
-            an = [an[i] for i in ind]#an[ind]
+            an.take(ind)
+            unsorted = unsorted[ind]
             #tnlh = take(tnlh, ind, axis=0, out=tnlh[:ind.size])
             #NN = take(NN, ind, axis=0, out=NN[:ind.size])
             NN = NN[ind]
 
         if 1 or not isSNLE or p.maxSolutions == 1:
             #pass
-            astnlh = argsort(NN)
-#            print(astnlh[:10])
-            an = [an[i] for i in astnlh]#an[astnlh]
+            an.sort(NN, unsorted, an.tnlhf_best)
             
 #        print(an[0].nlhc, an[0].tnlh_curr_best)
         # Changes
@@ -225,20 +228,18 @@ def r14(p, nlhc, residual, definiteRange, y, e, vv, asdf1, C,
     
     else: #if p.solver.dataHandling == 'sorted':
         if isSNLE and p.maxSolutions != 1: 
-            an = nodes + _in#hstack((nodes, _in))
+            an = nodes if len(_in) == 0 else _in.prepend(nodes)
         elif isPyPy:
-            an = nodes + _in
-            an.sort(key = lambda obj: obj.key)
+            an = nodes if len(_in) == 0 else _in.prepend(nodes)
+            an.take(argsort(an.key, kind='mergesort'))
         else:
-            nodes.sort(key = lambda obj: obj.key)
+            nodes.take(argsort(nodes.key, kind='mergesort'))
 
             if len(_in) == 0:
                 an = nodes
             else:
-                arr1 = [node.key for node in _in]
-                arr2 = [node.key for node in nodes]
-                r10 = searchsorted(arr1, arr2)
-                an = insert(_in, r10, nodes)
+                r10 = searchsorted(_in.key, nodes.key)
+                an = _in.insert(r10, nodes)
 #                if p.debug:
 #                    arr = array([node.key for node in an])
 #                    #print arr[0]
@@ -257,13 +258,13 @@ def r14(p, nlhc, residual, definiteRange, y, e, vv, asdf1, C,
     #p.iterfcn(xk, Min)
     p.iterfcn(xRecord, r40)
     if not isSNLE and isfinite(r41) and len(an):
-        tmp = array([node.key for node in an])
+        tmp = an.key
         cond_exclude = r41 - tmp <= \
         p.rTol * where(abs(tmp) < abs(r41), abs(tmp), abs(r41))
-        g = PythonMin([g] + [an[j].key for j in where(cond_exclude)[0]])
+        g = PythonMin([g] + tmp[where(cond_exclude)[0]].tolist())
         cond_remain = logical_not(cond_exclude)
         ind = where(cond_remain)[0]
-        an = [an[i] for i in ind]
+        an.take(ind)
     
     if p.istop != 0: 
         return an, g, fo, None, Solutions, xRecord, r41, r40
@@ -301,7 +302,11 @@ def r46(PointCoords, PointVals, fTol, varTols, Solutions):
 
 
 def r45(y, e, vv, p, asdf1, dataType, r41, nlhc):
-    o, a, definiteRange, exactRange = func82(y, e, vv, asdf1, dataType, p)#, r41)
+    evaluator = getattr(p, '_boxesEvaluator', None)
+    if evaluator is None:
+        o, a, definiteRange, exactRange = func82(y, e, vv, asdf1, dataType, p)#, r41)
+    else:
+        o, a, definiteRange, exactRange = evaluator(0, y, e, mergeIntervals)
     if p.debug and any(a + 1e-15 < o):  
         p.warn('interval lower bound exceeds upper bound, it seems to be FuncDesigner kernel bug')
     if p.debug and any(logical_xor(isnan(o), isnan(a))):
@@ -334,13 +339,13 @@ def r45(y, e, vv, p, asdf1, dataType, r41, nlhc):
         
     return o, a, r41
 
-def updateNodes(nodesToUpdate, fo):
-    if len(nodesToUpdate) == 0: return
-    a_tmp = vstack([node.a for node in nodesToUpdate])
+def updateNodes(an, ind, fo):
+    if len(ind) == 0: return
+    a_tmp = an.a[ind]
     Tmp = a_tmp
     Tmp[Tmp>fo] = fo                
 
-    o_tmp = vstack([node.o for node in nodesToUpdate])
+    o_tmp = an.o[ind]
     Tmp -= o_tmp
     Tmp[Tmp<1e-300] = 1e-300
     Tmp[o_tmp>fo] = nan
@@ -348,17 +353,13 @@ def updateNodes(nodesToUpdate, fo):
     
     del Tmp, a_tmp
     
-    tnlh_all_new += vstack([node.tnlhf for node in nodesToUpdate])#tnlh_fixed[ind_update]
+    tnlh_all_new += an.tnlhf[ind]#tnlh_fixed[ind_update]
     
     tnlh_curr_best = nanmin(tnlh_all_new, 1)
 
     o_tmp[o_tmp > fo] = -inf
     M = atleast_1d(nanmax(o_tmp, 1))
-    for j, node in enumerate(nodesToUpdate): 
-        node.fo = fo
-        node.tnlh_curr = tnlh_all_new[j]
-        node.tnlh_curr_best = tnlh_curr_best[j]
-        node.th_key = M[j]
+    an.update(ind, fo = fo, tnlh_curr = tnlh_all_new, tnlh_curr_best = tnlh_curr_best, th_key = M)
 
 #    return tnlh_all_new, tnlh_curr_best, M
 
@@ -0,0 +1,179 @@
+from numpy import asarray, empty, arange, insert, hstack, lexsort, searchsorted, logical_not, where, zeros, isnan, inf
+
+class nodesPool:
+    '''
+    interalg nodes stored column-wise: each field (key, y, e, o, a, nlhf, tnlh_curr etc)
+    is an array with one row per node, instead of separate Python object for each node.
+    Nodes order is kept as array of row numbers, thus sorting and filtering
+    don't move the rows themselves; storage is preallocated with amortized growth
+    and rows of removed nodes are reclaimed by in-place compaction.
+    Each node has insertion number (field _seq, renewed when the node is re-sorted), 
+    it breaks remaining ties of sorting keys, thus such nodes are kept in order of their arrival.
+    '''
+    _growth = 1.5
+
+    def __init__(self, **fields):
+        m = 0
+        storage = {}
+        for name, val in fields.items():
+            if val is not None:
+                val = asarray(val)
+                m = val.shape[0]
+                # copy, to be independent on arrays of the caller
+                val = val.copy()
+            storage[name] = val
+        storage['_seq'] = arange(m)
+        self.__dict__.update({'_storage': storage, '_ind': arange(m), '_size': m, '_capacity': m, '_counter': m})
+
+    def __len__(self):
+        return self._ind.size
+
+    def __getattr__(self, name):
+        if name not in self.__dict__.get('_storage', {}):
+            raise AttributeError('interalg nodes have no field "%s"' % name)
+        return self.field(name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            self.__dict__[name] = value
+            return
+        self.update(None, **{name: value})
+
+    def field(self, name, ind = None):
+        # values of the field for nodes ind (all nodes if ind is None), None for absent fields
+        arr = self._storage.get(name, None)
+        if arr is None:
+            return None
+        return arr[self._ind if ind is None else self._ind[ind]]
+
+    def update(self, ind, **fields):
+        # set fields of nodes with indexes ind (all nodes if ind is None)
+        storage = self._storage
+        rows = self._ind if ind is None else self._ind[ind]
+        for name, value in fields.items():
+            if value is None:
+                storage[name] = None
+                continue
+            arr = storage.get(name, None)
+            if arr is None:
+                value = asarray(value)
+                shape = value.shape[1:] if value.ndim > 0 else ()
+                arr = storage[name] = empty((self._capacity, ) + shape, value.dtype)
+            arr[rows] = value
+
+    def _compact(self, capacity):
+        m = self._ind.size
+        for name, arr in self._storage.items():
+            if arr is None: continue
+            if capacity == self._capacity:
+                arr[:m] = arr[self._ind]
+            else:
+                Arr = empty((capacity, ) + arr.shape[1:], arr.dtype)
+                Arr[:m] = arr[self._ind]
+                self._storage[name] = Arr
+        self.__dict__.update({'_ind': arange(m), '_size': m, '_capacity': capacity})
+
+    def _reclaim(self):
+        # in-place compaction if at least half of rows belong to removed nodes
+        if 2 * self._ind.size < self._size:
+            self._compact(self._capacity)
+
+    def _add(self, other):
+        # writes rows of other to storage, returns their numbers
+        k = len(other)
+        if self._size + k > self._capacity:
+            m = self._ind.size
+            if m + k <= self._capacity and 2 * m < self._size:
+                self._compact(self._capacity)
+            else:
+                self._compact(int(self._growth * (m + k)) + 1)
+        start = self._size
+        for name, arr in self._storage.items():
+            if name == '_seq':
+                arr[start:start+k] = self._counter + arange(k)
+                self._counter += k
+                continue
+            val = getattr(other, name, None)
+            if arr is None and val is None:
+                continue
+            if arr is None or val is None:
+                raise AttributeError('interalg nodes: field "%s" is absent in one of the nodes sets' % name)
+            arr[start:start+k] = val
+        self._size = start + k
+        return arange(start, start+k)
+
+    def prepend(self, other):
+        # puts nodes from other before the current ones
+        if len(other) != 0:
+            rows = self._add(other)
+            self._ind = hstack((rows, self._ind))
+        return self
+
+    def append(self, other):
+        # puts nodes from other after the current ones
+        if len(other) != 0:
+            rows = self._add(other)
+            self._ind = hstack((self._ind, rows))
+        return self
+
+    def take(self, ind):
+        # keeps nodes with indexes ind (in the order given)
+        self._ind = self._ind[asarray(ind, int)]
+        self._reclaim()
+        return self
+
+    def truncate(self, k):
+        # keeps first k nodes only
+        self._ind = self._ind[:k]
+        self._reclaim()
+        return self
+
+    def insert(self, positions, other):
+        # like numpy.insert(nodes, positions, other) for 1-D arrays
+        if len(other) != 0:
+            # _add keeps order of current nodes even if it compacts storage
+            rows = self._add(other)
+            self._ind = insert(self._ind, positions, rows)
+        return self
+
+    def sort(self, keys, unsorted = None, ties = None):
+        # keys are values of the sorting field for current nodes, 
+        # ties (if given) are secondary keys for nodes with equal keys, remaining ties are broken by _seq.
+        # If unsorted is given, nodes with unsorted[i] == False are expected to be in order already, 
+        # then only the other ones are sorted, get new insertion numbers 
+        # and are merged in by binary search after the nodes with same (keys, ties)
+        seq = self._storage['_seq']
+        ties = zeros(len(keys)) if ties is None else where(isnan(ties), inf, ties)
+        if unsorted is None:
+            self._ind = self._ind[lexsort((seq[self._ind], ties, keys))]
+            return self
+        ind2 = where(unsorted)[0]
+        rows2 = self._ind[ind2]
+        ind2 = ind2[lexsort((seq[rows2], ties[ind2], keys[ind2]))]
+        rows2 = self._ind[ind2]
+        seq[rows2] = self._counter + arange(rows2.size)
+        self._counter += rows2.size
+        # complex numbers are compared lexicographically, i.e. by keys and then by ties
+        sortedPart = logical_not(unsorted)
+        Keys = asarray(keys, complex)
+        Keys.imag = ties
+        self._ind = insert(self._ind[sortedPart], searchsorted(Keys[sortedPart], Keys[ind2], 'right'), rows2)
+        return self
+
+    def split(self, k):
+        # removes first k nodes and returns them as separate nodes pool
+        rows = self._ind[:k]
+        r = nodesPool(**dict((name, None if arr is None else arr[rows]) for name, arr in self._storage.items() if name != '_seq'))
+        self._ind = self._ind[k:]
+        self._reclaim()
+        return r
+
+def getNodesField(nodes, field):
+    # for both nodesPool and list of nodes (used in MOP and IP)
+    if isinstance(nodes, nodesPool):
+        return getattr(nodes, field)
+    if len(nodes) == 0:
+        return asarray([])
+    if getattr(nodes[0], field) is None:
+        return None
+    return asarray([getattr(node, field) for node in nodes])
@@ -0,0 +1,96 @@
+from numpy import frombuffer, hstack, vstack, array_split, ones, asarray, ndarray, dtype as np_dtype
+from multiprocessing import Pool, RawArray
+import sys
+
+# Functions and shared boxes bounds are module-level,
+# worker processes inherit them by fork, thus only box ranges and results are pickled
+_funcs = []
+_shared = {}
+
+def _worker(args):
+    ind, m, n, start, stop, dataType = args
+    y = frombuffer(_shared['y'], dataType, m*n).reshape(m, n)[start:stop].copy()
+    e = frombuffer(_shared['e'], dataType, m*n).reshape(m, n)[start:stop].copy()
+    r = _funcs[ind](y, e)
+    # oovars can't be pickled, they are replaced by their numbers
+    varsInd = _shared['varsInd']
+    return tuple(dict((varsInd[v], val) for v, val in elem.items()) if type(elem) == dict else elem for elem in r)
+
+def _mergeDefiniteRange(chunks, sizes):
+    if all([asarray(dr).size == 1 and bool(dr) for dr in chunks]):
+        return True
+    return hstack([dr if isinstance(dr, ndarray) and dr.size == size else ones(size, bool) * dr \
+                   for dr, size in zip(chunks, sizes)])
+
+def mergeIntervals(results, sizes):
+    # results of func82 on chunks of boxes
+    o = hstack([r[0].reshape(-1, size) for r, size in zip(results, sizes)]).flatten()
+    a = hstack([r[1].reshape(-1, size) for r, size in zip(results, sizes)]).flatten()
+    definiteRange = _mergeDefiniteRange([r[2] for r in results], sizes)
+    exactRange = all([r[3] for r in results])
+    return o, a, definiteRange, exactRange
+
+def mergeNLH(results, sizes):
+    # results of constraint.nlh on chunks of boxes
+    T0s = [ones(size) * r[0] for r, size in zip(results, sizes)]
+    Vars = _shared['vars']
+    res = {}
+    for j in set().union(*[r[1].keys() for r in results]):
+        k = [r[1][j] for r in results if j in r[1]][0].shape[1]
+        # chunk without the var: constraint is resolved on all its boxes, nlh doesn't depend on the var there
+        res[Vars[j]] = vstack([r[1][j] if j in r[1] else T0.reshape(-1, 1) * ones(k) for r, T0 in zip(results, T0s)])
+    T0 = hstack(T0s)
+    definiteRange = _mergeDefiniteRange([r[2] for r in results], sizes)
+    return T0, res, definiteRange
+
+class boxesEvaluator:
+    '''
+    Evaluates functions of interalg boxes (y, e) in p.nProc worker processes,
+    each one handles its own part of the boxes.
+    Only one evaluator can be active at a time.
+    '''
+    minBoxesPerProc = 8
+    _growth = 1.5
+
+    def __init__(self, funcs, Vars, nProc, dataType):
+        self.funcs, self.Vars, self.nProc, self.dataType = funcs, Vars, nProc, np_dtype(dataType)
+        self.pool = None
+        self.capacity = 0
+
+    def _start(self, size):
+        self.close()
+        self.capacity = int(self._growth * size) + 1
+        nBytes = self.capacity * self.dataType.itemsize
+        _shared['y'], _shared['e'] = RawArray('b', nBytes), RawArray('b', nBytes)
+        _funcs[:] = self.funcs
+        _shared['vars'] = self.Vars
+        _shared['varsInd'] = dict((v, i) for i, v in enumerate(self.Vars))
+        self.pool = Pool(processes = self.nProc)
+
+    def __call__(self, ind, y, e, merge):
+        m, n = y.shape
+        if m < self.minBoxesPerProc * self.nProc:
+            return self.funcs[ind](y, e)
+        if m * n > self.capacity:
+            self._start(m * n)
+        frombuffer(_shared['y'], self.dataType, m*n)[:] = y.flatten()
+        frombuffer(_shared['e'], self.dataType, m*n)[:] = e.flatten()
+        Inds = array_split(range(m), self.nProc)
+        sizes = [elem.size for elem in Inds]
+        Args = [(ind, m, n, elem[0], elem[-1]+1, self.dataType) for elem in Inds]
+        results = self.pool.map(_worker, Args)
+        return merge(results, sizes)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+            self.capacity = 0
+
+def getBoxesEvaluator(p, funcs, Vars, dataType):
+    if p.nProc == 1:
+        return None
+    if sys.platform == 'win32':
+        p.warn('interalg: nProc > 1 requires fork-based multiprocessing, unavailable on Windows; 1 process will be used')
+        return None
+    return boxesEvaluator(funcs, Vars, p.nProc, dataType)
@@ -5,7 +5,7 @@ import numpy as np
 # for PyPy
 from openopt.kernel.nonOptMisc import where
 
-from bisect import bisect_right
+from interalgNodes import nodesPool
 from FuncDesigner.Interval import adjust_lx_WithDiscreteDomain, adjust_ux_WithDiscreteDomain
 try:
     from bottleneck import nanmin
@@ -59,43 +59,37 @@ def func9(an, fo, g, p):
     
     #ind = searchsorted(ar, fo, side='right')
     if p.probType in ('NLSP', 'SNLE') and p.maxSolutions != 1:
-        mino = atleast_1d([node.key for node in an])
+        mino = an.key
         ind = mino > 0
         if not any(ind):
             return an, g
         else:
             g = nanmin((g, nanmin(mino[ind])))
             ind2 = where(logical_not(ind))[0]
-            #an = take(an, ind2, axis=0, out=an[:ind2.size])
-            #an = asarray(an[ind2])
-            an = [an[i] for i in ind2]
-            return an, g
+            return an.take(ind2), g
             
         
     elif p.solver.dataHandling == 'sorted':
         #OLD
-        mino = [node.key for node in an]
-        ind = bisect_right(mino, fo)
+        mino = an.key
+        ind = mino.searchsorted(fo, side='right')
         if ind == len(mino):
             return an, g
         else:
             g = nanmin((g, nanmin(atleast_1d(mino[ind]))))
-            return an[:ind], g
+            return an.truncate(ind), g
     elif p.solver.dataHandling == 'raw':
         
         #NEW
-        mino = atleast_1d([node.key for node in an])
+        mino = an.key
         r10 = mino > fo
         if not any(r10):
             return an, g
         else:
             ind = where(r10)[0]
             g = nanmin((g, nanmin(atleast_1d(mino)[ind])))
-            #an = asarray(an)
             ind2 = where(logical_not(r10))[0]
-            #an = take(an, ind2, axis=0, out=an[:ind2.size])
-            an = [an[i] for i in ind2]
-            return an, g
+            return an.take(ind2), g
 
         # NEW 2
 #        curr_tnlh = [node.tnlh_curr for node in an]
@@ -111,24 +105,24 @@ def func5(an, nn, g, p):
     m = len(an)
     if m <= nn: return an, g
     
-    mino = np.array([node.key for node in an])
+    isPool = isinstance(an, nodesPool)
+    mino = an.key.copy() if isPool else np.array([node.key for node in an])
     
     if nn == 1: # box-bound probs with exact interval analysis
         ind = argmin(mino)
         assert ind in (0, 1), 'error in interalg engine'
         g = nanmin((mino[1-ind], g))
-        an = [an[i] for i in ind]
+        an = an.take([ind]) if isPool else [an[ind]]
     elif m > nn:
         if p.solver.dataHandling == 'raw':
             ind = argsort(mino)
             th = mino[ind[nn]]
             ind2 = where(mino < th)[0]
             g = nanmin((th, g))
-            #an = take(an, ind2, axis=0, out=an[:ind2.size])
-            an = [an[i] for i in ind2]#an[ind2]
+            an = an.take(ind2) if isPool else [an[i] for i in ind2]#an[ind2]
         else:
             g = nanmin((mino[nn], g))
-            an = an[:nn]
+            an = an.truncate(nn) if isPool else an[:nn]
     return an, g
 
 def func4(p, y, e, o, a, fo, tnlhf_curr = None):
@@ -10,6 +10,8 @@ from FuncDesigner import sum as fd_sum, abs as fd_abs, oopoint
 from ii_engine import *
 from interalgCons import processConstraints
 from interalgODE import interalg_ODE_routine
+from interalgParallel import getBoxesEvaluator
+from openopt.kernel.checkpoint import checkpointIsDue, saveCheckpoint, loadCheckpoint
 
 from interalgLLR import adjustr4WithDiscreteVariables
 
@@ -196,11 +198,11 @@ class interalg(baseSolver):
             #C.update([elem == 0 for elem in p.user.f])
         elif isMOP:
             asdf1 = p.user.f
-            Solutions.F = []
+            Solutions.F = np.zeros((0, len(p.user.f)))
             if point(p.x0).isFeas(altLinInEq=False):
                 Solutions.solutions.append(p.x0.copy())
                 Solutions.coords = asarray(Solutions.solutions)
-                Solutions.F.append(p.f(p.x0))
+                Solutions.F = asarray(p.f(p.x0), float).reshape(1, -1)
                 p._solutions = Solutions
         elif not isODE:
             asdf1 = p.user.f[0]
@@ -315,8 +317,28 @@ class interalg(baseSolver):
             interalg_ODE_routine(p, self)
             return
         
+        # p.nProc > 1: boxes intervals are evaluated in several processes
+        evaluator = None if isIP else getBoxesEvaluator(p, 
+            [lambda y, e: func82(y, e, vv, asdf1, dataType, p)] + 
+            [lambda y, e, c=c: c.nlh(y, e, p, dataType) for c, f, lb, ub, tol in C0], vv, dataType)
+        p._boxesEvaluator = evaluator
+        
         #_in = np.array([], object)
         _in = []
+        
+        IPfields = ('_F', '_residual', '_volume')
+        state = loadCheckpoint(p)
+        if state is not None:
+            y, e, _in, _s, g, r40, r41, xRecord, pnc = \
+            [state[key] for key in ('y', 'e', '_in', '_s', 'g', 'r40', 'r41', 'xRecord', 'pnc')]
+            Solutions.__dict__.update(state['Solutions'])
+            self.dataHandling = state['dataHandling']
+            nNodes += state['nNodes']
+            nActiveNodes += state['nActiveNodes']
+            if isIP:
+                for key in IPfields:
+                    setattr(p, key, state[key])
+            
         while 1:
             if len(C0) != 0: # SNLE also can have constraints
                 y, e, nlhc, residual, definiteRange, indT, _s = processConstraints(C0, y, e, _s, p, dataType)
@@ -349,7 +371,19 @@ class interalg(baseSolver):
                 else:
                     p.istop, p.msg = 1000, 'solution has been obtained'
                 break            
+            
+            if checkpointIsDue(p):
+                state = {'y': y, 'e': e, '_in': _in, '_s': _s, 'g': g, 'r40': r40, 'r41': r41, 'xRecord': xRecord, 
+                         'pnc': pnc, 'Solutions': Solutions.__dict__, 'dataHandling': self.dataHandling, 
+                         'nNodes': nNodes, 'nActiveNodes': nActiveNodes}
+                if isIP:
+                    for key in IPfields:
+                        state[key] = getattr(p, key)
+                saveCheckpoint(p, state)
             ############# End of main cycle ###############
+        
+        if evaluator is not None:
+            evaluator.close()
             
         if not isSNLE and not isIP and not isMOP:
             if p._bestPoint.betterThan(p.point(p.xk)):
@@ -373,7 +407,7 @@ class interalg(baseSolver):
         if isSNLE:
             lf = inf
         else:
-            lf = array([t.key for t in an])#.flatten()
+            lf = getNodesField(an, 'key')
             if lf.size != 0:
                 g = nanmin([nanmin(lf), g])
 
@@ -410,7 +444,7 @@ class interalg(baseSolver):
                 for j, goal in enumerate(p.user.f):
                     s[goal] = Solutions.F[i][j]
                 s.useAsMutable = False
-            p.solutions.values = np.asarray(Solutions.F)
+            p.solutions.values = Solutions.F
             p.solutions.coords = Solutions.coords
         if isSNLE and p.maxSolutions != 1:
             for v in p._stringVars:
@@ -23,8 +23,10 @@ from openopt.kernel.baseSolver import *
 from openopt.kernel.ooMisc import economyMult, Len
 from openopt.kernel.setDefaultIterFuncs import *
 from openopt.solvers.UkrOpt.UkrOptMisc import getBestPointAfterTurn
+from openopt.solvers.UkrOpt.Dilation import limitedMemoryDilation
 # for PyPy
 from openopt.kernel.nonOptMisc import where
+from openopt.kernel.checkpoint import checkpointIsDue, saveCheckpoint, loadCheckpoint
 
 class ralg(baseSolver):
     __name__ = 'ralg'
@@ -42,6 +44,12 @@ class ralg(baseSolver):
     S = 0
     T = float64
     dilationType = 'plain difference'
+    
+    # True: B is kept as product of rank-one dilations (O(n*maxDilations) memory and time per iter) instead of dense n x n matrix;
+    # when their number reaches maxDilations all accumulated ones are dropped and B restarts (like B restoration);
+    # 'auto': True for n > 5000
+    limitedMemory = False
+    maxDilations = 100
 
     showLS = False
     show_hs = False
@@ -87,6 +95,12 @@ class ralg(baseSolver):
         n = p.n
         x0 = p.x0
         
+        limitedMemory = self.limitedMemory
+        if limitedMemory == 'auto':
+            limitedMemory = n > 5000 and self.B is None
+        elif limitedMemory and self.B is not None:
+            p.err('ralg: user-provided matrix B cannot be used with limitedMemory = True')
+        
         if p.nbeq == 0 or any(abs(p._get_AeqX_eq_Beq_residuals(x0))>p.contol): # TODO: add "or Aeqconstraints(x0) out of contol"
             x0[x0<p.lb] = p.lb[x0<p.lb]
             x0[x0>p.ub] = p.ub[x0>p.ub]
@@ -107,12 +121,12 @@ class ralg(baseSolver):
             
         if not self.newLinEq or p.nbeq == 0:
             #needProjection = False
-            B0 = eye(n,  dtype=T)
+            B0 = limitedMemoryDilation(n, self.maxDilations, T = T) if limitedMemory else eye(n,  dtype=T)
             restoreProb = lambda *args: 0
             Aeq_r, beq_r, nbeq_r = None, None, 0
         else:
             #needProjection = True
-            B0 = self.getPrimevalDilationMatrixWRTlinEqConstraints(p)
+            B0 = self.getPrimevalDilationMatrixWRTlinEqConstraints(p, limitedMemory)
             #Aeq, beq, nbeq = p.Aeq, p.beq, p.nbeq
             
             if any(abs(p._get_AeqX_eq_Beq_residuals(x0))>p.contol/16.0):
@@ -147,6 +161,12 @@ class ralg(baseSolver):
         if self.innerState is not None:
             hs = self.innerState['hs']
             b = self.innerState['B']
+            
+        state = loadCheckpoint(p)
+        if state is not None:
+            x0, b, hs = state['x'], state['B'], state['hs']
+            if isinstance(b, limitedMemoryDilation) != bool(limitedMemory):
+                p.err('ralg: checkpoint has been saved with other value of limitedMemory')
         
         ls_arr = []
         w = asarray(1.0/alp-1.0, T)
@@ -166,6 +186,9 @@ class ralg(baseSolver):
             p.istop = 14 if bestPoint.isFeas(False) else -14
             p.msg = 'move direction has all-zero coords'
             return
+        if state is not None:
+            savedBestPoint = p.point(array(state['xBest'], T))
+            if savedBestPoint.betterThan(bestPoint): bestPoint = savedBestPoint
 
         HS = []
         LS = []
@@ -268,9 +291,12 @@ class ralg(baseSolver):
             iterStartPoint = prevIter_best_ls_point
             x = iterStartPoint.x.copy()
 
-            g_tmp = economyMult(b.T, moveDirection)
-            if any(g_tmp): g_tmp /= p.norm(g_tmp)
-            g1 = p.matmult(b, g_tmp)
+            if limitedMemory:
+                g1 = b.getDilatedVector(moveDirection)
+            else:
+                g_tmp = economyMult(b.T, moveDirection)
+                if any(g_tmp): g_tmp /= p.norm(g_tmp)
+                g1 = p.matmult(b, g_tmp)
             
 #            norm_moveDirection = p.norm(g1)
 #            if doScale:
@@ -694,7 +720,7 @@ class ralg(baseSolver):
             # CHANGES END
 
             if doDilation:
-                g = economyMult(b.T, g1)
+                g = b.rmatvec(g1) if limitedMemory else economyMult(b.T, g1)
                 ng = p.norm(g)
 
                 if self.needRej(p, b, g1, g) or selfNeedRej:
@@ -709,12 +735,15 @@ class ralg(baseSolver):
                     hs *= 0.9
                     p.debugmsg('small dilation direction norm (%e), skipping' % ng)
                 if all(isfinite(g)) and ng > 1e-50 and doDilation:
-                    g = (g / ng).reshape(-1,1)
-                    vec1 = economyMult(b, g).reshape(-1,1)# TODO: remove economyMult, use dot?
                     #if alp_addition != 0: p.debugmsg('alp_addition:' + str(alp_addition))
                     w = asarray(1.0/(alp+alp_addition)-1.0, T) 
-                    vec2 = w * g.T
-                    b += p.matmult(vec1, vec2)
+                    if limitedMemory:
+                        b.dilate(g / ng, w)
+                    else:
+                        g = (g / ng).reshape(-1,1)
+                        vec1 = economyMult(b, g).reshape(-1,1)# TODO: remove economyMult, use dot?
+                        vec2 = w * g.T
+                        b += p.matmult(vec1, vec2)
             
 
             """                               Call OO iterfcn                                """
@@ -801,15 +830,18 @@ class ralg(baseSolver):
             prevIter_PointForDilation = best_ls_point
             prevDirectionForDilation = best_ls_point._getDirection(self.approach)
             moveDirection = best_ls_point._getDirection(self.approach)
+            
+            if checkpointIsDue(p):
+                saveCheckpoint(p, {'x': best_ls_point.x, 'xBest': bestPoint.x, 'B': b, 'hs': hs})
 
 
-    def getPrimevalDilationMatrixWRTlinEqConstraints(self, p):
+    def getPrimevalDilationMatrixWRTlinEqConstraints(self, p, limitedMemory = False):
         n, Aeq, beq = p.n, p.Aeq, p.beq
         nLinEq = len(p.beq)
         ind_fixed = where(p.lb==p.ub)[0]
         arr=ones(n, dtype=self.T)
         arr[ind_fixed] = 0
-        b = diag(arr)
+        b = limitedMemoryDilation(n, self.maxDilations, arr, self.T) if limitedMemory else diag(arr)
         
         if hasattr(Aeq, 'tocsc'):Aeq = Aeq.tocsc()
         
@@ -817,10 +849,14 @@ class ralg(baseSolver):
             vec = Aeq[i]
             #raise 0
             if hasattr(vec, 'toarray'): vec = vec.toarray().flatten()
-            g = economyMult(b.T, vec)
+            g = b.rmatvec(vec) if limitedMemory else economyMult(b.T, vec)
             if not any(g): continue
             #ind_nnz = nonzero(g)[0]
             ng = norm(g)
+            if limitedMemory:
+                # projection wrt the constraint, it is never dropped
+                b.dilate(g / ng, -1.0, permanent = True)
+                continue
             g = (g / ng).reshape(-1,1)
             
             vec1 = p.matmult(b, g)# TODO: remove economyMult, use dot?
@@ -0,0 +1,27 @@
+from numpy import arange
+from FuncDesigner import oovars, sum
+from openopt import LP
+
+def test(complexity=0, **kwargs):
+    n = 10 * (complexity+1)
+    x, cost, demand = oovars('x', 'cost', 'demand')
+    f = sum(cost * x)
+    constraints = [x >= 0, x <= 10, sum(x) >= demand, x[0] - x[1] >= demand / 4.0]
+    values = [{cost: 1.0 + arange(n) % 3, demand: 5.0}, {cost: 3.0 - arange(n) % 4, demand: 12.0}, {cost: 1.0 + arange(n)[::-1], demand: 2.5}]
+    startPoint = {x: [0]*n, cost: values[0][cost], demand: 5.0}
+
+    # parametric LP solved with several values of fixed oovars vs new LP for each of them
+    p = LP(f, startPoint, constraints = constraints, fixedVars = [cost, demand])
+    cp = p.compile('pclp', iprint = -1, **kwargs)
+    for vals in values:
+        r = cp.solve(vals)
+        point = startPoint.copy()
+        point.update(vals)
+        r2 = LP(f, point, constraints = constraints, fixedVars = [cost, demand]).solve('pclp', iprint = -1, **kwargs)
+        if r.istop <= 0 or r2.istop <= 0 or abs(r.ff - r2.ff) > 1e-6 * (1 + abs(r2.ff)):
+            return False, r, p
+    return True, r, p
+
+if __name__ == '__main__':
+    isPassed, r, p = test()
+    assert isPassed
@@ -0,0 +1,25 @@
+from numpy import cos, arange, ones, zeros
+from openopt import NSP, oosolver
+
+def test(complexity=0, **kwargs):
+    n = 30 * (complexity+1)
+    x0 = cos(arange(n))
+    f = lambda x: (abs(x) * 1.2 ** (arange(n) % 10)).sum()
+
+    Aeq = zeros(n)
+    Aeq[:4] = 1
+    beq = 1
+
+    # space dilation matrix is stored by its factors, not as n x n matrix;
+    # no dilations are dropped here, thus ralg behaves like with dense B (up to rounding errors)
+    solver = oosolver('ralg', limitedMemory = True, maxDilations = 10000)
+    p = NSP(f, x0, lb = -2*ones(n), ub = 2*ones(n), Aeq = Aeq, beq = beq, maxIter = 1e4, ftol = 1e-8, **kwargs)
+    if 'iprint' not in kwargs: p.iprint = -1
+    r = p.solve(solver)
+    # f_opt = 1 (x[0] = 1, other x[i] = 0)
+    if r.istop > 0 and abs(r.ff - 1.0) < 1e-4: return True, r, p
+    else: return False, r, p
+
+if __name__ == '__main__':
+    isPassed, r, p = test(iprint = 10)
+    assert isPassed